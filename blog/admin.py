@@ -1,13 +1,23 @@
 from django.contrib import admin
+from django.db import transaction
 
-from .models import Tag, GalleryImage, Post, Comment, Like
+from .counters import (
+    apply_comment_change,
+    apply_like_change,
+    comment_counter_key,
+    like_counter_key,
+    refresh_comment_count,
+)
+from .models import Tag, GalleryImage, Post, Comment, Like, Job
+from .trending import apply_score_change, apply_score_changes, comment_contribution, like_contribution, rebuild_scores
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "user", "is_active", "created_time", "updated_time")
+    list_display = ("id", "title", "user", "is_active", "like_count", "comment_count", "created_time", "updated_time")
     list_filter = ("user__username", "is_active")
     search_fields = ("title", "user__username")
+    readonly_fields = ("like_count", "comment_count")
     list_per_page = 50
 
 
@@ -22,8 +32,32 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ("id", "comment_text", "post", "user", "is_active", "created_time", "updated_time")
     list_filter = ("user__username", "is_active")
     search_fields = ("comment_text", "user__username")
+    readonly_fields = ("like_count",)
     list_per_page = 100
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        saved = Comment.objects.get(pk=obj.pk) if change else None
+        before = comment_counter_key(saved) if change else None
+        contribution = comment_contribution(saved) if change else None
+        super().save_model(request, obj, form, change)
+        apply_comment_change(before, comment_counter_key(obj))
+        apply_score_change(contribution, comment_contribution(obj))
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        post_id = obj.post_id
+        super().delete_model(request, obj)
+        refresh_comment_count([post_id])
+        rebuild_scores([post_id])
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        post_ids = set(queryset.values_list("post_id", flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_comment_count(post_ids)
+        rebuild_scores(post_ids)
+
 
 @admin.register(Like)
 class LikeAdmin(admin.ModelAdmin):
@@ -32,5 +66,39 @@ class LikeAdmin(admin.ModelAdmin):
     search_fields = ("user__username",)
     list_per_page = 100
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        saved = Like.objects.get(pk=obj.pk) if change else None
+        before = like_counter_key(saved) if change else None
+        contribution = like_contribution(saved) if change else None
+        super().save_model(request, obj, form, change)
+        apply_like_change(before, like_counter_key(obj))
+        apply_score_change(contribution, like_contribution(obj))
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        before = like_counter_key(obj)
+        contribution = like_contribution(obj)
+        super().delete_model(request, obj)
+        apply_like_change(before, None)
+        apply_score_change(contribution, None)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        likes = list(queryset)
+        keys = [like_counter_key(like) for like in likes]
+        super().delete_queryset(request, queryset)
+        for key in keys:
+            apply_like_change(key, None)
+        apply_score_changes(removed=filter(None, map(like_contribution, likes)))
+
 
 admin.site.register(GalleryImage)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_at", "updated_time")
+    list_filter = ("name", "status")
+    readonly_fields = ("claim", "locked_at", "last_error", "created_time", "updated_time")
+    list_per_page = 100
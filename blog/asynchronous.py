@@ -0,0 +1,136 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+
+async def afetch(queryset):
+    """
+    Evaluates a queryset with the async ORM.
+
+    aiterator() streams the rows in chunks, but Django 4.2 does not support it
+    together with prefetch_related(), so prefetching querysets are evaluated with
+    `async for`, which fetches the rows and their prefetches in one thread hop.
+
+    Args:
+    - queryset (QuerySet): The queryset to evaluate.
+
+    Returns:
+    - list: The model instances.
+    """
+    if queryset._prefetch_related_lookups:
+        return [obj async for obj in queryset]
+    return [obj async for obj in queryset.aiterator()]
+
+
+def async_route_enabled(name):
+    return name in getattr(settings, "ASYNC_READ_ROUTES", ())
+
+
+class AsyncReadMixin:
+    """
+    Serves the `async_actions` of a viewset with coroutine views, so under ASGI a
+    read request does not hold a worker thread while it waits on the database.
+
+    Routes are switched per URL name (e.g. "posts-list", "posts-detail") with the
+    ASYNC_READ_ROUTES setting; other routes keep the regular sync views. On an async
+    route, the other methods (e.g. POST on "posts-list") still run the sync view in
+    a thread.
+
+    The async pipeline mirrors the sync one: authentication, permissions, filters,
+    pagination and serialization are the same DRF code, and mixins earlier in the
+    MRO (CachedResponseMixin, ConditionalGetMixin) wrap `alist` and `aretrieve`
+    like they wrap `list` and `retrieve`. Queries run with `aget`, `aaggregate` and
+    `aiterator`; the blocking steps that may query the database (authenticating a
+    request with credentials and validating filter parameters) run in a thread.
+    Serialization is pure CPU work, since the query plan loads every related object.
+    """
+
+    async_actions = ("list", "retrieve")
+    async_inline_params = ("cursor", "page_size", "format")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if "get" in actions and "head" not in actions:
+            actions["head"] = actions["get"]
+        route = f"{initkwargs.get('basename')}-{'detail' if initkwargs.get('detail') else 'list'}"
+        async_methods = {method for method, action in actions.items() if action in cls.async_actions}
+        if not async_methods or not async_route_enabled(route):
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method.lower() not in async_methods:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, action in self.action_map.items():
+                setattr(self, method, getattr(self, action))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        Async version of APIView.dispatch for the actions in `async_actions`.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.ainitial(request)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request):
+        """
+        Authenticates requests carrying a token or a session cookie in a thread,
+        then runs the remaining checks of `initial`, which need no queries.
+        """
+        if "HTTP_AUTHORIZATION" in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            await sync_to_async(self.perform_authentication)(request)
+        self.initial(request)
+
+    async def afilter_queryset(self, queryset):
+        """
+        Filter backends may validate parameters against the database (e.g. the
+        primary keys of ModelChoiceFilters), so they run in a thread unless the
+        request only carries `async_inline_params`.
+        """
+        if set(self.request.query_params) <= set(self.async_inline_params):
+            return self.filter_queryset(queryset)
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(await afetch(queryset), many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
@@ -0,0 +1,365 @@
+import platform
+import statistics
+import time
+from types import SimpleNamespace
+
+import django
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .cache import get_cache
+from .models import Tag, Post, Comment, Like
+from .query_plans import build_query_plan
+from .serializers import (
+    BulkIdsSerializer,
+    CommentSerializer,
+    ContentTypeSerializer,
+    GalleryImageSerializer,
+    LikeSerializer,
+    LikeToggleSerializer,
+    PostSerializer,
+    TagSerializer,
+    ThreadedCommentSerializer,
+)
+from .threads import fetch_thread
+from .throttling import EmailThrottle, IPThrottle, LocalBucketStore, RedisBucketStore, UserThrottle, set_bucket_store
+from .urls import router
+
+
+# Scales of the seeded database; "large" is about a million rows.
+SCALES = {
+    "small": {"users": 100, "tags": 50, "posts": 1000, "comments": 10000, "likes": 10000, "images": 500},
+    "medium": {"users": 1000, "tags": 200, "posts": 10000, "comments": 100000, "likes": 100000, "images": 5000},
+    "large": {"users": 1000, "tags": 500, "posts": 100000, "comments": 500000, "likes": 400000, "images": 20000},
+}
+DEEP_THREADS = 10
+DEEP_THREAD_DEPTH = 50
+
+# The most queries each endpoint may issue, whatever the size of the database,
+# for a superuser authenticated with a cached token and an empty response cache.
+# Exports are left out: they read one page of EXPORT_PAGE_SIZE rows per query.
+QUERY_BUDGETS = {
+    "tags.list": 1,
+    "tags.retrieve": 1,
+    "posts.list": 4,
+    "posts.retrieve": 4,
+    "posts.comments_tree": 2,
+    "posts.trending": 4,
+    "posts.export": None,
+    "comments.list": 2,
+    "comments.retrieve": 2,
+    "comments.export": None,
+    "likes.list": 1,
+    "likes.retrieve": 1,
+    "likes.summary": 1,
+    "likes.export": None,
+    "blog:contenttype-list": 1,
+}
+# The most time the throttles of a request may take, in milliseconds, at p99.
+THROTTLE_BUDGET_MS = 1.0
+
+
+def environment():
+    database = connection.vendor
+    if database == "sqlite":
+        database = f"sqlite {connection.Database.sqlite_version}"
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": database,
+        "machine": platform.machine(),
+    }
+
+
+def timings(function, repeat):
+    """
+    Calls `function` `repeat` times and returns the duration of each call in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def percentile(timings, fraction):
+    """
+    Returns the value of `timings` below which `fraction` of them fall, e.g. 0.99 for the p99.
+    """
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def serializer_cases(sample):
+    """
+    Yields the name, object count and benchmarked call of each serializer, with the
+    objects loaded beforehand like the views load them.
+    """
+    request = Request(APIRequestFactory().get("/"))
+    context = {"request": request}
+
+    def output(serializer_class, objects):
+        objects = list(objects)
+        return len(objects), lambda: serializer_class(objects, many=True, context=context).data
+
+    def planned(serializer_class):
+        queryset = serializer_class.Meta.model.objects.order_by("id")
+        return build_query_plan(serializer_class).apply(queryset)[:sample]
+
+    for serializer_class in (GalleryImageSerializer, TagSerializer, PostSerializer, CommentSerializer, LikeSerializer):
+        yield (serializer_class.__name__, *output(serializer_class, planned(serializer_class)))
+    yield ("ContentTypeSerializer", *output(ContentTypeSerializer, ContentType.objects.order_by("id")[:sample]))
+
+    post = deepest_thread_post()
+    thread = fetch_thread(post.pk, DEEP_THREAD_DEPTH, sample, include_inactive=True)[0][:sample] if post else []
+    yield ("ThreadedCommentSerializer", *output(ThreadedCommentSerializer, thread))
+
+    ids = {"ids": list(range(1, 1001))}
+    yield ("BulkIdsSerializer", len(ids["ids"]), lambda: BulkIdsSerializer(data=ids).is_valid(raise_exception=True))
+    toggles = [{"id": index, "liked": index % 2 == 0} for index in range(1, sample + 1)]
+    yield (
+        "LikeToggleSerializer",
+        len(toggles),
+        lambda: LikeToggleSerializer(data=toggles, many=True).is_valid(raise_exception=True),
+    )
+
+
+def benchmark_serializers(sample=200, repeat=20):
+    """
+    Measures each serializer of blog/serializers.py on `sample` objects: the
+    representation of loaded objects for the model serializers, the validation of
+    request data for the input serializers.
+
+    Returns:
+    - list: One dict per serializer, with the median and best time per object in
+      microseconds and the objects serialized per second.
+    """
+    results = []
+    for name, count, function in serializer_cases(sample):
+        if not count:
+            continue
+        function()
+        durations = timings(function, repeat)
+        median = statistics.median(durations)
+        results.append(
+            {
+                "name": name,
+                "objects": count,
+                "per_object_us": median / count * 1e6,
+                "best_per_object_us": min(durations) / count * 1e6,
+                "objects_per_second": count / median,
+            }
+        )
+    return results
+
+
+def deepest_thread_post():
+    return Post.objects.annotate(replies=Count("comment__previous_comment")).order_by("-replies", "id").first()
+
+
+def get_endpoints():
+    """
+    Returns the route name and path of every GET endpoint of blog/urls.py, with
+    detail routes pointing at existing rows, and the like summary of the first 50 posts.
+
+    Returns:
+    - list: (route, path) tuples; routes are named like the metrics routes, e.g. "posts.list".
+    """
+    objects = {
+        "tags": Tag.objects.order_by("id").first(),
+        "posts": deepest_thread_post(),
+        "comments": Comment.objects.order_by("id").first(),
+        "likes": Like.objects.order_by("id").first(),
+    }
+    post_ids = ",".join(str(pk) for pk in Post.objects.order_by("id").values_list("id", flat=True)[:50])
+    queries = {"likes.summary": f"?content_type={ContentType.objects.get_for_model(Post).pk}&object_ids={post_ids}"}
+    endpoints = []
+    for prefix, viewset, basename in router.registry:
+        obj = objects.get(basename)
+        endpoints.append((f"{basename}.list", reverse(f"blog:{basename}-list")))
+        if obj is not None:
+            endpoints.append((f"{basename}.retrieve", reverse(f"blog:{basename}-detail", args=[obj.pk])))
+        for extra in viewset.get_extra_actions():
+            if "get" not in extra.mapping:
+                continue
+            name = f"blog:{basename}-{extra.url_name}"
+            route = f"{basename}.{extra.__name__}"
+            if not extra.detail:
+                endpoints.append((route, reverse(name) + queries.get(route, "")))
+            elif obj is not None:
+                endpoints.append((route, reverse(name, args=[obj.pk])))
+    endpoints.append(("blog:contenttype-list", reverse("blog:contenttype-list")))
+    return endpoints
+
+
+class QueryCounter:
+    """
+    Counts the queries run on a connection, as an execute wrapper. Unlike
+    CaptureQueriesContext, it isn't reset by the request_started signal.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def fetch(client, path):
+    response = client.get(path)
+    content = b"".join(response.streaming_content) if response.streaming else response.content
+    return response, content
+
+
+def benchmark_endpoints(client, requests=50, warmup=5, cache=False, budgets=QUERY_BUDGETS):
+    """
+    Requests every endpoint of `get_endpoints` in process with `client`, reading
+    the whole response, streamed or not.
+
+    Args:
+    - client (Client): A test client, with the credentials to send.
+    - requests (int): Measured requests per endpoint, after `warmup` unmeasured ones.
+    - cache (bool): Whether responses may be served from the response cache, which
+      is cleared before each request otherwise.
+    - budgets (dict): The maximum query count of each route.
+
+    Returns:
+    - list: One dict per endpoint with its status, response size, query count and
+      budget, requests per second and latency percentiles in milliseconds.
+    """
+    results = []
+    for route, path in get_endpoints():
+
+        def request():
+            if not cache:
+                get_cache().clear()
+            return fetch(client, path)
+
+        for _ in range(warmup):
+            request()
+        if not cache:
+            get_cache().clear()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            response, content = fetch(client, path)
+        durations = timings(request, requests)
+        budget = budgets.get(route)
+        results.append(
+            {
+                "route": route,
+                "path": path,
+                "status": response.status_code,
+                "bytes": len(content),
+                "queries": queries.count,
+                "query_budget": budget,
+                "over_budget": budget is not None and queries.count > budget,
+                "requests_per_second": len(durations) / sum(durations),
+                "mean_ms": statistics.mean(durations) * 1000,
+                "p50_ms": statistics.median(durations) * 1000,
+                "p95_ms": percentile(durations, 0.95) * 1000,
+                "p99_ms": percentile(durations, 0.99) * 1000,
+            }
+        )
+    return results
+
+
+def throttle_requests(clients):
+    """
+    Returns a like toggle request of each of `clients` clients, each with its own IP,
+    email and authenticated user, as the throttles of LikesViewSet see them.
+    """
+    factory = APIRequestFactory()
+    requests = []
+    for index in range(clients):
+        address = f"10.0.{index // 256}.{index % 256}"
+        request = factory.post("/", {"email": f"client{index}@example.com"}, format="json", REMOTE_ADDR=address)
+        request = Request(request, parsers=[JSONParser()])
+        request.user = SimpleNamespace(pk=index + 1, is_authenticated=True)
+        requests.append(request)
+    return requests
+
+
+def benchmark_throttles(requests=10000, clients=1000, redis_url=None):
+    """
+    Measures the time the IP, email and user throttles of a like toggle take per
+    request, i.e. their `allow_request` calls, with the in-memory bucket store and,
+    given `redis_url`, with a Redis one. Requests cycle through `clients` clients,
+    so buckets are created, refilled and emptied along the way.
+
+    Returns:
+    - list: One dict per store with the throttled requests per second and latency
+      percentiles in microseconds, over budget when the p99 exceeds THROTTLE_BUDGET_MS.
+    """
+    view = SimpleNamespace(throttle_scope="likes", action="toggle")
+    throttles = [IPThrottle(), EmailThrottle(), UserThrottle()]
+    clients = throttle_requests(clients)
+    for request in clients:
+        # The view parses the body anyway, the email throttle only reads it.
+        request.data
+
+    stores = [("local", LocalBucketStore)]
+    if redis_url:
+        stores.append(("redis", lambda: RedisBucketStore(redis_url)))
+    results = []
+    for name, store in stores:
+        previous = set_bucket_store(store())
+        try:
+            calls = iter(range(requests))
+
+            def throttle():
+                request = clients[next(calls) % len(clients)]
+                request.rate_limits = []
+                for throttle in throttles:
+                    throttle.allow_request(request, view)
+
+            durations = timings(throttle, requests)
+        finally:
+            set_bucket_store(previous)
+        results.append(
+            {
+                "store": name,
+                "requests_per_second": len(durations) / sum(durations),
+                "p50_us": statistics.median(durations) * 1e6,
+                "p99_us": percentile(durations, 0.99) * 1e6,
+                "over_budget": percentile(durations, 0.99) * 1000 > THROTTLE_BUDGET_MS,
+            }
+        )
+    return results
+
+
+def compare(baseline, results):
+    """
+    Describes the changes between two benchmark results, e.g. of two commits.
+
+    Returns:
+    - list: One line per serializer, endpoint and throttle store present in both.
+    """
+
+    def change(before, after):
+        return f"{before:.1f} -> {after:.1f} ({(after - before) / before * 100:+.1f}%)" if before else f"{after:.1f}"
+
+    lines = []
+    previous = {result["name"]: result for result in baseline.get("serializers", [])}
+    for result in results.get("serializers", []):
+        before = previous.get(result["name"])
+        if before is not None:
+            lines.append(f"{result['name']}: {change(before['per_object_us'], result['per_object_us'])} us/object")
+    previous = {result["route"]: result for result in baseline.get("endpoints", [])}
+    for result in results.get("endpoints", []):
+        before = previous.get(result["route"])
+        if before is not None:
+            queries = f"{before['queries']} -> {result['queries']} queries"
+            lines.append(f"{result['route']}: p50 {change(before['p50_ms'], result['p50_ms'])} ms, {queries}")
+    previous = {result["store"]: result for result in baseline.get("throttles", [])}
+    for result in results.get("throttles", []):
+        before = previous.get(result["store"])
+        if before is not None:
+            lines.append(f"throttles ({result['store']}): p50 {change(before['p50_us'], result['p50_us'])} us")
+    return lines
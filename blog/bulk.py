@@ -0,0 +1,93 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+from rest_framework.response import Response
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Creates every validated item with a single bulk_create.
+
+    Only suitable for models without many-to-many fields.
+    """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**item) for item in validated_data])
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """
+    Validates a list of primary keys with one query, instead of one query per key.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        child = self.child_relation
+        pks = []
+        for item in data:
+            try:
+                pks.append(child.queryset.model._meta.pk.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                child.fail("incorrect_type", data_type=type(item).__name__)
+        objects = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail("does_not_exist", pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField whose `many=True` form is a BulkManyRelatedField.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class BulkActionMixin:
+    """
+    Helpers for bulk actions that apply one change to many objects by id.
+
+    Objects are fetched with one query and checked against the object permissions
+    of the action one by one, so every id gets its own result status.
+    """
+
+    def get_bulk_objects(self, ids, queryset):
+        """
+        Fetches the objects of `ids` and checks their object permissions.
+
+        Args:
+        - ids (list): The requested primary keys.
+        - queryset (QuerySet): The objects visible to the user.
+
+        Returns:
+        - tuple: The permitted objects, and a dict with the "not_found" or
+          "forbidden" status of the other ids.
+        """
+        objects = queryset.in_bulk(ids)
+        permissions = self.get_permissions()
+        allowed, statuses = [], {}
+        for pk in dict.fromkeys(ids):
+            obj = objects.get(pk)
+            if obj is None:
+                statuses[pk] = "not_found"
+            elif not all(permission.has_object_permission(self.request, self, obj) for permission in permissions):
+                statuses[pk] = "forbidden"
+            else:
+                allowed.append(obj)
+        return allowed, statuses
+
+    def bulk_response(self, ids, statuses):
+        results = [{"id": pk, "status": statuses[pk]} for pk in dict.fromkeys(ids)]
+        return Response({"results": results})
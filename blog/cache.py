@@ -0,0 +1,204 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .metrics import record_cache
+from .replicas import replica_reads
+
+
+CACHE_ALIAS = "api"
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def record(event, namespace):
+    with _stats_lock:
+        _stats[(namespace, event)] += 1
+    record_cache(event)
+
+
+def cache_stats():
+    """
+    Returns the hit/miss counters of this process.
+
+    Returns:
+    - dict: Counts keyed by (namespace, "hit" or "miss").
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _generations(cache, keys):
+    """
+    Reads the generation tokens embedded in cache keys.
+
+    A missing token (never set, or evicted by the backend) is replaced with a new
+    unique value, so entries stored under an older token can never be served again.
+    """
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def _bump(cache, *keys):
+    token = time.time_ns()
+    cache.set_many({key: token for key in keys}, timeout=None)
+
+
+def invalidate(namespace, pk=None):
+    """
+    Invalidates cached responses of `namespace`.
+
+    With a `pk`, every list response and the retrieve responses of that object are
+    invalidated; without one, every response of the namespace is.
+    """
+    cache = get_cache()
+    if pk is None:
+        _bump(cache, f"{namespace}:gen")
+    else:
+        _bump(cache, f"{namespace}:list:gen", f"{namespace}:obj:{pk}:gen")
+
+
+def invalidate_many(namespace, pks):
+    """
+    Invalidates every list response and the retrieve responses of `pks` at once.
+    """
+    keys = [f"{namespace}:obj:{pk}:gen" for pk in pks]
+    if keys:
+        _bump(get_cache(), f"{namespace}:list:gen", *keys)
+
+
+def invalidate_many_on_commit(namespace, pks):
+    pks = list(pks)
+    transaction.on_commit(lambda: invalidate_many(namespace, pks))
+
+
+def invalidate_on_commit(namespace, pk=None):
+    """
+    Invalidates once the current transaction commits, so a concurrent request can't
+    cache the state from before the write (including counter updates made later in
+    the same transaction).
+    """
+    transaction.on_commit(lambda: invalidate(namespace, pk))
+
+
+def normalize_query_params(query_params):
+    items = sorted((key, value) for key, values in query_params.lists() for value in values if value != "")
+    return urlencode(items)
+
+
+class CachedResponseMixin:
+    """
+    Caches the serialized data of the list and retrieve actions.
+
+    Keys combine `cache_namespace`, the action, the object pk, the role returned by
+    `get_cache_role` and the normalized query parameters, plus generation tokens
+    that `invalidate` bumps when the underlying rows change.
+
+    ETag and Last-Modified headers are cached with the data, so conditional
+    requests answered from the cache get a 304 without touching the database.
+
+    Misses are computed on the primary database even on replica routes: a lagging
+    replica read right after an invalidation would be cached for `cache_timeout`.
+    """
+
+    cache_namespace = None
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_cache_role(self, request):
+        return "superuser" if request.user.is_superuser else "public"
+
+    def get_cache_key(self, request, cache):
+        namespace = self.cache_namespace
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if pk is None:
+            generation_keys = [f"{namespace}:gen", f"{namespace}:list:gen"]
+        else:
+            generation_keys = [f"{namespace}:gen", f"{namespace}:obj:{pk}:gen"]
+        generations = ".".join(str(generation) for generation in _generations(cache, generation_keys))
+        variant = "|".join(
+            [
+                self.action,
+                str(pk),
+                self.get_cache_role(request),
+                request.get_host(),
+                request.accepted_renderer.format,
+                normalize_query_params(request.query_params),
+            ]
+        )
+        digest = hashlib.sha1(variant.encode("utf-8")).hexdigest()
+        return f"{namespace}:response:{generations}:{digest}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request, cache)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cache_hit_response(request, cached)
+
+        record("miss", self.cache_namespace)
+        with replica_reads(False):
+            return self.store_response(cache, key, handler(request, *args, **kwargs))
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """
+        Async version of `cached_response`. The cache itself is still read and written
+        synchronously: the default locmem backend never blocks, and Django 4.2 only
+        implements the async cache methods by running the sync ones in a thread.
+        """
+        cache = get_cache()
+        key = self.get_cache_key(request, cache)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cache_hit_response(request, cached)
+
+        record("miss", self.cache_namespace)
+        with replica_reads(False):
+            return self.store_response(cache, key, await handler(request, *args, **kwargs))
+
+    def cache_hit_response(self, request, cached):
+        record("hit", self.cache_namespace)
+        data, headers = cached
+        response = Response(data, headers={**headers, "X-Cache": "HIT"})
+        return get_conditional_response(
+            request._request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            response=response,
+        )
+
+    def store_response(self, cache, key, response):
+        if response.status_code == 200:
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            cache.set(key, (response.data, headers), self.cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,127 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified validators to the list and retrieve actions and
+    answers matching conditional requests with 304 Not Modified.
+
+    Validators come from one aggregate query over the rows the response would
+    contain (the object, or the page window of the paginator): their count,
+    max(pk), max(updated_time) and the sum of `conditional_counter_fields`, which
+    change without touching updated_time. Related rows embedded in the response
+    are folded in too: the max of the `conditional_related_times` timestamps (e.g.
+    of the author), and the number and max(pk) of the through rows of the
+    `conditional_many_fields` relations, which change when a row is added to or
+    removed from the relation. The body is never serialized to compute them.
+
+    The async `alist` and `aretrieve` variants are served by AsyncReadMixin.
+    """
+
+    conditional_counter_fields = ()
+    conditional_related_times = ()
+    conditional_many_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.get_list_rows(queryset, request)
+        return self.conditional_response(super().list, rows, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.get_object_rows(queryset)
+        return self.conditional_response(super().retrieve, rows, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        rows = self.get_list_rows(queryset, request)
+        return await self.aconditional_response(super().alist, rows, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        rows = self.get_object_rows(queryset)
+        return await self.aconditional_response(super().aretrieve, rows, request, *args, **kwargs)
+
+    def get_list_rows(self, queryset, request):
+        if self.paginator is not None:
+            queryset = self.paginator.get_window(queryset, request, view=self)
+        return queryset.model._default_manager.filter(pk__in=queryset.values("pk"))
+
+    def get_object_rows(self, queryset):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+    def get_validators(self, rows, request):
+        """
+        Computes the ETag and Last-Modified timestamp of a response.
+
+        Args:
+        - rows (QuerySet): The rows the response is serialized from.
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - tuple: The quoted ETag and Last-Modified timestamp, or (None, None) when
+          there are no rows (e.g. the response is a 404).
+        """
+        values = rows.order_by().aggregate(**self.get_validator_aggregates(rows.model))
+        return self.build_validators(values, request)
+
+    async def aget_validators(self, rows, request):
+        values = await rows.order_by().aaggregate(**self.get_validator_aggregates(rows.model))
+        return self.build_validators(values, request)
+
+    def get_validator_aggregates(self, model):
+        aggregates = {"count": Count("pk"), "last_pk": Max("pk"), "updated_time": Max("updated_time")}
+        for field in self.conditional_counter_fields:
+            aggregates[field] = Sum(field)
+        for field in self.conditional_related_times:
+            aggregates[field] = Max(field)
+        for name in self.conditional_many_fields:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            links = through.objects.filter(**{source: OuterRef("pk")}).order_by().values(source)
+            aggregates[f"{name}_count"] = Sum(Subquery(links.annotate(total=Count("pk")).values("total")))
+            aggregates[f"{name}_last_pk"] = Max(Subquery(links.annotate(last=Max("pk")).values("last")))
+        return aggregates
+
+    def build_validators(self, values, request):
+        if not values["count"]:
+            return None, None
+        times = [values["updated_time"]] + [values[field] for field in self.conditional_related_times]
+        last_modified = int(max(time for time in times if time is not None).timestamp())
+
+        fingerprint = "|".join(
+            [request.get_full_path(), request.accepted_renderer.format]
+            + [str(value) for _, value in sorted(values.items())]
+        )
+        etag = quote_etag(hashlib.sha1(fingerprint.encode("utf-8")).hexdigest())
+        return etag, last_modified
+
+    def conditional_response(self, handler, rows, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(rows, request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.add_validators(handler(request, *args, **kwargs), etag, last_modified)
+
+    async def aconditional_response(self, handler, rows, request, *args, **kwargs):
+        etag, last_modified = await self.aget_validators(rows, request)
+        if etag is None:
+            return await handler(request, *args, **kwargs)
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self.add_validators(await handler(request, *args, **kwargs), etag, last_modified)
+
+    def add_validators(self, response, etag, last_modified):
+        if response.status_code == 200:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
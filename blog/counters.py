@@ -0,0 +1,200 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import invalidate_on_commit
+from .models import Post, Comment, Like
+
+
+LIKE_COUNTED_MODELS = (Post, Comment)
+
+
+def like_counter_key(like):
+    """
+    Returns the (model, object_id) whose like_count includes `like`.
+
+    Only active likes with `liked=True` on a post or a comment are counted.
+
+    Args:
+    - like (Like): The like instance.
+
+    Returns:
+    - tuple or None: The counted model and object id, or None if the like is not counted.
+    """
+    if not (like.is_active and like.liked):
+        return None
+    model = ContentType.objects.get_for_id(like.content_type_id).model_class()
+    if model not in LIKE_COUNTED_MODELS:
+        return None
+    return model, like.object_id
+
+
+def comment_counter_key(comment):
+    """
+    Returns the post id whose comment_count includes `comment`, or None if the
+    comment is not active.
+    """
+    return comment.post_id if comment.is_active else None
+
+
+def _add_to_counter(field, delta):
+    """
+    Returns the expression of `field + delta`, clamped at 0 so a counter that drifted
+    (see `repair_counters`) fails neither its PositiveIntegerField CHECK nor the write.
+    """
+    return Greatest(F(field) + delta, Value(0))
+
+
+def apply_like_change(before, after):
+    """
+    Moves a like between counters with atomic `like_count = like_count +/- 1` updates,
+    never below 0.
+
+    Args:
+    - before (tuple or None): The like_counter_key of the like before the write.
+    - after (tuple or None): The like_counter_key of the like after the write.
+    """
+    if before == after:
+        return
+    if before is not None:
+        model, object_id = before
+        model.objects.filter(pk=object_id).update(like_count=_add_to_counter("like_count", -1))
+    if after is not None:
+        model, object_id = after
+        model.objects.filter(pk=object_id).update(like_count=F("like_count") + 1)
+
+
+def apply_comment_change(before, after):
+    """
+    Moves a comment between post counters with atomic `comment_count +/- 1` updates,
+    never below 0.
+
+    Args:
+    - before (int or None): The comment_counter_key of the comment before the write.
+    - after (int or None): The comment_counter_key of the comment after the write.
+    """
+    if before == after:
+        return
+    if before is not None:
+        Post.objects.filter(pk=before).update(comment_count=_add_to_counter("comment_count", -1))
+    if after is not None:
+        Post.objects.filter(pk=after).update(comment_count=F("comment_count") + 1)
+
+
+def _apply_deltas(model, field, deltas):
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(**{field: _add_to_counter(field, delta)})
+
+
+def apply_like_deltas(deltas):
+    """
+    Applies many like_count changes with one UPDATE per model and distinct delta.
+
+    Args:
+    - deltas (dict): Count changes keyed by like_counter_key tuples.
+    """
+    by_model = defaultdict(dict)
+    for (model, object_id), delta in deltas.items():
+        by_model[model][object_id] = delta
+    for model, model_deltas in by_model.items():
+        _apply_deltas(model, "like_count", model_deltas)
+
+
+def apply_comment_deltas(deltas):
+    """
+    Applies many comment_count changes with one UPDATE per distinct delta.
+
+    Args:
+    - deltas (dict): Count changes keyed by post id.
+    """
+    _apply_deltas(Post, "comment_count", deltas)
+
+
+def _count_subquery(queryset, group_field):
+    counts = queryset.order_by().values(group_field).annotate(total=Count("pk")).values("total")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def expected_comment_count():
+    return _count_subquery(Comment.objects.filter(post=OuterRef("pk"), is_active=True), "post")
+
+
+def expected_like_count(model):
+    content_type = ContentType.objects.get_for_model(model)
+    likes = Like.objects.filter(content_type=content_type, object_id=OuterRef("pk"), is_active=True, liked=True)
+    return _count_subquery(likes, "object_id")
+
+
+def summarize_likes(content_type, object_ids, user=None):
+    """
+    Counts the likes and dislikes of many objects of `content_type`, and reads the
+    like state of `user` on each, with a single grouped query on like_content_idx.
+
+    Totals count active likes, like like_count does; the user's own like counts
+    even while it awaits approval.
+
+    Args:
+    - content_type (ContentType): The content type of the objects.
+    - object_ids (list): The ids of the objects.
+    - user (CustomUser, optional): The user whose like state is read, if authenticated.
+
+    Returns:
+    - dict: For each object id, a dict with its "likes" and "dislikes" totals and
+      "liked": True or False if the user liked or disliked it, None otherwise.
+    """
+    visible = Q(is_active=True)
+    totals = {
+        "likes": Count("pk", filter=Q(is_active=True, liked=True)),
+        "dislikes": Count("pk", filter=Q(is_active=True, liked=False)),
+    }
+    if user is not None and user.is_authenticated:
+        visible |= Q(user=user)
+        totals["liked_by_user"] = Count("pk", filter=Q(user=user, liked=True))
+        totals["disliked_by_user"] = Count("pk", filter=Q(user=user, liked=False))
+    rows = (
+        Like.objects.filter(visible, content_type=content_type, object_id__in=object_ids)
+        .order_by()
+        .values("object_id")
+        .annotate(**totals)
+    )
+    summaries = {object_id: {"likes": 0, "dislikes": 0, "liked": None} for object_id in object_ids}
+    for row in rows:
+        liked = True if row.get("liked_by_user") else False if row.get("disliked_by_user") else None
+        summaries[row["object_id"]] = {"likes": row["likes"], "dislikes": row["dislikes"], "liked": liked}
+    return summaries
+
+
+def refresh_comment_count(post_ids):
+    """
+    Recomputes comment_count of the given posts in a single UPDATE.
+
+    Used when a write removes an unknown number of comments, e.g. deleting a
+    comment cascades to its replies.
+    """
+    Post.objects.filter(pk__in=post_ids).update(comment_count=expected_comment_count())
+
+
+def repair_counters():
+    """
+    Recomputes every denormalized counter in bulk, touching only drifted rows.
+
+    Returns:
+    - dict: The number of repaired rows per counter.
+    """
+    repaired = {}
+    comment_count = expected_comment_count()
+    repaired["post.comment_count"] = (
+        Post.objects.exclude(comment_count=comment_count).update(comment_count=comment_count)
+    )
+    for model in LIKE_COUNTED_MODELS:
+        like_count = expected_like_count(model)
+        label = f"{model._meta.model_name}.like_count"
+        repaired[label] = model.objects.exclude(like_count=like_count).update(like_count=like_count)
+    invalidate_on_commit("posts")
+    return repaired
@@ -0,0 +1,277 @@
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .asynchronous import afetch
+from .metrics import record_serialization
+from .query_plans import _forward_relations
+from .search import SEARCH_RANK
+
+
+# Field classes whose representation of a database value is the value itself.
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+# Field classes whose `to_representation` accepts the value returned by values().
+# Float and JSON fields are left out: their values may hold floats, which orjson
+# formats differently from the json module.
+VALUE_FIELDS = (
+    serializers.ChoiceField,
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.UUIDField,
+)
+
+
+@dataclass(frozen=True)
+class ValuesRepresentation:
+    """
+    How to build the representation of a ModelSerializer from `values()` rows.
+
+    `columns` holds one (field name, lookup, kind) tuple per readable field, in the
+    serializer's field order. The kind is:
+    - "value" for columns copied as they are,
+    - "convert" for columns passed through the field's `to_representation`,
+    - "pks" for many-to-many fields of primary keys, read with one `values_list()`
+      query per field with the same joins and filter as their prefetch query,
+    - "prefetch" for nested `many=True` serializers, serialized by the field itself
+      from the regular prefetch query, run on primary key only instances.
+    """
+
+    model: type
+    columns: tuple
+    lookups: tuple
+    related_pks: tuple
+    prefetch_related: tuple
+
+    @property
+    def has_related(self):
+        return bool(self.related_pks or self.prefetch_related)
+
+    def values(self, queryset):
+        """
+        Returns `queryset` as dicts of the looked up columns, keeping the search rank
+        that KeysetPagination orders ranked querysets by.
+        """
+        annotations = (SEARCH_RANK,) if SEARCH_RANK in queryset.query.annotations else ()
+        return queryset.prefetch_related(None).values(*self.lookups, *annotations)
+
+    def load_related(self, rows, db):
+        """
+        Runs the queries of the many-related fields of `rows`.
+
+        Returns:
+        - tuple: The related primary keys of each "pks" field by row primary key, and
+          the instances holding the prefetched objects, in the order of `rows`.
+        """
+        pk = self.model._meta.pk.attname
+        ids = [row[pk] for row in rows]
+        related = {}
+        for name, related_model, query_name in self.related_pks:
+            links = related_model._default_manager.using(db).filter(**{f"{query_name}__in": ids})
+            related[name] = by_owner = {}
+            for owner, related_pk in links.values_list(query_name, "pk"):
+                by_owner.setdefault(owner, []).append(related_pk)
+        instances = None
+        if self.prefetch_related:
+            instances = [self.model.from_db(db, [pk], (value,)) for value in ids]
+            prefetch_related_objects(instances, *self.prefetch_related)
+        return related, instances
+
+    def represent(self, rows, related, instances, serializer):
+        """
+        Builds the representation of `rows`, with the fields of `serializer` (bound
+        to the view's context) for the converted and prefetched fields.
+
+        Returns:
+        - list: One dict per row, equal to the serializer's representation.
+        """
+        start = time.perf_counter()
+        pk = self.model._meta.pk.attname
+        fields = serializer.fields
+        columns = [(name, lookup, kind, fields[name]) for name, lookup, kind in self.columns]
+        data = []
+        for index, row in enumerate(rows):
+            item = {}
+            for name, lookup, kind, field in columns:
+                if kind == "pks":
+                    item[name] = related[name].get(row[pk], [])
+                elif kind == "prefetch":
+                    item[name] = field.to_representation(field.get_attribute(instances[index]))
+                else:
+                    value = row[lookup]
+                    item[name] = value if kind == "value" or value is None else field.to_representation(value)
+            data.append(item)
+        record_serialization(time.perf_counter() - start)
+        return data
+
+
+@lru_cache(maxsize=None)
+def build_values_representation(serializer_class):
+    """
+    Compiles the ValuesRepresentation of a ModelSerializer.
+
+    Args:
+    - serializer_class (type): A ModelSerializer subclass.
+
+    Returns:
+    - ValuesRepresentation: The compiled representation, or None when a readable
+      field needs the model instance (e.g. methods, properties, file fields or
+      nested single objects), in which case the regular serializer must be used.
+    """
+    model = serializer_class.Meta.model
+    columns, related_pks, prefetch_related = [], [], []
+    lookups = {model._meta.pk.attname: None}
+    for name, serializer_field in serializer_class().fields.items():
+        if serializer_field.write_only:
+            continue
+        if serializer_field.source == "*":
+            return None
+        path = "__".join(serializer_field.source_attrs)
+        if isinstance(serializer_field, ManyRelatedField):
+            model_field = _many_to_many_field(model, serializer_field.source_attrs)
+            if model_field is None or not _is_pk_field(serializer_field.child_relation):
+                return None
+            columns.append((name, None, "pks"))
+            related_pks.append((name, model_field.related_model, model_field.related_query_name()))
+            continue
+        if isinstance(serializer_field, serializers.ListSerializer):
+            columns.append((name, None, "prefetch"))
+            prefetch_related.append(path)
+            continue
+        if _forward_relations(model, serializer_field.source_attrs) is None:
+            return None
+        if _is_pk_field(serializer_field) or type(serializer_field) in IDENTITY_FIELDS:
+            # values() returns the primary key of forward relations.
+            kind = "value"
+        elif type(serializer_field) in VALUE_FIELDS:
+            kind = "convert"
+        else:
+            return None
+        columns.append((name, path, kind))
+        lookups[path] = None
+    return ValuesRepresentation(
+        model=model,
+        columns=tuple(columns),
+        lookups=tuple(lookups),
+        related_pks=tuple(related_pks),
+        prefetch_related=tuple(sorted(prefetch_related)),
+    )
+
+
+def _is_pk_field(serializer_field):
+    return isinstance(serializer_field, PrimaryKeyRelatedField) and serializer_field.pk_field is None
+
+
+def _many_to_many_field(model, attrs):
+    if len(attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(attrs[0])
+    except FieldDoesNotExist:
+        return None
+    return model_field if model_field.many_to_many and model_field.concrete else None
+
+
+class ValuesReadMixin:
+    """
+    Serves the `values_actions` of a viewset from `values()` rows instead of model
+    instances, skipping the per-field work of ModelSerializer (e.g. "list" and
+    "retrieve" of posts spend most of their CPU time in `to_representation`).
+
+    The rows are filtered and paginated like the queryset of the regular path,
+    and the response data is equal to the serializer's, so it renders to the same
+    bytes. Serializers with fields that need model instances keep the regular path.
+
+    Object permissions of the retrieve action are checked against an instance
+    holding only the primary key: read permissions must not look at the object.
+    Place it before QueryPlanMixin in the bases, as the rows need no query plan.
+    """
+
+    values_actions = ("list", "retrieve")
+
+    def get_values_representation(self):
+        if self.action not in self.values_actions:
+            return None
+        return build_values_representation(self.get_serializer_class())
+
+    def get_query_plan(self):
+        if self.get_values_representation() is not None:
+            return None
+        return super().get_query_plan()
+
+    def list(self, request, *args, **kwargs):
+        representation = self.get_values_representation()
+        if representation is None:
+            return super().list(request, *args, **kwargs)
+        rows = representation.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.represent_rows(representation, page, rows.db))
+        return Response(self.represent_rows(representation, list(rows), rows.db))
+
+    def retrieve(self, request, *args, **kwargs):
+        representation = self.get_values_representation()
+        if representation is None:
+            return super().retrieve(request, *args, **kwargs)
+        rows = representation.values(self.filter_queryset(self.get_queryset()))
+        try:
+            row = rows.get(**self.get_lookup_filter())
+        except (rows.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_row_permissions(representation, row, rows.db)
+        return Response(self.represent_rows(representation, [row], rows.db)[0])
+
+    async def alist(self, request, *args, **kwargs):
+        representation = self.get_values_representation()
+        if representation is None:
+            return await super().alist(request, *args, **kwargs)
+        rows = representation.values(await self.afilter_queryset(self.get_queryset()))
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(rows, request, view=self)
+            data = await self.arepresent_rows(representation, page, rows.db)
+            return self.get_paginated_response(data)
+        return Response(await self.arepresent_rows(representation, await afetch(rows), rows.db))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        representation = self.get_values_representation()
+        if representation is None:
+            return await super().aretrieve(request, *args, **kwargs)
+        rows = representation.values(await self.afilter_queryset(self.get_queryset()))
+        try:
+            row = await rows.aget(**self.get_lookup_filter())
+        except (rows.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_row_permissions(representation, row, rows.db)
+        return Response((await self.arepresent_rows(representation, [row], rows.db))[0])
+
+    def get_lookup_filter(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    def check_row_permissions(self, representation, row, db):
+        pk = representation.model._meta.pk.attname
+        self.check_object_permissions(self.request, representation.model.from_db(db, [pk], (row[pk],)))
+
+    def represent_rows(self, representation, rows, db):
+        related, instances = representation.load_related(rows, db) if rows else ({}, None)
+        return representation.represent(rows, related, instances, self.get_serializer())
+
+    async def arepresent_rows(self, representation, rows, db):
+        related, instances = {}, None
+        if rows and representation.has_related:
+            related, instances = await sync_to_async(representation.load_related)(rows, db)
+        return representation.represent(rows, related, instances, self.get_serializer())
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .cache import invalidate_many_on_commit
+from .models import GalleryImage, Post, content_file_name
+from .renditions import ORIGINAL_FORMATS, render_image
+
+
+logger = logging.getLogger(__name__)
+
+INCOMING_DIR = "incoming"
+MAX_PIXELS = 40_000_000
+RENDITIONS = {"small": 320, "medium": 800, "large": 1600}
+RENDITION_QUALITY = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploads to a temporary file chunk by chunk, like Django's default
+    handler for large files, and computes their SHA-256 on the way so the content
+    hash costs no extra pass over the file.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def file_digest(file):
+    digest = getattr(file, "sha256", None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in file.chunks():
+            sha256.update(chunk)
+        digest = file.sha256 = sha256.hexdigest()
+    return digest
+
+
+def inspect_upload(file):
+    """
+    Validates an uploaded image from its header, without decoding the pixels, and
+    stores its Pillow format name in `file.image_format`.
+
+    Args:
+    - file (UploadedFile): The uploaded file.
+
+    Returns:
+    - UploadedFile: The validated file.
+
+    Raises:
+    - ValidationError: If the file is not a JPEG, PNG or WebP image, is truncated,
+      or has more than MAX_PIXELS pixels.
+    """
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            format = image.format
+            if format not in ORIGINAL_FORMATS:
+                raise ValidationError("Upload a JPEG, PNG or WebP image.")
+            if image.width * image.height > MAX_PIXELS:
+                raise ValidationError(f"Images may have at most {MAX_PIXELS} pixels.")
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("Upload a valid image. The file is either not an image or corrupted.")
+    finally:
+        file.seek(0)
+    file.image_format = format
+    return file
+
+
+def store_uploads(files):
+    """
+    Stores validated uploads under their content hash with one INSERT, reusing the
+    existing images of files that were uploaded before.
+
+    New files are saved as-is in `gallery/incoming/` and processed after the
+    transaction commits; their public name is only assigned once the metadata has
+    been stripped. An image inserted concurrently with the same hash wins over
+    ours, whose file is discarded.
+
+    Args:
+    - files (list): Uploads validated by `inspect_upload`.
+
+    Returns:
+    - list: The GalleryImage of each distinct file, in upload order.
+    """
+    uploads = {}
+    for file in files:
+        uploads.setdefault(file_digest(file), file)
+    digests = list(uploads)
+    existing = GalleryImage.objects.in_bulk(digests, field_name="sha256")
+    created = []
+    for digest in digests:
+        if digest not in existing:
+            image = GalleryImage(sha256=digest)
+            extension = ORIGINAL_FORMATS[uploads[digest].image_format]
+            image.file_name.save(f"{INCOMING_DIR}/{digest}{extension}", uploads[digest], save=False)
+            created.append(image)
+    if not created:
+        return [existing[digest] for digest in digests]
+
+    GalleryImage.objects.bulk_create(created, ignore_conflicts=True)
+    stored = GalleryImage.objects.in_bulk(digests, field_name="sha256")
+    pending = []
+    for image in created:
+        if stored[image.sha256].file_name.name == image.file_name.name:
+            pending.append(stored[image.sha256])
+        else:
+            image.file_name.delete(save=False)
+    transaction.on_commit(lambda: schedule_renditions(pending))
+    return [stored[digest] for digest in digests]
+
+
+def get_executor():
+    """
+    Returns the process pool of this process, started on first use with
+    GALLERY_WORKERS processes (all cores by default), or None when GALLERY_WORKERS
+    is 0 and images are processed inline.
+    """
+    global _executor
+    workers = getattr(settings, "GALLERY_WORKERS", None)
+    if workers == 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def render_arguments(image):
+    return (
+        str(settings.MEDIA_ROOT),
+        image.file_name.name,
+        content_file_name(image, f"{image.sha256[:2]}/{image.sha256}"),
+        RENDITIONS,
+        RENDITION_QUALITY,
+    )
+
+
+def submit(image):
+    """
+    Starts processing `image` in the process pool.
+
+    Returns:
+    - Future: The pending `render_image` result; already done when processed inline.
+    """
+    executor = get_executor()
+    arguments = render_arguments(image)
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(render_image(*arguments))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    try:
+        return executor.submit(render_image, *arguments)
+    except BrokenProcessPool:
+        reset_executor()
+        return get_executor().submit(render_image, *arguments)
+
+
+def schedule_renditions(images):
+    """
+    Submits images to the process pool without waiting. Each result is saved by
+    the pool's callback thread as soon as it is ready.
+    """
+    submitter = threading.get_ident()
+    for image in images:
+        submit(image).add_done_callback(partial(save_in_callback, image, submitter))
+
+
+def save_in_callback(image, submitter, future):
+    try:
+        save_result(image, future)
+    finally:
+        if threading.get_ident() != submitter:
+            connections.close_all()
+
+
+def process_images(images):
+    """
+    Processes images in the process pool and waits for all of them.
+
+    Args:
+    - images (iterable): GalleryImage instances with a `sha256`.
+
+    Returns:
+    - int: The number of images processed successfully.
+    """
+    futures = [(image, submit(image)) for image in images]
+    return sum(save_result(image, future) for image, future in futures)
+
+
+def save_result(image, future):
+    """
+    Stores the outcome of processing `image` and refreshes the posts showing it.
+
+    Args:
+    - image (GalleryImage): The processed image.
+    - future (Future): The `render_image` result.
+
+    Returns:
+    - bool: Whether the image is ready.
+    """
+    try:
+        fields = {"status": GalleryImage.Status.READY, **future.result()}
+    except Exception:
+        logger.exception("Processing gallery image %s failed", image.pk)
+        fields = {"status": GalleryImage.Status.FAILED}
+
+    source = image.file_name.name
+    with transaction.atomic():
+        GalleryImage.objects.filter(pk=image.pk).update(**fields)
+        post_ids = list(Post.objects.filter(images=image.pk).values_list("pk", flat=True))
+        Post.objects.filter(pk__in=post_ids).update(updated_time=timezone.now())
+        invalidate_many_on_commit("posts", post_ids)
+    if fields.get("file_name", source) != source and os.path.basename(os.path.dirname(source)) == INCOMING_DIR:
+        image.file_name.storage.delete(source)
+    return fields["status"] == GalleryImage.Status.READY
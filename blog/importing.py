@@ -0,0 +1,314 @@
+import csv
+import json
+import os
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from users.models import CustomUser
+from .cache import invalidate_on_commit
+from .counters import repair_counters
+from .models import Tag, Post, Comment, Like
+from .seeding import manual_timestamps
+from .trending import rebuild_scores
+
+
+IMPORT_BATCH_SIZE = 5000
+CSV_LIST_SEPARATOR = "|"
+MUTED_SIGNALS = (pre_save, post_save, pre_delete, post_delete, m2m_changed)
+
+USER_FIELDS = ("email", "first_name", "last_name")
+POST_FIELDS = ("title", "content", "allow_comments", "is_active", "created_time", "updated_time")
+COMMENT_FIELDS = ("name", "email", "comment_text", "is_active", "created_time", "updated_time")
+LIKE_FIELDS = ("name", "email", "liked", "is_active", "created_time", "updated_time")
+
+
+@contextmanager
+def muted_signals(*signals):
+    """
+    Temporarily disconnects every receiver of `signals`, so the cache
+    invalidation and token receivers don't run once per imported row.
+    """
+    signals = signals or MUTED_SIGNALS
+    saved = [(signal, signal.receivers) for signal in signals]
+    for signal in signals:
+        signal.receivers = []
+        signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
+def read_rows(path):
+    """
+    Yields the rows of an NDJSON file, or of a CSV file with a header when `path`
+    ends with ".csv", as dicts. Empty CSV cells are read as None and list columns
+    hold their values separated by CSV_LIST_SEPARATOR.
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            for row in csv.DictReader(file):
+                yield {key: value if value != "" else None for key, value in row.items()}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item for item in value.split(CSV_LIST_SEPARATOR) if item]
+    return list(value)
+
+
+def legacy_id(value):
+    return None if value is None else str(value)
+
+
+class BlogImporter:
+    """
+    Loads users, tags, posts, comments and likes from NDJSON or CSV files.
+
+    Posts and comments carry the `id` they had in the source system; comments and
+    likes reference them by those ids, and every row references users by username
+    and tags by name. All of them are resolved with in-memory maps, so the import
+    never queries the database per row. Rows are inserted with bulk_create in
+    batches of `batch_size`, comments only once the comment they reply to exists,
+    with the model signals muted; the denormalized counters are repaired at the end.
+
+    Rows that reference a missing user, post or comment are skipped and counted in
+    `skipped`.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.user_ids = {}
+        self.tag_ids = {}
+        self.post_ids = {}
+        self.comment_ids = {}
+        self.skipped = Counter()
+
+    def run(self, users=None, tags=None, posts=None, comments=None, likes=None, log=None):
+        """
+        Imports the given files in dependency order, in a single transaction.
+
+        Args:
+        - users, tags, posts, comments, likes (str, optional): The path of the file of each table.
+        - log (callable, optional): Called with a progress message after each table.
+
+        Returns:
+        - dict: The number of rows created per table.
+        """
+        log = log or (lambda message: None)
+        created = {}
+        steps = [
+            ("users", users, self.import_users),
+            ("tags", tags, self.import_tags),
+            ("posts", posts, self.import_posts),
+            ("comments", comments, self.import_comments),
+            ("likes", likes, self.import_likes),
+        ]
+        with transaction.atomic(), muted_signals(), manual_timestamps(Post, Comment, Like):
+            self.load_maps()
+            for name, path, step in steps:
+                if path is None:
+                    continue
+                created[name] = step(read_rows(path))
+                log(f"{name}: {created[name]}")
+            repair_counters()
+            rebuild_scores()
+            invalidate_on_commit("tags")
+        return created
+
+    def load_maps(self):
+        self.user_ids = dict(CustomUser.objects.values_list("username", "pk"))
+        self.tag_ids = {}
+        # Tag names aren't unique: the oldest tag of each name wins.
+        for name, pk in Tag.objects.order_by("-pk").values_list("name", "pk"):
+            self.tag_ids[name] = pk
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def resolve_user(self, row, table, required=False):
+        """
+        Returns the pk of the user named in `row["user"]`, None for rows without a
+        user, or False when the user doesn't exist (or is required but missing).
+        """
+        username = row.get("user")
+        if username is None:
+            if required:
+                self.skipped[f"{table}: missing user"] += 1
+                return False
+            return None
+        pk = self.user_ids.get(username)
+        if pk is None:
+            self.skipped[f"{table}: unknown user"] += 1
+            return False
+        return pk
+
+    def timestamps(self, row):
+        now = timezone.now()
+        return {
+            "created_time": row.get("created_time") or now.date(),
+            "updated_time": row.get("updated_time") or now,
+        }
+
+    def values(self, row, fields):
+        return {field: row[field] for field in fields if row.get(field) is not None}
+
+    def import_users(self, rows):
+        # Imported users have no usable password until they reset it.
+        password = make_password(None)
+        created = 0
+        for batch in self.batches(rows):
+            new = {row["username"]: row for row in batch if row["username"] not in self.user_ids}
+            users = [
+                CustomUser(username=username, password=password, **self.values(row, USER_FIELDS))
+                for username, row in new.items()
+            ]
+            for user in CustomUser.objects.bulk_create(users):
+                self.user_ids[user.username] = user.pk
+            created += len(users)
+        return created
+
+    def import_tags(self, rows):
+        return sum(self.create_tags(row["name"] for row in batch) for batch in self.batches(rows))
+
+    def create_tags(self, names):
+        new = list(dict.fromkeys(name for name in names if name not in self.tag_ids))
+        for tag in Tag.objects.bulk_create([Tag(name=name) for name in new]):
+            self.tag_ids[tag.name] = tag.pk
+        return len(new)
+
+    def import_posts(self, rows):
+        through = Post.tags.through
+        created = 0
+        for batch in self.batches(rows):
+            posts, tag_names = [], []
+            for row in batch:
+                user_id = self.resolve_user(row, "posts", required=True)
+                if user_id is False:
+                    continue
+                values = {**self.values(row, POST_FIELDS), **self.timestamps(row)}
+                posts.append((legacy_id(row.get("id")), Post(user_id=user_id, **values)))
+                tag_names.append(as_list(row.get("tags")))
+            self.create_tags(name for names in tag_names for name in names)
+            Post.objects.bulk_create([post for _, post in posts])
+            links = []
+            for (source_id, post), names in zip(posts, tag_names):
+                if source_id is not None:
+                    self.post_ids[source_id] = post.pk
+                tag_ids = dict.fromkeys(self.tag_ids[name] for name in names)
+                links.extend(through(post_id=post.pk, tag_id=tag_id) for tag_id in tag_ids)
+            through.objects.bulk_create(links)
+            created += len(posts)
+        return created
+
+    def import_comments(self, rows):
+        """
+        Inserts comments in batches where every reply's parent was inserted by an
+        earlier batch. Replies read before their parent wait in `waiting` until the
+        batch holding the parent is inserted, then join the next batch; replies
+        whose parent never shows up are skipped.
+        """
+        waiting = defaultdict(list)
+        ready = deque()
+        created = 0
+        rows = iter(rows)
+        exhausted = False
+        while True:
+            while not exhausted and len(ready) < self.batch_size:
+                row = next(rows, None)
+                if row is None:
+                    exhausted = True
+                    break
+                parent = legacy_id(row.get("previous_comment"))
+                if parent is None or parent in self.comment_ids:
+                    ready.append(row)
+                else:
+                    waiting[parent].append(row)
+            if not ready:
+                break
+            batch = [ready.popleft() for _ in range(min(self.batch_size, len(ready)))]
+            for source_id in self.create_comments(batch):
+                if source_id is not None:
+                    ready.extend(waiting.pop(source_id, ()))
+                created += 1
+        orphans = sum(len(replies) for replies in waiting.values())
+        if orphans:
+            self.skipped["comments: unknown previous_comment"] += orphans
+        return created
+
+    def create_comments(self, batch):
+        """
+        Returns the source ids of the comments created from `batch` (None for
+        comments without one).
+        """
+        comments = []
+        for row in batch:
+            post_id = self.post_ids.get(legacy_id(row.get("post")))
+            if post_id is None:
+                self.skipped["comments: unknown post"] += 1
+                continue
+            user_id = self.resolve_user(row, "comments")
+            if user_id is False:
+                continue
+            parent = legacy_id(row.get("previous_comment"))
+            values = {**self.values(row, COMMENT_FIELDS), **self.timestamps(row)}
+            comment = Comment(
+                post_id=post_id,
+                previous_comment_id=self.comment_ids[parent] if parent is not None else None,
+                user_id=user_id,
+                **values,
+            )
+            comments.append((legacy_id(row.get("id")), comment))
+        Comment.objects.bulk_create([comment for _, comment in comments])
+        for source_id, comment in comments:
+            if source_id is not None:
+                self.comment_ids[source_id] = comment.pk
+        return [source_id for source_id, _ in comments]
+
+    def import_likes(self, rows):
+        """
+        Likes reference their post or comment with `content_type` ("post" or
+        "comment") and its source `object_id`. Repeated likes of the same object by
+        a user, or by an email without a user, are skipped by the unique constraints.
+        """
+        targets = {
+            "post": (ContentType.objects.get_for_model(Post).pk, self.post_ids),
+            "comment": (ContentType.objects.get_for_model(Comment).pk, self.comment_ids),
+        }
+        existing = Like.objects.count()
+        for batch in self.batches(rows):
+            likes = []
+            for row in batch:
+                content_type_id, object_ids = targets.get(row.get("content_type"), (None, {}))
+                object_id = object_ids.get(legacy_id(row.get("object_id")))
+                if object_id is None:
+                    self.skipped["likes: unknown object"] += 1
+                    continue
+                user_id = self.resolve_user(row, "likes")
+                if user_id is False:
+                    continue
+                values = {**self.values(row, LIKE_FIELDS), **self.timestamps(row)}
+                likes.append(Like(content_type_id=content_type_id, object_id=object_id, user_id=user_id, **values))
+            Like.objects.bulk_create(likes, ignore_conflicts=True)
+        return Like.objects.count() - existing
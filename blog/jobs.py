@@ -0,0 +1,215 @@
+import logging
+import random
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class Handler:
+    """
+    A registered job handler. Batch handlers receive the payloads of every claimed
+    job with their name at once, and return one error (or None) per payload.
+    """
+
+    function: object
+    batch: bool = False
+
+
+handlers = {}
+
+
+def job_handler(name, batch=False):
+    """
+    Registers the decorated function as the handler of the jobs named `name`.
+
+    Args:
+    - name (str): The job name passed to `enqueue`.
+    - batch (bool, optional): Whether the function takes a list of payloads and
+      returns a list of errors, e.g. to send many emails over one connection.
+    """
+
+    def register(function):
+        handlers[name] = Handler(function, batch)
+        return function
+
+    return register
+
+
+def enqueue(name, payload, delay=None, max_attempts=None):
+    """
+    Adds a job to the queue.
+
+    The job is inserted in the current transaction, so it only becomes visible to
+    workers if the change that caused it commits.
+
+    Args:
+    - name (str): The name of a registered handler.
+    - payload (dict): JSON-serializable arguments of the handler.
+    - delay (timedelta, optional): How long to wait before running the job.
+    - max_attempts (int, optional): The number of runs before the job fails for good.
+
+    Returns:
+    - Job: The created job.
+    """
+    return enqueue_many(name, [payload], delay, max_attempts)[0]
+
+
+def enqueue_many(name, payloads, delay=None, max_attempts=None):
+    """
+    Adds one job per payload with a single INSERT. See `enqueue`.
+    """
+    if name not in handlers:
+        raise ValueError(f"No job handler is registered for {name!r}.")
+    run_at = timezone.now() + (delay or timedelta())
+    options = {"max_attempts": max_attempts} if max_attempts is not None else {}
+    return Job.objects.bulk_create([Job(name=name, payload=payload, run_at=run_at, **options) for payload in payloads])
+
+
+def retry_delay(attempts):
+    """
+    Returns the exponential backoff before the next run of a job that failed
+    `attempts` times, with up to 10% jitter so failed jobs don't retry in lockstep.
+    """
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * (1 + random.random() / 10))
+
+
+def send_messages(messages):
+    """
+    Sends emails over a single connection of the EMAIL_BACKEND.
+
+    Args:
+    - messages (list): EmailMessage instances, or None for payloads with nothing to send.
+
+    Returns:
+    - list: The exception raised while sending each message, or None.
+    """
+    errors = [None] * len(messages)
+    if not any(messages):
+        return errors
+    with get_connection() as connection:
+        for index, message in enumerate(messages):
+            if message is None:
+                continue
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                errors[index] = exc
+    return errors
+
+
+class Worker:
+    """
+    Claims due jobs and runs them with at most `concurrency` handlers at a time.
+
+    Jobs are claimed with one UPDATE that stamps them with a unique claim token, so
+    concurrent workers never run the same job. Claimed jobs are grouped by name,
+    and each group is handled in `batch_size` chunks: batch handlers get a whole
+    chunk at once. With a concurrency of 1, jobs run in the worker's own thread.
+    """
+
+    def __init__(self, concurrency=4, batch_size=50):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+
+    def claim(self, limit):
+        now = timezone.now()
+        Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=now - LOCK_TIMEOUT).update(
+            status=Job.Status.PENDING, claim=None, locked_at=None
+        )
+        token = uuid.uuid4()
+        due = Job.objects.filter(status=Job.Status.PENDING, run_at__lte=now).order_by("run_at", "id")
+        Job.objects.filter(pk__in=list(due.values_list("pk", flat=True)[:limit]), status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING, claim=token, locked_at=now, attempts=F("attempts") + 1
+        )
+        return list(Job.objects.filter(claim=token).order_by("run_at", "id"))
+
+    def run_once(self):
+        """
+        Claims and runs one round of due jobs.
+
+        Returns:
+        - int: The number of jobs claimed.
+        """
+        jobs = self.claim(self.concurrency * self.batch_size)
+        groups = defaultdict(list)
+        for job in jobs:
+            groups[job.name].append(job)
+        chunks = [
+            group[start : start + self.batch_size]
+            for group in groups.values()
+            for start in range(0, len(group), self.batch_size)
+        ]
+        if self.executor is None:
+            for chunk in chunks:
+                self.run_chunk(chunk)
+        else:
+            list(self.executor.map(self.run_threaded_chunk, chunks))
+        return len(jobs)
+
+    def run_threaded_chunk(self, jobs):
+        try:
+            self.run_chunk(jobs)
+        finally:
+            connections.close_all()
+
+    def run_chunk(self, jobs):
+        """
+        Runs jobs sharing a name and records their outcome.
+        """
+        handler = handlers.get(jobs[0].name)
+        if handler is None:
+            errors = [LookupError(f"No job handler is registered for {jobs[0].name!r}.")] * len(jobs)
+        elif handler.batch:
+            try:
+                errors = handler.function([job.payload for job in jobs])
+            except Exception as exc:
+                errors = [exc] * len(jobs)
+        else:
+            errors = []
+            for job in jobs:
+                try:
+                    handler.function(job.payload)
+                    errors.append(None)
+                except Exception as exc:
+                    errors.append(exc)
+
+        done = [job.pk for job, error in zip(jobs, errors) if error is None]
+        with transaction.atomic():
+            Job.objects.filter(pk__in=done).update(status=Job.Status.DONE, claim=None, locked_at=None, last_error="")
+            for job, error in zip(jobs, errors):
+                if error is not None:
+                    self.record_failure(job, error)
+
+    def record_failure(self, job, error):
+        message = "".join(traceback.format_exception(error)).strip()
+        logger.warning("Job %s failed (attempt %s of %s): %s", job, job.attempts, job.max_attempts, error)
+        fields = {"claim": None, "locked_at": None, "last_error": message}
+        if job.attempts < job.max_attempts:
+            fields.update(status=Job.Status.PENDING, run_at=timezone.now() + retry_delay(job.attempts))
+        else:
+            fields.update(status=Job.Status.FAILED)
+        Job.objects.filter(pk=job.pk).update(**fields)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
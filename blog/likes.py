@@ -0,0 +1,158 @@
+from django.db import NotSupportedError, connections, router
+from django.utils import timezone
+
+from .models import Like
+
+
+# The columns written by insert_like.
+INSERTED_FIELDS = (
+    "name",
+    "email",
+    "user",
+    "liked",
+    "content_type",
+    "object_id",
+    "is_active",
+    "created_time",
+    "updated_time",
+)
+
+
+def find_like(content_type, object_id, user=None, email=None):
+    """
+    Returns the like of `user` on an object or, without a user, the anonymous like
+    of `email`, or None.
+    """
+    likes = Like.objects.filter(content_type=content_type, object_id=object_id)
+    if user is not None:
+        return likes.filter(user=user).first()
+    return likes.filter(user__isnull=True, email=email).first()
+
+
+def _returning(sql, params):
+    """
+    Runs an INSERT or UPDATE of likes ending with `RETURNING {columns}`, where
+    `{columns}` is replaced with every column of the table.
+
+    Returns:
+    - Like or None: The written like, or None when no row was written.
+    """
+    db = router.db_for_write(Like)
+    quote = connections[db].ops.quote_name
+    columns = ", ".join(quote(field.column) for field in Like._meta.concrete_fields)
+    rows = list(Like.objects.raw(sql.format(columns=columns), params, using=db))
+    return rows[0] if rows else None
+
+
+def _quote(name):
+    return connections[router.db_for_write(Like)].ops.quote_name(name)
+
+
+def _column(name):
+    return _quote(Like._meta.get_field(name).column)
+
+
+def _insert_sql(connection, like):
+    """
+    Returns the `INSERT INTO ... VALUES (...)` statement writing INSERTED_FIELDS of
+    `like`, and its parameters.
+    """
+    fields = [Like._meta.get_field(name) for name in INSERTED_FIELDS]
+    params = [field.get_db_prep_save(getattr(like, field.attname), connection) for field in fields]
+    sql = (
+        f"INSERT INTO {_quote(Like._meta.db_table)} ({', '.join(_quote(field.column) for field in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    return sql, params
+
+
+def _new_like(content_type, object_id, liked, user, name, email):
+    now = timezone.now()
+    return Like(
+        name=name,
+        email=email,
+        user=user,
+        liked=liked,
+        content_type=content_type,
+        object_id=object_id,
+        created_time=now.date(),
+        updated_time=now,
+    )
+
+
+def _inserted_expression(connection):
+    """
+    Returns an SQL expression for the RETURNING clause of an upsert, true when the
+    row was inserted rather than updated, and its parameters.
+
+    PostgreSQL leaves xmax unset on the rows a statement inserts. SQLite runs one
+    write at a time and evaluates RETURNING before it saves the AUTOINCREMENT
+    sequence of the statement, so only an inserted row has an id above it.
+    """
+    if connection.vendor == "postgresql":
+        return "xmax = 0", []
+    if connection.vendor == "sqlite":
+        return f"{_column('id')} > COALESCE((SELECT seq FROM sqlite_sequence WHERE name = %s), 0)", [
+            Like._meta.db_table
+        ]
+    raise NotSupportedError(f"Like upserts are not supported on {connection.vendor}.")
+
+
+def insert_like(content_type, object_id, liked, user=None, name="", email=""):
+    """
+    Inserts a like unless the user (or, for anonymous likes, the email) already has
+    one on the object, with a single INSERT ... ON CONFLICT DO NOTHING statement.
+
+    Concurrent inserts of the same like neither fail on the unique_like or
+    unique_anonymous_like constraint nor wait for a lock taken by a read. New likes
+    await approval, like the likes created through the API.
+
+    Args:
+    - content_type (ContentType): The content type of the liked object.
+    - object_id (int): The id of the liked object.
+    - liked (bool): Whether the object is liked or disliked.
+    - user (CustomUser, optional): The user liking the object, None for anonymous likes.
+    - name, email (str): The name and email stored on the like.
+
+    Returns:
+    - Like or None: The inserted like, or None when the like already existed.
+    """
+    connection = connections[router.db_for_write(Like)]
+    sql, params = _insert_sql(connection, _new_like(content_type, object_id, liked, user, name, email))
+    return _returning(f"{sql} ON CONFLICT DO NOTHING RETURNING {{columns}}", params)
+
+
+def upsert_like(content_type, object_id, liked, user, name="", email=""):
+    """
+    Sets `liked` on the like of `user` on an object, creating it when needed, with a
+    single INSERT ... ON CONFLICT DO UPDATE statement on the unique_like constraint.
+
+    Existing likes are only written when `liked` changes, so their previous value
+    is the opposite of the returned one.
+
+    Args:
+    - content_type (ContentType): The content type of the liked object.
+    - object_id (int): The id of the liked object.
+    - liked (bool): Whether the object is liked or disliked.
+    - user (CustomUser): The user liking the object.
+    - name, email (str): The name and email stored on a new like.
+
+    Returns:
+    - Like or None: The written like, with `inserted` telling whether it is new, or
+      None when the like already had `liked`.
+    """
+    connection = connections[router.db_for_write(Like)]
+    sql, params = _insert_sql(connection, _new_like(content_type, object_id, liked, user, name, email))
+    inserted, inserted_params = _inserted_expression(connection)
+    table, liked_column, updated_time = _quote(Like._meta.db_table), _column("liked"), _column("updated_time")
+    conflict = ", ".join(_column(name) for name in ("user", "content_type", "object_id"))
+    like = _returning(
+        f"{sql} ON CONFLICT ({conflict}) DO UPDATE "
+        f"SET {liked_column} = excluded.{liked_column}, {updated_time} = excluded.{updated_time} "
+        f"WHERE {table}.{liked_column} <> excluded.{liked_column} "
+        f"RETURNING {{columns}}, {inserted} AS inserted",
+        params + inserted_params,
+    )
+    if like is not None:
+        like.inserted = bool(like.inserted)
+    return like
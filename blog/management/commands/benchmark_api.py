@@ -0,0 +1,159 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from blog.benchmarks import (
+    DEEP_THREAD_DEPTH,
+    DEEP_THREADS,
+    SCALES,
+    THROTTLE_BUDGET_MS,
+    benchmark_endpoints,
+    benchmark_serializers,
+    benchmark_throttles,
+    compare,
+    environment,
+)
+from blog.seeding import BlogSeeder
+from users.models import CustomUser
+
+
+BENCHMARK_USERNAME = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the serializers, every GET endpoint and the throttles of the blog API on a new database seeded "
+        "deterministically, and checks the query count of each endpoint and the time of the throttles against "
+        "their budgets. "
+        "Save the --json output of two commits and pass one to --compare to see the differences."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALES), default="small", help="Size of the seeded database.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--existing", action="store_true", help="Use the configured database as it is instead of a seeded one."
+        )
+        parser.add_argument("--requests", type=int, default=50, help="Measured requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent first per endpoint.")
+        parser.add_argument("--cache", action="store_true", help="Let the response cache serve repeated requests.")
+        parser.add_argument("--sample", type=int, default=200, help="Objects per serializer benchmark.")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per serializer benchmark.")
+        parser.add_argument(
+            "--throttle-requests", type=int, default=10000, help="Measured requests per throttle bucket store."
+        )
+        parser.add_argument(
+            "--redis-url",
+            default=getattr(settings, "THROTTLE_REDIS_URL", None),
+            help="Redis to benchmark the throttles with too; THROTTLE_REDIS_URL by default.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+        parser.add_argument("--compare", metavar="FILE", help="JSON results of an earlier run to compare with.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = json.load(file)
+
+        setup_test_environment()
+        try:
+            if options["existing"]:
+                results = self.run()
+            else:
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    with override_settings(READ_REPLICAS=[]):
+                        BlogSeeder(
+                            **SCALES[options["scale"]],
+                            deep_threads=DEEP_THREADS,
+                            deep_thread_depth=DEEP_THREAD_DEPTH,
+                            seed=options["seed"],
+                        ).run()
+                        results = self.run()
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.print_results(results)
+        if baseline is not None:
+            for line in compare(baseline, results):
+                self.stdout.write(line)
+        over_budget = [result["route"] for result in results["endpoints"] if result["over_budget"]]
+        if over_budget:
+            raise CommandError(f"Query budget exceeded by {', '.join(over_budget)}.")
+        over_budget = [result["store"] for result in results["throttles"] if result["over_budget"]]
+        if over_budget:
+            raise CommandError(f"Throttle budget of {THROTTLE_BUDGET_MS} ms exceeded with {', '.join(over_budget)}.")
+
+    def run(self):
+        """
+        Runs the benchmarks as the "benchmark" superuser, authenticated with a token.
+
+        The user and the token are created for the run and deleted afterwards, so
+        `--existing` leaves no credentials behind. An existing "benchmark" user is
+        only used if it is a superuser, and kept along with its token.
+        """
+        options = self.options
+        superuser, created = CustomUser.objects.get_or_create(
+            username=BENCHMARK_USERNAME, defaults={"is_superuser": True, "is_staff": True}
+        )
+        if not superuser.is_superuser:
+            raise CommandError(f'The existing "{BENCHMARK_USERNAME}" user is not a superuser.')
+        token, token_created = Token.objects.get_or_create(user=superuser)
+        try:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+            return {
+                "commit": self.git_commit(),
+                "environment": environment(),
+                "scale": "existing" if options["existing"] else options["scale"],
+                "seed": options["seed"],
+                "serializers": benchmark_serializers(options["sample"], options["repeat"]),
+                "endpoints": benchmark_endpoints(client, options["requests"], options["warmup"], options["cache"]),
+                "throttles": benchmark_throttles(options["throttle_requests"], redis_url=options["redis_url"]),
+            }
+        finally:
+            if created:
+                superuser.delete()
+            elif token_created:
+                token.delete()
+
+    def git_commit(self):
+        try:
+            output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return output.stdout.strip()
+
+    def print_results(self, results):
+        for result in results["serializers"]:
+            self.stdout.write(
+                f"{result['name']}: {result['per_object_us']:.1f} us/object "
+                f"({result['objects_per_second']:.0f} objects/s, {result['objects']} objects)"
+            )
+        for result in results["endpoints"]:
+            budget = "" if result["query_budget"] is None else f" (budget {result['query_budget']})"
+            line = (
+                f"{result['route']} {result['path']}: {result['status']}, {result['requests_per_second']:.0f} req/s, "
+                f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, {result['queries']} queries{budget}"
+            )
+            self.stdout.write(self.style.ERROR(line) if result["over_budget"] else line)
+        for result in results["throttles"]:
+            line = (
+                f"throttles ({result['store']} store): {result['requests_per_second']:.0f} req/s, "
+                f"p50 {result['p50_us']:.0f} us, p99 {result['p99_us']:.0f} us "
+                f"(budget {THROTTLE_BUDGET_MS * 1000:.0f} us)"
+            )
+            self.stdout.write(self.style.ERROR(line) if result["over_budget"] else line)
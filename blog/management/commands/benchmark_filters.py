@@ -0,0 +1,121 @@
+import datetime
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blog.models import Tag, Post, Comment, Like
+from blog.views import PostsViewSet, CommentsViewSet, LikesViewSet
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the EXPLAIN plan and latency of the queries behind each filterset_fields combination "
+        "of the posts, comments and likes endpoints. Seed the database first with seed_blog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Executions per query.")
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument(
+            "--without-indexes",
+            action="store_true",
+            help="Drop the blog Meta.indexes for the run (inside a rolled back transaction) to get a baseline.",
+        )
+        parser.add_argument("--no-explain", action="store_true", help="Only print latencies.")
+
+    def handle(self, *args, **options):
+        post = Post.objects.filter(is_active=True).order_by("id").first()
+        if post is None:
+            raise CommandError("There are no active posts, run seed_blog first.")
+        self.repeat = options["repeat"]
+        self.page_size = options["page_size"]
+        self.explain = not options["no_explain"]
+        self.factory = APIRequestFactory()
+        self.anonymous = AnonymousUser()
+        self.superuser = CustomUser(username="benchmark", is_superuser=True)
+
+        with transaction.atomic():
+            if options["without_indexes"]:
+                self.drop_indexes()
+            for label, queryset in self.get_cases(post):
+                self.run_case(label, queryset)
+            transaction.set_rollback(True)
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in (Post, Comment, Like):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                    self.stdout.write(f"Dropped {index.name}")
+
+    def view_queryset(self, viewset, params, user):
+        """
+        Builds the page queryset `viewset` would run for a list request with `params`.
+        """
+        request = Request(self.factory.get("/", params))
+        request.user = user
+        view = viewset(action="list", request=request, format_kwarg=None, kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset.order_by("-created_time", "-id")[: self.page_size]
+
+    def get_cases(self, post):
+        latest = Post.objects.order_by("-created_time").values_list("created_time", flat=True).first()
+        window = {
+            "created_time__gte": (latest - datetime.timedelta(days=30)).isoformat(),
+            "created_time__lte": latest.isoformat(),
+        }
+        updated_window = {key.replace("created", "updated"): value for key, value in window.items()}
+        tag = Tag.objects.order_by("id").first()
+        comment = Comment.objects.filter(is_active=True, previous_comment__isnull=True).order_by("id").first()
+        post_ids = ",".join(str(pk) for pk in Post.objects.filter(is_active=True).values_list("id", flat=True)[:5])
+        post_type = ContentType.objects.get_for_model(Post)
+
+        anonymous, superuser = self.anonymous, self.superuser
+        cases = [
+            ("posts: anonymous", PostsViewSet, {}, anonymous),
+            ("posts: superuser", PostsViewSet, {}, superuser),
+            ("posts: superuser, is_active=false", PostsViewSet, {"is_active": "false"}, superuser),
+            ("posts: created_time range", PostsViewSet, window, anonymous),
+            ("posts: updated_time range", PostsViewSet, updated_window, anonymous),
+            ("posts: user", PostsViewSet, {"user": post.user_id}, anonymous),
+            ("comments: anonymous", CommentsViewSet, {}, anonymous),
+            ("comments: post", CommentsViewSet, {"post": post.pk}, anonymous),
+            ("comments: post__in", CommentsViewSet, {"post__in": post_ids}, anonymous),
+            ("comments: user", CommentsViewSet, {"user": post.user_id}, anonymous),
+            ("comments: created_time range", CommentsViewSet, window, anonymous),
+            ("likes: anonymous", LikesViewSet, {}, anonymous),
+            ("likes: user", LikesViewSet, {"user": post.user_id}, anonymous),
+            ("likes: created_time range", LikesViewSet, window, anonymous),
+        ]
+        if tag is not None:
+            cases.append(("posts: tags", PostsViewSet, {"tags": tag.pk}, anonymous))
+        if comment is not None:
+            cases.append(("comments: previous_comment", CommentsViewSet, {"previous_comment": comment.pk}, anonymous))
+
+        for label, viewset, params, user in cases:
+            yield label, self.view_queryset(viewset, params, user)
+        yield "likes: content object (counters)", Like.objects.filter(
+            content_type=post_type, object_id=post.pk, is_active=True, liked=True
+        )
+
+    def run_case(self, label, queryset):
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(label) + f"  median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms"
+        )
+        if self.explain:
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
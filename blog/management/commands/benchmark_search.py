@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, Comment
+from blog.search import SEARCH_RANK, get_search_backend, search_terms
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the latency of the ranked full-text search with the icontains filters for a few terms, "
+        "for the first page and for counting every match. Seed the database first with seed_blog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("terms", nargs="*", default=["django", "cach", "query index", "trending score"])
+        parser.add_argument("--repeat", type=int, default=10, help="Executions per query.")
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        page_size = options["page_size"]
+        backend = get_search_backend()
+        for term in options["terms"]:
+            terms = search_terms(term)
+            cases = [
+                (
+                    "posts title__icontains",
+                    Post.objects.filter(is_active=True, title__icontains=term).order_by("-created_time", "-id"),
+                ),
+                (
+                    "posts search",
+                    backend.search(Post.objects.filter(is_active=True), terms).order_by(f"-{SEARCH_RANK}", "-id"),
+                ),
+                (
+                    "comments comment_text__icontains",
+                    Comment.objects.filter(is_active=True, comment_text__icontains=term).order_by(
+                        "-created_time", "-id"
+                    ),
+                ),
+                (
+                    "comments search",
+                    backend.search(Comment.objects.filter(is_active=True), terms).order_by(f"-{SEARCH_RANK}", "-id"),
+                ),
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{term!r}"))
+            for label, queryset in cases:
+                self.run_case(f"{label} (first page)", lambda: len(list(queryset[:page_size])))
+                self.run_case(f"{label} (count)", queryset.count)
+
+    def run_case(self, label, execute):
+        """
+        Times `execute`, which runs the query and returns its number of rows.
+        """
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            rows = execute()
+            timings.append((time.perf_counter() - start) * 1000)
+        median, slowest = statistics.median(timings), max(timings)
+        self.stdout.write(f"  {label}: {rows} rows, median {median:.2f} ms, max {slowest:.2f} ms")
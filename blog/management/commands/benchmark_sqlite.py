@@ -0,0 +1,153 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import F
+
+from blog.benchmarks import percentile
+from blog.models import Post, Comment
+from users.models import CustomUser
+
+
+PROFILES = {
+    "sqlite": {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 0, "OPTIONS": {}},
+    "sqlite-production": settings.SQLITE_PRODUCTION,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the throughput of concurrent mixed read/write traffic on a new SQLite database for each "
+        "DATABASE_PROFILE. Each thread acts as a server worker: it reads a page of posts or adds a comment, "
+        "then closes or keeps its connection like Django does at the end of a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent workers.")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds of traffic per profile.")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of operations that write.")
+        parser.add_argument("--posts", type=int, default=1000, help="Posts in the database.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        results = []
+        for profile in options["profiles"]:
+            with tempfile.TemporaryDirectory() as directory:
+                alias = f"benchmark-{profile}"
+                self.add_database(alias, profile, os.path.join(directory, "benchmark.sqlite3"))
+                try:
+                    self.seed(alias)
+                    results.append({"profile": profile, **self.run(alias)})
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            errors = ", ".join(f"{count} x {error}" for error, count in result["errors"].items()) or "no errors"
+            self.stdout.write(
+                f"{result['profile']}: {result['operations_per_second']:.0f} ops/s "
+                f"({result['reads']} reads, {result['writes']} writes), "
+                f"read p99 {result['read_p99_ms']:.1f} ms, write p99 {result['write_p99_ms']:.1f} ms, {errors}"
+            )
+
+    def add_database(self, alias, profile, name):
+        configured = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                alias: {**PROFILES[profile], "NAME": name},
+            }
+        )
+        connections.settings[alias] = configured[alias]
+
+    def seed(self, alias):
+        call_command("migrate", database=alias, verbosity=0, interactive=False)
+        user = CustomUser.objects.db_manager(alias).create(username="benchmark")
+        Post.objects.using(alias).bulk_create(
+            Post(title=f"Post {index}", content="content " * 50, user=user, is_active=True)
+            for index in range(self.options["posts"])
+        )
+        self.post_ids = list(Post.objects.using(alias).values_list("pk", flat=True))
+        connections[alias].close()
+
+    def run(self, alias):
+        """
+        Runs the traffic on `alias` from `threads` workers for `duration` seconds.
+
+        Returns:
+        - dict: The operation counts, throughput, latency percentiles in
+          milliseconds and the errors by message.
+        """
+        deadline = time.perf_counter() + self.options["duration"]
+        timings = {"read": [], "write": []}
+        errors = Counter()
+        lock = threading.Lock()
+
+        def worker(seed):
+            generator = random.Random(seed)
+            local_timings = {"read": [], "write": []}
+            local_errors = Counter()
+            while time.perf_counter() < deadline:
+                kind = "write" if generator.random() < self.options["write_ratio"] else "read"
+                start = time.perf_counter()
+                try:
+                    getattr(self, kind)(alias, generator)
+                    local_timings[kind].append((time.perf_counter() - start) * 1000)
+                except OperationalError as exc:
+                    local_errors[str(exc)] += 1
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+            with lock:
+                for name, values in local_timings.items():
+                    timings[name].extend(values)
+                errors.update(local_errors)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(self.options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        reads, writes = timings["read"], timings["write"]
+        return {
+            "threads": self.options["threads"],
+            "reads": len(reads),
+            "writes": len(writes),
+            "operations_per_second": (len(reads) + len(writes)) / elapsed,
+            "read_p50_ms": statistics.median(reads) if reads else 0.0,
+            "read_p99_ms": percentile(reads, 0.99) if reads else 0.0,
+            "write_p50_ms": statistics.median(writes) if writes else 0.0,
+            "write_p99_ms": percentile(writes, 0.99) if writes else 0.0,
+            "errors": dict(errors),
+        }
+
+    def read(self, alias, generator):
+        posts = list(Post.objects.using(alias).filter(is_active=True).order_by("-id")[:20])
+        Comment.objects.using(alias).filter(post=generator.choice(posts)).count()
+
+    def write(self, alias, generator):
+        """
+        Adds a comment and updates its post's counter, reading the post first like
+        the API does.
+        """
+        with transaction.atomic(using=alias):
+            post = Post.objects.using(alias).only("id").get(pk=generator.choice(self.post_ids))
+            Comment.objects.using(alias).bulk_create(
+                [Comment(post=post, name="name", email="name@example.com", comment_text="text", is_active=True)]
+            )
+            Post.objects.using(alias).filter(pk=post.pk).update(comment_count=F("comment_count") + 1)
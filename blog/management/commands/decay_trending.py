@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog.trending import decay_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Decays the trending scores of posts to the current time and deletes the negligible ones. Run it "
+        "periodically (e.g. hourly from cron); --rebuild recomputes every score from likes and comments instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute the scores from the Like and Comment tables, e.g. after import_blog or seed_blog.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            self.stdout.write(f"{rebuild_scores()} score(s) rebuilt")
+        else:
+            decayed, deleted = decay_scores()
+            self.stdout.write(f"{decayed} score(s) decayed, {deleted} negligible score(s) deleted")
+        self.stdout.write(self.style.SUCCESS("Trending scores are up to date."))
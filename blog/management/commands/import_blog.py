@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.importing import IMPORT_BATCH_SIZE, BlogImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk loads users, tags, posts, comments and likes from NDJSON files (or CSV files when the name ends "
+        "with .csv). Posts and comments keep the ids of the source system only to link comments and likes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", help="Users: username, email, first_name, last_name.")
+        parser.add_argument("--tags", help="Tags: name.")
+        parser.add_argument("--posts", help="Posts: id, user (username), tags (names), title, content, ...")
+        parser.add_argument("--comments", help="Comments: id, post, previous_comment, user, name, email, ...")
+        parser.add_argument("--likes", help="Likes: content_type (post or comment), object_id, user, name, ...")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        importer = BlogImporter(batch_size=options["batch_size"])
+        start = time.perf_counter()
+        created = importer.run(
+            users=options["users"],
+            tags=options["tags"],
+            posts=options["posts"],
+            comments=options["comments"],
+            likes=options["likes"],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - start
+        for reason, count in sorted(importer.skipped.items()):
+            self.stdout.write(self.style.WARNING(f"Skipped {count} rows ({reason})."))
+        total = sum(created.values())
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s).")
+        )
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmarks import percentile
+
+
+class HTTPConnection:
+    """
+    A minimal keep-alive HTTP/1.1 client on asyncio streams, so a single process can
+    keep hundreds of requests in flight. It reconnects whenever the server closes
+    the connection (e.g. gunicorn sync workers).
+    """
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}", *self.headers, "", ""]
+        self.writer.write("\r\n".join(lines).encode("latin-1"))
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.lower()] = value.strip()
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+        self.reader = self.writer = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends concurrent GET requests to a running server and reports requests/sec and latency percentiles. "
+        "Run it against a WSGI and an ASGI deployment of the project to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Paths to request, e.g. /blog/posts/.")
+        parser.add_argument("--target", default="http://127.0.0.1:8000", help="Base URL of the server.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument("--requests", type=int, default=2000, help="Measured requests per path.")
+        parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests sent first per path.")
+        parser.add_argument(
+            "--header", action="append", default=[], help='Extra request header, e.g. "Authorization: Token ...".'
+        )
+        parser.add_argument("--label", default="", help="Name of the deployment, included in the results.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        target = urlsplit(options["target"])
+        if target.scheme != "http" or not target.hostname:
+            raise CommandError("--target must be an http:// URL.")
+        self.host = target.hostname
+        self.port = target.port or 80
+        self.headers = options["header"]
+        self.concurrency = options["concurrency"]
+
+        results = []
+        for path in options["paths"]:
+            try:
+                asyncio.run(self.run(path, options["warmup"]))
+                result = asyncio.run(self.run(path, options["requests"]))
+            except OSError as exc:
+                raise CommandError(f"Could not reach {options['target']}: {exc}")
+            results.append({"label": options["label"], "path": path, **result})
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f"{result['label'] or options['target']} {result['path']}: "
+                f"{result['requests_per_second']:.0f} req/s, p50 {result['p50_ms']:.2f} ms, "
+                f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms, {result['errors']} errors"
+            )
+
+    async def run(self, path, total):
+        """
+        Sends `total` requests for `path` from `concurrency` connections.
+
+        Returns:
+        - dict: The throughput, latency percentiles in milliseconds and error count.
+        """
+        remaining = iter(range(total))
+        timings, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            connection = HTTPConnection(self.host, self.port, self.headers)
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    status = await connection.get(path)
+                except (asyncio.IncompleteReadError, ConnectionError, IndexError, ValueError):
+                    await connection.close()
+                    status = None
+                timings.append((time.perf_counter() - start) * 1000)
+                if status is None or status >= 400:
+                    errors += 1
+            await connection.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        return {
+            "requests": total,
+            "concurrency": self.concurrency,
+            "requests_per_second": total / elapsed if elapsed else 0.0,
+            "p50_ms": statistics.median(timings) if timings else 0.0,
+            "p99_ms": percentile(timings, 0.99) if timings else 0.0,
+            "max_ms": max(timings, default=0.0),
+            "errors": errors,
+        }
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+
+from blog.images import file_digest, process_images
+from blog.models import GalleryImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the cleaned originals and resized renditions of gallery images in the worker process pool: "
+        "pending images by default (e.g. uploaded before the pipeline existed, or interrupted by a restart)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--failed", action="store_true", help="Also retry images that failed.")
+        parser.add_argument(
+            "--all", action="store_true", help="Regenerate every image, e.g. after changing RENDITIONS."
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        queryset = GalleryImage.objects.order_by("pk")
+        if not options["all"]:
+            statuses = [GalleryImage.Status.PENDING]
+            if options["failed"]:
+                statuses.append(GalleryImage.Status.FAILED)
+            queryset = queryset.filter(status__in=statuses)
+
+        start = time.perf_counter()
+        processed = ready = 0
+        batch = []
+        for image in queryset.iterator(chunk_size=options["batch_size"]):
+            if image.sha256 is None and not self.hash_image(image):
+                continue
+            batch.append(image)
+            if len(batch) == options["batch_size"]:
+                ready += process_images(batch)
+                processed += len(batch)
+                batch = []
+        ready += process_images(batch)
+        processed += len(batch)
+
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {processed} image(s), {ready} ready, in {elapsed:.1f}s ({rate:.1f}/s).")
+        )
+
+    def hash_image(self, image):
+        """
+        Stores the content hash of an image uploaded before hashes were recorded.
+        Duplicates of another image are reported and skipped.
+        """
+        with image.file_name.open("rb") as file:
+            image.sha256 = file_digest(file)
+        try:
+            image.save(update_fields=["sha256"])
+        except IntegrityError:
+            self.stderr.write(f"Image {image.pk} duplicates image {GalleryImage.objects.get(sha256=image.sha256).pk}.")
+            return False
+        return True
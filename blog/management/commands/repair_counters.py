@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized like_count and comment_count columns from the Like and Comment tables."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = repair_counters()
+        for label, count in repaired.items():
+            self.stdout.write(f"{label}: {count} row(s) repaired")
+        self.stdout.write(self.style.SUCCESS("Counters are up to date."))
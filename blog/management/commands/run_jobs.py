@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs, such as notification emails, until interrupted. "
+        "Several workers may run at once: each job is claimed by a single worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Handlers running at once.")
+        parser.add_argument(
+            "--batch-size", type=int, default=50, help="Jobs of one kind per handler call, e.g. emails per connection."
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when no job is due.")
+        parser.add_argument("--once", action="store_true", help="Exit once no job is due instead of polling.")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options["concurrency"], batch_size=options["batch_size"])
+        start = time.perf_counter()
+        processed = 0
+        try:
+            while True:
+                claimed = worker.run_once()
+                processed += claimed
+                if claimed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} job(s) in {elapsed:.1f}s."))
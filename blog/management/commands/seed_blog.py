@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.seeding import BlogSeeder
+
+
+class Command(BaseCommand):
+    help = "Fills the database with deterministic synthetic users, tags, posts, comments and likes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--likes", type=int, default=10000)
+        parser.add_argument("--images", type=int, default=0)
+        parser.add_argument("--deep-threads", type=int, default=0, help="Posts with a chain of nested replies.")
+        parser.add_argument("--deep-thread-depth", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        seeder = BlogSeeder(
+            users=options["users"],
+            tags=options["tags"],
+            posts=options["posts"],
+            comments=options["comments"],
+            likes=options["likes"],
+            images=options["images"],
+            deep_threads=options["deep_threads"],
+            deep_thread_depth=options["deep_thread_depth"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+        )
+        start = time.perf_counter()
+        created = seeder.run(log=self.stdout.write)
+        elapsed = time.perf_counter() - start
+        total = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)."))
@@ -0,0 +1,323 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+from rest_framework.views import APIView
+
+from .permissions import IsSuperuserUser
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_LOG_QUERIES = 20
+
+_collector = ContextVar("metrics_collector", default=None)
+
+
+def get_slow_request_ms():
+    return getattr(settings, "SLOW_REQUEST_LOG_MS", None)
+
+
+class RequestMetrics:
+    """
+    What one request spent on the database, on serialization and in the cache.
+    The SQL of each query is only kept when the slow request log is enabled.
+    """
+
+    def __init__(self, keep_queries=False):
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.cache = Counter()
+        self.queries = [] if keep_queries else None
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Per-route metrics of this process. Like the cache statistics, every server
+    process keeps its own; Prometheus adds them up across the scraped processes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.requests = Counter()
+            self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+            self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.query_seconds = Counter()
+            self.serialization_seconds = Counter()
+            self.cache = Counter()
+
+    def record(self, route, method, status, seconds, metrics):
+        with self.lock:
+            self.requests[(route, method, str(status))] += 1
+            self.latency[route].observe(seconds)
+            self.query_counts[route].observe(metrics.query_count)
+            self.query_seconds[route] += metrics.query_seconds
+            self.serialization_seconds[route] += metrics.serialization_seconds
+            for result, count in metrics.cache.items():
+                self.cache[(route, result)] += count
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            lines = []
+            self.render_counter(
+                lines,
+                "blog_requests_total",
+                "Requests by route, method and status.",
+                ("route", "method", "status"),
+                self.requests,
+            )
+            self.render_histogram(lines, "blog_request_duration_seconds", "Request latency by route.", self.latency)
+            self.render_histogram(lines, "blog_db_queries", "Database queries per request by route.", self.query_counts)
+            self.render_counter(
+                lines,
+                "blog_db_query_seconds_total",
+                "Time spent in database queries by route.",
+                ("route",),
+                self.query_seconds,
+            )
+            self.render_counter(
+                lines,
+                "blog_serialization_seconds_total",
+                "Time spent serializing responses by route.",
+                ("route",),
+                self.serialization_seconds,
+            )
+            self.render_counter(
+                lines,
+                "blog_cache_requests_total",
+                "Response cache lookups by route and result.",
+                ("route", "result"),
+                self.cache,
+            )
+        return "\n".join(lines) + "\n"
+
+    def render_counter(self, lines, name, help, label_names, values):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{name}{{{format_labels(zip(label_names, key))}}} {format_value(value)}")
+
+    def render_histogram(self, lines, name, help, histograms):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+        for route, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                labels = format_labels([("route", route), ("le", format_value(bound))])
+                lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+            labels = format_labels([("route", route)])
+            lines.append(f"{name}_sum{{{labels}}} {format_value(histogram.sum)}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+def format_labels(labels):
+    return ",".join(f'{name}="{escape_label(value)}"' for name, value in labels)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+def record_cache(result):
+    metrics = _collector.get()
+    if metrics is not None:
+        metrics.cache[result] += 1
+
+
+def record_serialization(seconds):
+    metrics = _collector.get()
+    if metrics is not None:
+        metrics.serialization_seconds += seconds
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the queries and their time for the request
+    being measured in the current context. Other queries pass straight through.
+    """
+    metrics = _collector.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.query_count += 1
+        metrics.query_seconds += seconds
+        if metrics.queries is not None:
+            metrics.queries.append((seconds, sql))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Connections are reopened on the same wrapper, which keeps its execute wrappers.
+    # Inserted first, so connection.execute_wrapper() blocks still pop their own.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in `to_representation` to the serialization time of the
+    current request. Only the outermost serializer (or each item of an outermost
+    `many=True` list) is timed, so nested serializers aren't counted twice.
+    """
+
+    def to_representation(self, instance):
+        metrics = _collector.get()
+        parent = self.parent
+        if metrics is None or not (parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)):
+            return super().to_representation(instance)
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialization_seconds += time.perf_counter() - start
+
+
+def get_route(request):
+    """
+    Names the route of `request` after the router basename and viewset action,
+    e.g. "posts.list", or the URL name of other views. Requests that match no URL
+    share the "unmatched" route, so scanners can't create unbounded series.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    actions = getattr(match.func, "actions", None)
+    basename = getattr(match.func, "initkwargs", {}).get("basename")
+    if actions and basename:
+        method = request.method.lower()
+        action = actions.get(method) or (actions.get("get") if method == "head" else None) or method
+        return f"{basename}.{action}"
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Measures every request: latency, database queries and their time,
+    serialization time and response cache hits, recorded per route in `registry`.
+
+    When SLOW_REQUEST_LOG_MS is set, requests slower than that many milliseconds
+    are logged as warnings with their route and the SQL of their slowest queries.
+
+    Works under WSGI and ASGI without making async views run in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _collector.reset(token)
+        self.finish(request, response, metrics, start)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _collector.reset(token)
+        self.finish(request, response, metrics, start)
+        return response
+
+    def start(self):
+        metrics = RequestMetrics(keep_queries=get_slow_request_ms() is not None)
+        return metrics, _collector.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        seconds = time.perf_counter() - start
+        route = get_route(request)
+        registry.record(route, request.method, response.status_code, seconds, metrics)
+        threshold = get_slow_request_ms()
+        if threshold is not None and seconds * 1000 >= threshold:
+            log_slow_request(request, route, seconds, metrics)
+
+
+def log_slow_request(request, route, seconds, metrics):
+    slowest = sorted(metrics.queries, key=lambda query: query[0], reverse=True)[:SLOW_LOG_QUERIES]
+    queries = "".join(f"\n  {query_seconds * 1000:.1f} ms: {sql}" for query_seconds, sql in slowest)
+    logger.warning(
+        "Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, serialization %.1f ms%s",
+        request.method,
+        request.get_full_path(),
+        route,
+        seconds * 1000,
+        metrics.query_count,
+        metrics.query_seconds * 1000,
+        metrics.serialization_seconds * 1000,
+        queries,
+    )
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return "\n".join(f"{key}: {value}" for key, value in data.items()).encode(self.charset)
+
+
+class MetricsView(APIView):
+    """
+    Returns the metrics of this process in the Prometheus text format.
+    """
+
+    permission_classes = [IsSuperuserUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+def add_midnight_to_sqlite_dates(apps, schema_editor):
+    # SQLite keeps the existing "YYYY-MM-DD" text when the column type changes.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table in ("blog_post", "blog_comment", "blog_like"):
+        schema_editor.execute(
+            f"UPDATE {table} SET updated_time = updated_time || ' 00:00:00' WHERE length(updated_time) = 10"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(add_midnight_to_sqlite_dates, migrations.RunPython.noop),
+    ]
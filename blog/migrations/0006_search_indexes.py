@@ -0,0 +1,101 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import blog.models
+
+
+# Indexed columns of each model, by decreasing relevance weight.
+SEARCH_MODELS = {
+    "Post": ("title", "content"),
+    "Comment": ("comment_text",),
+}
+
+
+def sqlite_statements(table, columns):
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')",
+        f"""CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});
+        END""",
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def postgresql_statement(table, columns):
+    # The expression PostgreSQLSearchBackend.get_vector compiles to, so the planner
+    # uses the index: the first column gets weight A, the next one B, and so on.
+    vector = " || ".join(
+        f"setweight(to_tsvector('english'::regconfig, COALESCE({column}, '')), '{'ABCD'[min(position, 3)]}')"
+        for position, column in enumerate(columns)
+    )
+    return f"CREATE INDEX {table}_search_idx ON {table} USING gin (({vector}))"
+
+
+def search_tables(apps):
+    for model_name, columns in SEARCH_MODELS.items():
+        yield apps.get_model("blog", model_name)._meta.db_table, columns
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, columns in search_tables(apps):
+        if vendor == "sqlite":
+            for statement in sqlite_statements(table, columns):
+                schema_editor.execute(statement)
+        elif vendor == "postgresql":
+            schema_editor.execute(postgresql_statement(table, columns))
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, _ in search_tables(apps):
+        if vendor == "sqlite":
+            for suffix in ("insert", "delete", "update"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_updated_time_datetime'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.CreateModel(
+            name='CommentSearchIndex',
+            fields=[
+                ('comment', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='blog.comment')),
+                ('document', blog.models.SearchDocumentField(db_column='blog_comment_fts')),
+            ],
+            options={
+                'db_table': 'blog_comment_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='blog.post')),
+                ('document', blog.models.SearchDocumentField(db_column='blog_post_fts')),
+            ],
+            options={
+                'db_table': 'blog_post_fts',
+                'managed': False,
+            },
+        ),
+    ]
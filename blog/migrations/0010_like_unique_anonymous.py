@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 19:21
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+COUNTED_MODELS = ("post", "comment")
+
+
+def remove_duplicate_anonymous_likes(apps, schema_editor):
+    # Keeps the latest anonymous like of each email on each object, and recounts
+    # the like_count of the posts and comments that lost one.
+    Like = apps.get_model("blog", "Like")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    db = schema_editor.connection.alias
+    anonymous = Like.objects.using(db).filter(user__isnull=True)
+    duplicates = (
+        anonymous.order_by()
+        .values("email", "content_type", "object_id")
+        .annotate(count=Count("pk"), latest=Max("pk"))
+        .filter(count__gt=1)
+    )
+    for group in list(duplicates):
+        key = {"email": group["email"], "content_type": group["content_type"], "object_id": group["object_id"]}
+        anonymous.filter(**key).exclude(pk=group["latest"]).delete()
+        content_type = ContentType.objects.using(db).get(pk=group["content_type"])
+        if content_type.app_label == "blog" and content_type.model in COUNTED_MODELS:
+            likes = Like.objects.using(db).filter(
+                content_type=content_type, object_id=group["object_id"], is_active=True, liked=True
+            )
+            model = apps.get_model("blog", content_type.model)
+            model.objects.using(db).filter(pk=group["object_id"]).update(like_count=likes.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_score'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_anonymous_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('email', 'content_type', 'object_id'), name='unique_anonymous_like'),
+        ),
+    ]
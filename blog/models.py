@@ -1,6 +1,7 @@
 import os
 
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
@@ -12,7 +13,17 @@ def content_file_name(instance, filename):
 
 
 class GalleryImage(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        READY = "ready"
+        FAILED = "failed"
+
     file_name = models.FileField(upload_to=content_file_name)
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return str(self.file_name)
@@ -33,8 +44,24 @@ class Post(models.Model):
     tags = models.ManyToManyField(Tag, blank=True)
     allow_comments = models.BooleanField(default=True)
     is_active = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
     created_time = models.DateField(auto_now=False, auto_now_add=True)
-    updated_time = models.DateField(auto_now=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_time", "id"], name="post_created_idx"),
+            models.Index(
+                fields=["created_time", "id"], name="post_active_created_idx", condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=["updated_time", "id"], name="post_active_updated_idx", condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=["user", "created_time", "id"], name="post_active_user_idx", condition=models.Q(is_active=True)
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -48,8 +75,32 @@ class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     previous_comment = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True)
     is_active = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
     created_time = models.DateField(auto_now=False, auto_now_add=True)
-    updated_time = models.DateField(auto_now=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_time", "id"], name="comment_created_idx"),
+            models.Index(
+                fields=["created_time", "id"], name="comment_active_created_idx", condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=["post", "created_time", "id"],
+                name="comment_active_post_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["previous_comment", "created_time", "id"],
+                name="comment_active_reply_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["user", "created_time", "id"],
+                name="comment_active_user_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.comment_text
@@ -65,12 +116,128 @@ class Like(models.Model):
     content = GenericForeignKey("content_type", "object_id")
     is_active = models.BooleanField(default=False)
     created_time = models.DateField(auto_now=False, auto_now_add=True)
-    updated_time = models.DateField(auto_now=True)
+    updated_time = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["user", "content_type", "object_id"], name="unique_like"),
+            models.UniqueConstraint(
+                fields=["email", "content_type", "object_id"],
+                name="unique_anonymous_like",
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["content_type", "object_id"], name="like_content_idx"),
+            models.Index(fields=["created_time", "id"], name="like_created_idx"),
+            models.Index(
+                fields=["created_time", "id"], name="like_active_created_idx", condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=["user", "created_time", "id"], name="like_active_user_idx", condition=models.Q(is_active=True)
+            ),
         ]
 
     def __str__(self):
         return str(self.object_id)
+
+
+class PostScore(models.Model):
+    """
+    The trending score of a post: its likes and comments, each decayed by half every
+    TRENDING_HALF_LIFE_HOURS since it was made (see blog/trending.py). `score` is
+    the value at `decayed_at`, which the `decay_trending` command moves forward.
+    """
+
+    post = models.OneToOneField(Post, primary_key=True, on_delete=models.CASCADE, related_name="trending_score")
+    score = models.FloatField(default=0.0)
+    decayed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["score", "post"], name="post_score_idx"),
+            models.Index(fields=["decayed_at"], name="post_score_decayed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id}: {self.score}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work run by the `run_jobs` worker (see blog/jobs.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    claim = models.UUIDField(null=True, blank=True, editable=False)
+    locked_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run_at", "id"], name="job_pending_idx", condition=models.Q(status="pending")),
+            models.Index(fields=["claim"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+
+class SearchDocumentField(models.TextField):
+    """
+    The hidden column of an FTS5 table, named after the table, which MATCH queries
+    and ranking functions such as bm25 take.
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """
+    The SQLite FTS5 index of posts, created and kept in sync by migration 0006.
+    """
+
+    post = models.OneToOneField(
+        Post, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING, related_name="search_index"
+    )
+    document = SearchDocumentField(db_column="blog_post_fts")
+
+    class Meta:
+        managed = False
+        db_table = "blog_post_fts"
+
+
+class CommentSearchIndex(models.Model):
+    """
+    The SQLite FTS5 index of comments, created and kept in sync by migration 0006.
+    """
+
+    comment = models.OneToOneField(
+        Comment, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING, related_name="search_index"
+    )
+    document = SearchDocumentField(db_column="blog_comment_fts")
+
+    class Meta:
+        managed = False
+        db_table = "blog_comment_fts"
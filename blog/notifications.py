@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from .jobs import enqueue, enqueue_many, job_handler, send_messages
+from .models import Post, Comment, Like
+
+
+# Enqueue helpers, called in the transaction of the change they notify about.
+
+
+def post_approved(posts):
+    enqueue_many("notify_post_approved", [{"post": post.pk} for post in posts])
+
+
+def comment_approved(comments):
+    enqueue_many("notify_comment_approved", [{"comment": comment.pk} for comment in comments])
+
+
+def comment_created(comment):
+    enqueue("notify_comment_created", {"comment": comment.pk})
+
+
+def like_created(like):
+    enqueue("notify_like_created", {"like": like.pk})
+
+
+def message(recipient, subject, body):
+    """
+    Builds a notification email, or returns None when there is no recipient address.
+    """
+    if not recipient:
+        return None
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient])
+
+
+@job_handler("notify_post_approved", batch=True)
+def send_post_approved(payloads):
+    posts = Post.objects.select_related("user").in_bulk([payload["post"] for payload in payloads])
+    messages = []
+    for payload in payloads:
+        post = posts.get(payload["post"])
+        if post is None:
+            messages.append(None)
+            continue
+        messages.append(message(post.user.email, "Your post was approved", f'Your post "{post.title}" is now public.'))
+    return send_messages(messages)
+
+
+@job_handler("notify_comment_approved", batch=True)
+def send_comment_approved(payloads):
+    comments = Comment.objects.select_related("post", "user").in_bulk([payload["comment"] for payload in payloads])
+    messages = []
+    for payload in payloads:
+        comment = comments.get(payload["comment"])
+        if comment is None:
+            messages.append(None)
+            continue
+        body = f'Your comment on "{comment.post.title}" is now public.'
+        recipient = comment.email or (comment.user.email if comment.user else "")
+        messages.append(message(recipient, "Your comment was approved", body))
+    return send_messages(messages)
+
+
+@job_handler("notify_comment_created", batch=True)
+def send_comment_created(payloads):
+    comments = Comment.objects.select_related("post__user").in_bulk([payload["comment"] for payload in payloads])
+    messages = []
+    for payload in payloads:
+        comment = comments.get(payload["comment"])
+        if comment is None or comment.user_id == comment.post.user_id:
+            messages.append(None)
+            continue
+        messages.append(
+            message(
+                comment.post.user.email,
+                "New comment on your post",
+                f'{comment.name} commented on "{comment.post.title}":\n\n{comment.comment_text}',
+            )
+        )
+    return send_messages(messages)
+
+
+@job_handler("notify_like_created", batch=True)
+def send_like_created(payloads):
+    likes = Like.objects.select_related("content_type").in_bulk([payload["like"] for payload in payloads])
+    owners = {}
+    for model in (Post, Comment):
+        ids = [like.object_id for like in likes.values() if like.content_type.model_class() is model]
+        related = ("user",) if model is Post else ("user", "post")
+        owners[model] = model.objects.select_related(*related).in_bulk(ids)
+
+    messages = []
+    for payload in payloads:
+        like = likes.get(payload["like"])
+        content = like and owners.get(like.content_type.model_class(), {}).get(like.object_id)
+        if content is None or not like.liked or (like.user_id and like.user_id == content.user_id):
+            messages.append(None)
+            continue
+        if isinstance(content, Post):
+            recipient, subject = content.user.email, f'{like.name} liked your post "{content.title}"'
+        else:
+            recipient = content.user.email if content.user else content.email
+            subject = f'{like.name} liked your comment on "{content.post.title}"'
+        messages.append(message(recipient, subject, subject + "."))
+    return send_messages(messages)
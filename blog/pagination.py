@@ -0,0 +1,213 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .asynchronous import afetch
+from .search import SEARCH_RANK
+
+# The widest integer every database backend can bind; SQLite reports no range for
+# its integer fields but fails to bind larger ones.
+MAX_KEY_INTEGER = 2**63 - 1
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination ordered newest first on `key_fields`.
+
+    Pages are located with a `WHERE (created_time, id) < (...)` comparison instead
+    of OFFSET, so the cost of fetching a page does not grow with its depth and rows
+    inserted while a client is paging never shift or duplicate results.
+
+    When the queryset was ranked by FullTextSearchFilter, pages are ordered by
+    (search_rank, id) instead, most relevant first.
+
+    Viewsets may override `page_size` and `max_page_size` by declaring attributes
+    with the same names.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 100
+    key_fields = ("created_time", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the page of `queryset` addressed by the request cursor.
+
+        Args:
+        - queryset (QuerySet): The filtered queryset of the view.
+        - request (Request): The HTTP request object.
+        - view (APIView, optional): The view being paginated.
+
+        Returns:
+        - list: The objects of the current page, newest first.
+        """
+        window = self.get_window(queryset, request, view)
+        return self.paginate_window_rows(list(window), request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async version of `paginate_queryset`, fetching the page with the async ORM.
+        """
+        window = self.get_window(queryset, request, view)
+        return self.paginate_window_rows(await afetch(window), request)
+
+    def paginate_window_rows(self, results, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.key is not None
+
+        self.page = results
+        return results
+
+    def get_window(self, queryset, request, view=None):
+        """
+        Returns the sliced queryset of the `page_size + 1` rows the request cursor
+        points at, the extra row telling whether there is another page.
+
+        Args:
+        - queryset (QuerySet): The filtered queryset of the view.
+        - request (Request): The HTTP request object.
+        - view (APIView, optional): The view being paginated.
+
+        Returns:
+        - QuerySet: The ordered and sliced queryset of the page window.
+        """
+        self.page_size = self.get_page_size(request, view)
+        self.key_fields = self.get_key_fields(queryset)
+        self.key, self.reverse = self.decode_cursor(request, queryset)
+
+        descending = [f"-{field}" for field in self.key_fields]
+        ascending = list(self.key_fields)
+        queryset = queryset.order_by(*(ascending if self.reverse else descending))
+        if self.key is not None:
+            queryset = queryset.filter(self.build_seek_filter(self.key, self.reverse))
+        return queryset[: self.page_size + 1]
+
+    def get_key_fields(self, queryset):
+        if SEARCH_RANK in queryset.query.annotations:
+            return (SEARCH_RANK, "id")
+        return type(self).key_fields
+
+    def build_seek_filter(self, key, reverse):
+        """
+        Builds the row-value comparison `(f1, f2, ...) < (v1, v2, ...)` as a Q object.
+
+        Args:
+        - key (list): The decoded values of `key_fields` stored in the cursor.
+        - reverse (bool): Whether to seek towards newer rows (`>`) instead of older ones.
+
+        Returns:
+        - Q: The filter selecting the rows after the cursor position.
+        """
+        lookup = "gt" if reverse else "lt"
+        condition = Q()
+        for index, field in enumerate(self.key_fields):
+            equal = {name: value for name, value in zip(self.key_fields[:index], key[:index])}
+            condition |= Q(**equal, **{f"{field}__{lookup}": key[index]})
+        return condition
+
+    def get_page_size(self, request, view=None):
+        page_size = getattr(view, "page_size", None) or self.page_size
+        max_page_size = getattr(view, "max_page_size", None) or self.max_page_size
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                page_size = requested
+        except (KeyError, ValueError):
+            pass
+        return min(page_size or max_page_size, max_page_size)
+
+    def decode_cursor(self, request, queryset):
+        """
+        Decodes the opaque cursor sent by the client. Cursors that don't decode to
+        valid key values, including out of range ids, are rejected with a 400.
+
+        Args:
+        - request (Request): The HTTP request object.
+        - queryset (QuerySet): The queryset whose key fields or annotations are stored in the cursor.
+
+        Returns:
+        - tuple: The key values (or None for the first page) and the reverse flag.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            raw_key = json.loads(tokens["k"][0])
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+            if len(raw_key) != len(self.key_fields):
+                raise ValueError
+            key = [
+                self.get_key_field(queryset, name).clean(value, None) for name, value in zip(self.key_fields, raw_key)
+            ]
+            if any(isinstance(value, int) and abs(value) > MAX_KEY_INTEGER for value in key):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise ParseError(self.invalid_cursor_message)
+        return key, reverse
+
+    def get_key_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, obj, reverse):
+        # Pages of values() querysets hold dicts.
+        key = [obj[field] if isinstance(obj, dict) else getattr(obj, field) for field in self.key_fields]
+        tokens = {"k": json.dumps([str(value) for value in key])}
+        if reverse:
+            tokens["r"] = "1"
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
@@ -29,6 +29,16 @@ class IsSuperuser(permissions.BasePermission):
             return False
 
 
+class IsSuperuserUser(permissions.BasePermission):
+    """
+    Allows access only to superusers, for every method, like DRF's IsAdminUser does
+    for staff users.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    The select_related/prefetch_related/only calls needed to serialize a queryset
+    without issuing one query per row.
+    """
+
+    select_related: tuple = field(default_factory=tuple)
+    prefetch_related: tuple = field(default_factory=tuple)
+    only: tuple = None
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+@lru_cache(maxsize=None)
+def build_query_plan(serializer_class):
+    """
+    Derives a QueryPlan from the readable fields declared by a ModelSerializer.
+
+    - Dotted sources such as `user.username` follow forward foreign keys with
+      select_related and restrict the joined columns with only().
+    - Many-related fields and nested `many=True` serializers are prefetched.
+    - Primary key related fields only need the local `<name>_id` column.
+    - Any source that cannot be mapped onto concrete columns (methods, properties,
+      nested serializers) disables the only() restriction so nothing is deferred.
+
+    Args:
+    - serializer_class (type): A ModelSerializer subclass.
+
+    Returns:
+    - QueryPlan: The plan for querysets serialized by `serializer_class`.
+    """
+    model = serializer_class.Meta.model
+    select_related, prefetch_related, only = set(), set(), set()
+    restrict_columns = True
+
+    for serializer_field in serializer_class().fields.values():
+        if serializer_field.write_only:
+            continue
+        if serializer_field.source == "*":
+            restrict_columns = False
+            continue
+        path = "__".join(serializer_field.source_attrs)
+        if isinstance(serializer_field, (ManyRelatedField, serializers.ListSerializer)):
+            prefetch_related.add(path)
+            continue
+
+        related = _forward_relations(model, serializer_field.source_attrs)
+        if related is None:
+            restrict_columns = False
+            continue
+        select_related.update(related)
+        if isinstance(serializer_field, serializers.BaseSerializer):
+            select_related.add(path)
+            restrict_columns = False
+        elif isinstance(serializer_field, RelatedField) and not serializer_field.use_pk_only_optimization():
+            select_related.add(path)
+            restrict_columns = False
+        else:
+            only.add(path)
+    only.update(select_related)
+
+    return QueryPlan(
+        select_related=tuple(sorted(select_related)),
+        prefetch_related=tuple(sorted(prefetch_related)),
+        only=tuple(sorted(only)) if restrict_columns else None,
+    )
+
+
+def _forward_relations(model, attrs):
+    """
+    Resolves `attrs` against `model`, returning the select_related paths crossed on
+    the way, or None when the path leaves concrete columns or forward relations.
+    """
+    relations = []
+    for index, attr in enumerate(attrs):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        if index < len(attrs) - 1:
+            if not (model_field.many_to_one or model_field.one_to_one):
+                return None
+            relations.append("__".join(attrs[: index + 1]))
+            model = model_field.related_model
+    return relations
+
+
+class QueryPlanMixin:
+    """
+    Applies the QueryPlan of the action's serializer to `get_queryset`.
+
+    Viewsets list the actions whose responses are serialized from the queryset in
+    `query_plan_actions` and pass their base queryset through `plan_queryset`.
+    """
+
+    query_plan_actions = ("list", "retrieve")
+
+    def get_query_plan(self):
+        if self.action not in self.query_plan_actions:
+            return None
+        return build_query_plan(self.get_serializer_class())
+
+    def plan_queryset(self, queryset):
+        plan = self.get_query_plan()
+        return plan.apply(queryset) if plan is not None else queryset
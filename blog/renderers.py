@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ValuesJSONRenderer(JSONRenderer):
+    """
+    Renders the responses of `ValuesReadMixin` actions with orjson when it is
+    installed, producing the same bytes as JSONRenderer: compact separators, UTF-8
+    text and escaped U+2028 and U+2029. Other responses, browsable API requests
+    asking for indentation and data orjson can't encode (e.g. integer keys) are
+    rendered by JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if not self.uses_orjson(data, accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME, default=self.encoder_class().default)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+    def uses_orjson(self, data, accepted_media_type, renderer_context):
+        get_values_representation = getattr(renderer_context.get("view"), "get_values_representation", None)
+        return (
+            orjson is not None
+            and data is not None
+            and get_values_representation is not None
+            and get_values_representation() is not None
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
@@ -0,0 +1,68 @@
+"""
+Image work executed in the gallery worker processes (see blog/images.py).
+
+Nothing here touches Django, so worker processes only need to import Pillow.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+ORIGINAL_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+KEPT_INFO = ("icc_profile", "transparency")
+
+
+def save_atomically(image, path, format, **options):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    image.save(temporary, format=format, **options)
+    os.replace(temporary, path)
+
+
+def render_image(media_root, source, destination, sizes, quality):
+    """
+    Writes the cleaned original and the WebP renditions of an image.
+
+    The original is rotated according to its EXIF orientation and saved again in
+    its own format without EXIF, XMP or text metadata (the ICC profile is kept).
+    Each rendition fits within a square of its size and is never upscaled.
+
+    Args:
+    - media_root (str): The absolute MEDIA_ROOT.
+    - source (str): The image path, relative to media_root.
+    - destination (str): The path of the cleaned original without extension,
+      relative to media_root; renditions are written next to it.
+    - sizes (dict): The maximum width and height of each rendition, by name.
+    - quality (int): The WebP quality of the renditions.
+
+    Returns:
+    - dict: The `file_name`, `width` and `height` of the cleaned original, and the
+      paths of the `renditions` by name, relative to media_root.
+    """
+    with Image.open(os.path.join(media_root, source)) as opened:
+        format = opened.format
+        transposed = ImageOps.exif_transpose(opened)
+        image = transposed if transposed is not None else opened
+        image.load()
+        info = {key: image.info[key] for key in KEPT_INFO if key in image.info}
+        image.info = dict(info)
+
+        file_name = f"{destination}{ORIGINAL_FORMATS[format]}"
+        options = {"icc_profile": info.get("icc_profile")} if "icc_profile" in info else {}
+        if format == "JPEG":
+            options["quality"] = "keep" if image is opened else 90
+        elif format == "WEBP":
+            options["lossless"] = opened.info.get("lossless", False)
+            options["quality"] = 90
+        save_atomically(image, os.path.join(media_root, file_name), format, **options)
+
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in info or "A" in image.mode else "RGB")
+        renditions = {}
+        for name, size in sizes.items():
+            rendition = image.copy()
+            rendition.thumbnail((size, size), Image.LANCZOS)
+            renditions[name] = f"{destination}-{name}.webp"
+            save_atomically(rendition, os.path.join(media_root, renditions[name]), "WEBP", quality=quality, method=4)
+
+        return {"file_name": file_name, "width": image.width, "height": image.height, "renditions": renditions}
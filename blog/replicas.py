@@ -0,0 +1,126 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = "replica_pin"
+PIN_CACHE_ALIAS = "default"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def get_replicas():
+    return getattr(settings, "READ_REPLICAS", ())
+
+
+def get_pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Routes the reads made in the block to a read replica, or to the primary when
+    `enabled` is False (e.g. to compute a response that will be cached).
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads made inside `replica_reads()` to a random alias of READ_REPLICAS
+    and everything else to the primary. Migrations only run on the primary.
+    """
+
+    def choose_replica(self):
+        return random.choice(get_replicas())
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and get_replicas():
+            return self.choose_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+def pin_cache_key(user):
+    return f"replica-pin:{user.pk}"
+
+
+def is_pinned(request):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    return request.user.is_authenticated and caches[PIN_CACHE_ALIAS].get(pin_cache_key(request.user)) is not None
+
+
+def pin_to_primary(request, response):
+    """
+    Makes the next reads of the client and of its user use the primary for
+    REPLICA_PIN_SECONDS, so they see their own writes even if the replicas lag.
+    The cookie covers anonymous clients; the cache entry covers clients that don't
+    keep cookies and the other devices of the user.
+    """
+    seconds = get_pin_seconds()
+    response.set_cookie(PIN_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax")
+    if request.user.is_authenticated:
+        caches[PIN_CACHE_ALIAS].set(pin_cache_key(request.user), True, seconds)
+
+
+class ReplicaReadMixin:
+    """
+    Serves the `replica_actions` of a viewset from the read replicas, unless the
+    client is pinned to the primary because it wrote something recently.
+    Successful writes through the viewset pin the client.
+
+    Replica reads start once `initial` has authenticated the request and end with
+    the dispatch, including when the view raises.
+    """
+
+    replica_actions = ("list", "retrieve", "export")
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            self.end_replica_reads()
+
+    async def adispatch(self, request, *args, **kwargs):
+        try:
+            return await super().adispatch(request, *args, **kwargs)
+        finally:
+            self.end_replica_reads()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if get_replicas() and self.action in self.replica_actions and not is_pinned(request):
+            self.replica_token = _replica_reads.set(True)
+
+    def end_replica_reads(self):
+        token = getattr(self, "replica_token", None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self.replica_token = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if get_replicas() and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            pin_to_primary(request, response)
+        return response
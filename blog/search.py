@@ -0,0 +1,116 @@
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Value
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post, Comment
+
+
+SEARCH_RANK = "search_rank"
+
+# Columns indexed per model, with their relevance weight.
+SEARCH_FIELDS = {
+    Post: {"title": 10.0, "content": 1.0},
+    Comment: {"comment_text": 1.0},
+}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query):
+    """
+    Splits a user query into word tokens, dropping any search syntax characters.
+    """
+    return TOKEN_RE.findall(query.lower())
+
+
+class BM25(Func):
+    """
+    The bm25 score of the FTS5 row matched by the query, lower being more relevant.
+    """
+
+    function = "bm25"
+    output_field = FloatField()
+
+    def __init__(self, document, weights):
+        super().__init__(document, *(Value(weight) for weight in weights))
+
+
+class SQLiteSearchBackend:
+    """
+    Searches the FTS5 tables mapped by the unmanaged `search_index` models. They
+    are external content tables kept in sync by triggers (see migration 0006), so
+    every insert, update and delete (including bulk_create and queryset updates)
+    reaches the index.
+
+    The index is joined on rowid, so SQLite runs the MATCH once and ranks every
+    matching row in the same pass. Every term is a prefix match and all terms must
+    match; results are ranked with bm25 using the SEARCH_FIELDS weights.
+    """
+
+    def build_query(self, terms):
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, terms):
+        weights = SEARCH_FIELDS[queryset.model].values()
+        rank = BM25(F("search_index__document"), weights) * -1
+        return queryset.filter(search_index__document__match=self.build_query(terms)).annotate(**{SEARCH_RANK: rank})
+
+
+class PostgreSQLSearchBackend:
+    """
+    Searches a `to_tsvector` expression of the SEARCH_FIELDS, backed by the GIN
+    expression index created in migration 0006, with `:*` prefix matching and
+    ts_rank relevance.
+    """
+
+    config = "english"
+
+    def get_vector(self, fields):
+        """
+        Builds the weighted tsvector of `fields`, a SEARCH_FIELDS entry. The highest
+        weighted field gets tsvector weight A, the next one B, and so on.
+        """
+        from django.contrib.postgres.search import SearchVector
+
+        ranked = sorted(fields, key=lambda field: -fields[field])
+        vectors = [
+            SearchVector(field, weight="ABCD"[min(position, 3)], config=self.config)
+            for position, field in enumerate(ranked)
+        ]
+        vector = vectors[0]
+        for other in vectors[1:]:
+            vector = vector + other
+        return vector
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=self.config)
+        vector = self.get_vector(SEARCH_FIELDS[queryset.model])
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+            **{SEARCH_RANK: SearchRank(vector, query)}
+        )
+
+
+def get_search_backend():
+    if connection.vendor == "postgresql":
+        return PostgreSQLSearchBackend()
+    return SQLiteSearchBackend()
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Filters and ranks the queryset of views whose model is in SEARCH_FIELDS with
+    the `?search=` parameter. The result is annotated with `search_rank` (higher is
+    more relevant), which KeysetPagination uses as the page order.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ""))
+        if not terms or queryset.model not in SEARCH_FIELDS:
+            return queryset
+        return get_search_backend().search(queryset, terms)
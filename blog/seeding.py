@@ -0,0 +1,298 @@
+import datetime
+import hashlib
+import random
+from contextlib import contextmanager
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from users.models import CustomUser
+from .counters import repair_counters
+from .images import RENDITIONS
+from .models import Tag, Post, Comment, Like, GalleryImage
+from .trending import rebuild_scores
+
+
+SEED_START_DATE = datetime.date(2020, 1, 1)
+SEED_DAYS = 3 * 365
+VOCABULARY = (
+    "django python api rest query index cache database server request response model view serializer "
+    "token user comment post like tag image thread search benchmark latency throughput worker queue "
+    "migration schema sqlite postgres replica router signal middleware template static media deploy "
+    "async sync stream export import batch bulk cursor page filter order count rank score trending"
+).split()
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """
+    Temporarily disables auto_now/auto_now_add on the date fields of `models` so
+    seeded rows can carry historical created_time/updated_time values.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields if hasattr(field, "auto_now")]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class BlogSeeder:
+    """
+    Deterministically fills the blog tables with synthetic data.
+
+    The same `seed` and sizes always produce the same rows, so benchmark results
+    can be compared between commits. Rows are written with bulk_create in batches
+    of `batch_size` and the denormalized counters are repaired at the end.
+
+    Besides the random comment trees, `deep_threads` posts get a chain of
+    `deep_thread_depth` nested replies, and `images` processed gallery images are
+    spread over the posts (as rows only: no file is written).
+    """
+
+    def __init__(
+        self,
+        users=100,
+        tags=50,
+        posts=1000,
+        comments=10000,
+        likes=10000,
+        images=0,
+        deep_threads=0,
+        deep_thread_depth=50,
+        batch_size=5000,
+        seed=0,
+    ):
+        self.sizes = {
+            "users": users,
+            "tags": tags,
+            "posts": posts,
+            "comments": comments,
+            "likes": likes,
+            "images": images,
+        }
+        self.deep_threads = deep_threads
+        self.deep_thread_depth = deep_thread_depth
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+
+    def random_date(self):
+        return SEED_START_DATE + datetime.timedelta(days=self.random.randrange(SEED_DAYS))
+
+    def random_text(self, words):
+        return " ".join(self.random.choice(VOCABULARY) for _ in range(words))
+
+    def random_time(self, date, max_days=1):
+        start = datetime.datetime.combine(date, datetime.time.min, tzinfo=datetime.timezone.utc)
+        return start + datetime.timedelta(seconds=self.random.randrange(max_days * 24 * 3600))
+
+    def bulk_create(self, model, rows):
+        created = []
+        for start in range(0, len(rows), self.batch_size):
+            created.extend(model.objects.bulk_create(rows[start : start + self.batch_size]))
+        return created
+
+    def run(self, log=None):
+        """
+        Creates all seeded rows.
+
+        Args:
+        - log (callable, optional): Called with a progress message after each table.
+
+        Returns:
+        - dict: The number of rows created per table.
+        """
+        log = log or (lambda message: None)
+        with transaction.atomic(), manual_timestamps(Post, Comment, Like):
+            self.user_ids = self.create_users()
+            self.author_choices = self.user_ids + [None]
+            log(f"users: {len(self.user_ids)}")
+            self.tag_ids = self.create_tags()
+            log(f"tags: {len(self.tag_ids)}")
+            self.post_ids = self.create_posts()
+            log(f"posts: {len(self.post_ids)}")
+            self.comment_ids = self.create_comments()
+            self.comment_ids += self.create_deep_threads()
+            log(f"comments: {len(self.comment_ids)}")
+            like_count = self.create_likes()
+            log(f"likes: {like_count}")
+            image_count = self.create_images()
+            log(f"images: {image_count}")
+            repair_counters()
+            rebuild_scores()
+        return {
+            "users": len(self.user_ids),
+            "tags": len(self.tag_ids),
+            "posts": len(self.post_ids),
+            "comments": len(self.comment_ids),
+            "likes": like_count,
+            "images": image_count,
+        }
+
+    def create_users(self):
+        offset = CustomUser.objects.count()
+        users = [
+            CustomUser(username=f"seed_user_{offset + index}", email=f"seed_user_{offset + index}@example.com")
+            for index in range(self.sizes["users"])
+        ]
+        return [user.pk for user in self.bulk_create(CustomUser, users)]
+
+    def create_tags(self):
+        tags = [Tag(name=f"tag{index}") for index in range(self.sizes["tags"])]
+        return [tag.pk for tag in self.bulk_create(Tag, tags)]
+
+    def create_posts(self):
+        posts = []
+        for index in range(self.sizes["posts"]):
+            created_time = self.random_date()
+            posts.append(
+                Post(
+                    title=self.random_text(6).capitalize(),
+                    content=self.random_text(200),
+                    user_id=self.random.choice(self.user_ids),
+                    is_active=self.random.random() < 0.8,
+                    created_time=created_time,
+                    updated_time=self.random_time(created_time, max_days=30),
+                )
+            )
+        post_ids = [post.pk for post in self.bulk_create(Post, posts)]
+
+        if self.tag_ids:
+            through = Post.tags.through
+            links = [
+                through(post_id=post_id, tag_id=tag_id)
+                for post_id in post_ids
+                for tag_id in self.random.sample(self.tag_ids, min(3, len(self.tag_ids)))
+            ]
+            self.bulk_create(through, links)
+        return post_ids
+
+    def create_comments(self):
+        """
+        Creates comments in batches where roughly a third reply to an earlier
+        comment of the same post, so batches always reference existing parents.
+        """
+        comment_ids = []
+        thread = {}
+        remaining = self.sizes["comments"]
+        while remaining > 0:
+            batch = []
+            for _ in range(min(self.batch_size, remaining)):
+                post_id = self.random.choice(self.post_ids)
+                parents = thread.get(post_id)
+                reply_to = self.random.choice(parents) if parents and self.random.random() < 0.3 else None
+                created_time = self.random_date()
+                batch.append(
+                    Comment(
+                        name="Seeded commenter",
+                        email="commenter@example.com",
+                        user_id=self.random.choice(self.author_choices),
+                        comment_text=self.random_text(20),
+                        post_id=post_id,
+                        previous_comment_id=reply_to,
+                        is_active=self.random.random() < 0.8,
+                        created_time=created_time,
+                        updated_time=self.random_time(created_time),
+                    )
+                )
+            for comment in Comment.objects.bulk_create(batch):
+                comment_ids.append(comment.pk)
+                thread.setdefault(comment.post_id, []).append(comment.pk)
+            remaining -= len(batch)
+        return comment_ids
+
+    def create_likes(self):
+        content_types = [
+            (ContentType.objects.get_for_model(Post).pk, self.post_ids),
+            (ContentType.objects.get_for_model(Comment).pk, self.comment_ids),
+        ]
+        content_types = [(content_type_id, ids) for content_type_id, ids in content_types if ids]
+        if not content_types:
+            return 0
+        seen = set()
+        likes = []
+        for _ in range(self.sizes["likes"]):
+            content_type_id, object_ids = self.random.choice(content_types)
+            object_id = self.random.choice(object_ids)
+            user_id = self.random.choice(self.author_choices)
+            # Users like an object once; anonymous likers (who share one email) too.
+            key = (user_id, content_type_id, object_id)
+            if key in seen:
+                continue
+            seen.add(key)
+            created_time = self.random_date()
+            likes.append(
+                Like(
+                    name="Seeded liker",
+                    email="liker@example.com",
+                    user_id=user_id,
+                    liked=self.random.random() < 0.9,
+                    content_type_id=content_type_id,
+                    object_id=object_id,
+                    is_active=self.random.random() < 0.8,
+                    created_time=created_time,
+                    updated_time=self.random_time(created_time),
+                )
+            )
+        return len(self.bulk_create(Like, likes))
+
+    def create_deep_threads(self):
+        """
+        Gives the first `deep_threads` posts a chain of nested replies, created one
+        level at a time for all the chains.
+        """
+        post_ids = self.post_ids[: self.deep_threads]
+        comment_ids = []
+        parents = [None] * len(post_ids)
+        for depth in range(self.deep_thread_depth if post_ids else 0):
+            comments = []
+            for post_id, parent in zip(post_ids, parents):
+                created_time = self.random_date()
+                comments.append(
+                    Comment(
+                        name="Seeded commenter",
+                        email="commenter@example.com",
+                        user_id=self.random.choice(self.author_choices),
+                        comment_text=f"Reply at depth {depth}",
+                        post_id=post_id,
+                        previous_comment_id=parent,
+                        is_active=True,
+                        created_time=created_time,
+                        updated_time=self.random_time(created_time),
+                    )
+                )
+            parents = [comment.pk for comment in self.bulk_create(Comment, comments)]
+            comment_ids.extend(parents)
+        return comment_ids
+
+    def create_images(self):
+        """
+        Creates processed gallery images, each attached to one to three posts.
+        """
+        images = []
+        for index in range(self.sizes["images"] if self.post_ids else 0):
+            digest = hashlib.sha256(f"seed-image-{index}-{self.random.random()}".encode()).hexdigest()
+            path = f"gallery/{digest[:2]}/{digest}"
+            images.append(
+                GalleryImage(
+                    file_name=f"{path}.jpg",
+                    sha256=digest,
+                    status=GalleryImage.Status.READY,
+                    width=1600,
+                    height=1200,
+                    renditions={name: f"{path}-{name}.webp" for name in RENDITIONS},
+                )
+            )
+        image_ids = [image.pk for image in self.bulk_create(GalleryImage, images)]
+
+        through = Post.images.through
+        links = [
+            through(post_id=post_id, galleryimage_id=image_id)
+            for image_id in image_ids
+            for post_id in self.random.sample(self.post_ids, min(self.random.randint(1, 3), len(self.post_ids)))
+        ]
+        self.bulk_create(through, links)
+        return len(image_ids)
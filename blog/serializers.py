@@ -1,24 +1,54 @@
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from .bulk import BulkCreateListSerializer, BulkPrimaryKeyRelatedField
+from .images import inspect_upload, store_uploads
+from .metrics import TimedSerializerMixin
 from .models import Tag, Post, Comment, Like, GalleryImage
 
 
-class GalleryImageSerializer(serializers.ModelSerializer):
+class GalleryImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = GalleryImage
-        fields = ("file_name",)
+        fields = ("id", "file_name", "status", "width", "height", "renditions")
+        read_only_fields = ["status", "width", "height"]
+
+    def validate_file_name(self, file):
+        """
+        Checks that the upload is a supported image without decoding it.
+        """
+        return inspect_upload(file)
 
+    def create(self, validated_data):
+        return store_uploads([validated_data["file_name"]])[0]
 
-class TagSerializer(serializers.ModelSerializer):
+    def get_renditions(self, image):
+        """
+        Returns the absolute URL of each resized WebP rendition, once the image is processed.
+        """
+        request = self.context.get("request")
+        storage = image.file_name.storage
+        urls = {}
+        for name, path in image.renditions.items():
+            url = storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
+        list_serializer_class = BulkCreateListSerializer
 
 
-class PostSerializer(serializers.ModelSerializer):
-    images = GalleryImageSerializer(many=True, required=False, write_only=True)
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    images = GalleryImageSerializer(many=True, required=False)
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all(), required=False)
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     user_username = serializers.ReadOnlyField(source="user.username")
     user_email = serializers.ReadOnlyField(source="user.email")
@@ -26,26 +56,41 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = "__all__"
-        read_only_fields = ["is_active", "created_time", "updated_time", "user"]
+        read_only_fields = ["is_active", "like_count", "comment_count", "created_time", "updated_time", "user"]
 
     def create(self, validated_data):
-        images_data = validated_data.pop("images", [])
-        post = Post.objects.create(**validated_data)
+        """
+        Creates the post, its images and its tag and image links in one transaction,
+        with one INSERT per table whatever the number of images and tags.
 
-        for image_data in images_data:
-            GalleryImage.objects.create(post=post, **image_data)
+        Args:
+        - validated_data (dict): The validated post data, with optional `images` and `tags`.
 
+        Returns:
+        - Post: The created post.
+        """
+        images_data = validated_data.pop("images", [])
+        tags = validated_data.pop("tags", [])
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+            images = store_uploads([image_data["file_name"] for image_data in images_data]) if images_data else []
+            Post.images.through.objects.bulk_create(
+                [Post.images.through(post_id=post.pk, galleryimage_id=image.pk) for image in images]
+            )
+            Post.tags.through.objects.bulk_create(
+                [Post.tags.through(post_id=post.pk, tag_id=tag.pk) for tag in dict.fromkeys(tags)]
+            )
         return post
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     name = serializers.CharField(required=False)
     email = serializers.EmailField(required=False)
 
     class Meta:
         model = Comment
         fields = "__all__"
-        read_only_fields = ["is_active", "created_time", "updated_time", "user"]
+        read_only_fields = ["is_active", "like_count", "created_time", "updated_time", "user"]
 
     def validate(self, data):
         """
@@ -67,14 +112,80 @@ class CommentSerializer(serializers.ModelSerializer):
         return data
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class ThreadedCommentSerializer(CommentSerializer):
+    depth = serializers.ReadOnlyField()
+    reply_count = serializers.ReadOnlyField()
+
+
+class ContentTypeField(serializers.PrimaryKeyRelatedField):
+    """
+    A content type primary key, looked up in the content type cache of this process
+    rather than queried on every request.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", ContentType.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return ContentType.objects.get_for_id(int(data))
+        except ContentType.DoesNotExist:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class LikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    content_type = ContentTypeField()
+
     class Meta:
         model = Like
         fields = "__all__"
         read_only_fields = ["is_active", "created_time", "updated_time"]
 
 
-class ContentTypeSerializer(serializers.ModelSerializer):
+class LikeUpsertSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(max_length=50, required=False)
+    email = serializers.EmailField(max_length=254, required=False)
+    liked = serializers.BooleanField(default=True)
+    content_type = ContentTypeField()
+
+    class Meta:
+        model = Like
+        fields = ("name", "email", "liked", "content_type", "object_id")
+
+    def validate(self, data):
+        """
+        Requires the name and email of anonymous users, whose likes are told apart
+        by their email.
+        """
+        user = self.context.get("request").user
+        if not user.is_authenticated:
+            if not data.get("name"):
+                raise ValidationError({"name": "This field may not be blank."})
+            if not data.get("email"):
+                raise ValidationError({"email": "This field may not be blank."})
+        return data
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class LikeToggleSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    liked = serializers.BooleanField()
+
+
+class LikeSummarySerializer(serializers.Serializer):
+    content_type = ContentTypeField()
+    object_ids = serializers.ListField(child=serializers.IntegerField(min_value=0), allow_empty=False, max_length=500)
+
+
+class ContentTypeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ContentType
         fields = "__all__"
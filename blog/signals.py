@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_on_commit
+from .models import Tag, Post, Comment, Like
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    invalidate_on_commit("posts", instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tags(sender, instance, reverse, **kwargs):
+    if reverse:
+        invalidate_on_commit("posts")
+    else:
+        invalidate_on_commit("posts", instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    invalidate_on_commit("tags", instance.pk)
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_deleted_tag(sender, instance, **kwargs):
+    """
+    Deleting a tag removes it from posts without sending m2m_changed.
+    """
+    invalidate_on_commit("tags", instance.pk)
+    invalidate_on_commit("posts")
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    """
+    Comment writes change the comment_count of their post.
+    """
+    invalidate_on_commit("posts", instance.post_id)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_liked_post(sender, instance, **kwargs):
+    """
+    Like writes change the like_count of the liked post.
+    """
+    if instance.content_type_id == ContentType.objects.get_for_model(Post).pk:
+        invalidate_on_commit("posts", instance.object_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_author_posts(sender, instance, update_fields=None, **kwargs):
+    """
+    Posts embed the username and email of their author. Saves that only touch
+    last_login (sent on every login) are ignored.
+    """
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_on_commit("posts")
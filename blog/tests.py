@@ -1,3 +1,1111 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+from base64 import b64decode, b64encode
+from datetime import timedelta
+from unittest import mock
+from urllib import parse
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from blog.management.commands.benchmark_api import Command as BenchmarkApiCommand
+from blog_api.backends.sqlite3.base import BUSY_RETRIES
+from users.models import CustomUser
+from .benchmarks import QUERY_BUDGETS, benchmark_endpoints, benchmark_serializers, benchmark_throttles
+from .cache import get_cache
+from .counters import (
+    apply_comment_change,
+    apply_comment_deltas,
+    apply_like_change,
+    apply_like_deltas,
+    comment_counter_key,
+    like_counter_key,
+    refresh_comment_count,
+    repair_counters,
+)
+from .images import process_images
+from .importing import BlogImporter
+from .jobs import Worker, enqueue, handlers, job_handler
+from .likes import upsert_like
+from .metrics import registry
+from .models import Tag, Post, Comment, Like, GalleryImage, Job
+from .replicas import PIN_COOKIE, ReplicaRouter
+from .seeding import BlogSeeder
+from .serializers import GalleryImageSerializer
+from .threads import fetch_thread
+from .throttling import get_bucket_store
+from .trending import COMMENT_WEIGHT, decay_scores, get_half_life, rebuild_scores, top_posts
+from .views import CommentsViewSet, PostsViewSet
+
+
+class QueryCountTestMixin:
+    def assertConstantListQueries(self, url, add_rows, sizes=(1, 5, 15)):
+        """
+        Asserts that listing `url` issues the same number of queries for every result size.
+
+        Args:
+        - url (str): The list endpoint to request.
+        - add_rows (callable): Called with a count, creates that many additional rows
+          returned by the endpoint. Its on_commit callbacks (cache invalidation) are executed.
+        - sizes (tuple): The increasing numbers of rows to measure the endpoint with.
+
+        Returns:
+        - int: The constant number of queries.
+        """
+        counts = {}
+        created = 0
+        for size in sizes:
+            with self.captureOnCommitCallbacks(execute=True):
+                add_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), size)
+            counts[size] = len(context.captured_queries)
+        self.assertEqual(len(set(counts.values())), 1, f"Query count depends on result size: {counts}")
+        return counts[sizes[0]]
+
+
+class ListQueryCountTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.tags = [Tag.objects.create(name=f"tag{index}") for index in range(3)]
+
+    def create_posts(self, count):
+        for index in range(count):
+            user = CustomUser.objects.create(username=f"user{CustomUser.objects.count()}")
+            post = Post.objects.create(title=f"post{index}", content="content", user=user, is_active=True)
+            post.tags.set(self.tags)
+        return post
+
+    def test_post_list_query_count(self):
+        # ETag validators, the page, and the prefetched tags and images.
+        self.assertEqual(self.assertConstantListQueries("/blog/posts/", self.create_posts), 4)
+
+    def test_comment_list_query_count(self):
+        post = self.create_posts(1)
+
+        def create_comments(count):
+            for index in range(count):
+                user = CustomUser.objects.create(username=f"commenter{CustomUser.objects.count()}")
+                parent = Comment.objects.filter(post=post).first()
+                Comment.objects.create(
+                    name="name",
+                    email="name@example.com",
+                    user=user,
+                    comment_text=f"comment{index}",
+                    post=post,
+                    previous_comment=parent,
+                    is_active=True,
+                )
+
+        self.assertEqual(self.assertConstantListQueries("/blog/comments/", create_comments), 2)
+
+
+class PostResponseCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create(username="author")
+        self.post = Post.objects.create(title="post", content="content", user=self.user, is_active=True)
+
+    def test_retrieve_is_cached_until_the_post_changes(self):
+        url = f"/blog/posts/{self.post.pk}/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(name="name", email="name@example.com", comment_text="text", post=self.post)
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+
+    def test_list_is_cached_per_role(self):
+        superuser = CustomUser.objects.create(username="admin", is_superuser=True)
+        self.client.get("/blog/posts/")
+        self.client.force_authenticate(superuser)
+        self.assertEqual(self.client.get("/blog/posts/")["X-Cache"], "MISS")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        user = CustomUser.objects.create(username="author")
+        self.post = Post.objects.create(title="post", content="content", user=user, is_active=True)
+        self.comment = Comment.objects.create(
+            name="name", email="name@example.com", comment_text="text", post=self.post, is_active=True
+        )
+
+    def test_unchanged_comment_list_is_not_modified(self):
+        etag = self.client.get("/blog/comments/")["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get("/blog/comments/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.comment.comment_text = "edited"
+        self.comment.save()
+        self.assertEqual(self.client.get("/blog/comments/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_counter_change_updates_post_etag(self):
+        url = f"/blog/posts/{self.post.pk}/"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                name="name", email="name@example.com", comment_text="reply", post=self.post, is_active=True
+            )
+            refresh_comment_count([self.post.pk])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tag_change_updates_post_etag(self):
+        url = f"/blog/posts/{self.post.pk}/"
+        tag = Tag.objects.create(name="tag")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add(tag)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tags"], [tag.pk])
+        updated_time = self.post.updated_time
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_time, updated_time)
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_author_rename_updates_post_list_etag(self):
+        etag = self.client.get("/blog/posts/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.user.username = "renamed"
+            self.post.user.save()
+        response = self.client.get("/blog/posts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["user_username"], "renamed")
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.user.save(update_fields=["last_login"])
+        self.assertEqual(self.client.get("/blog/posts/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username="author")
+        self.post = Post.objects.create(title="post", content="content", user=user, is_active=True)
+        self.other_post = Post.objects.create(title="other", content="content", user=user, is_active=True)
+        self.comment = self.create_comment()
+        apply_comment_change(None, comment_counter_key(self.comment))
+
+    def create_comment(self, post=None, parent=None):
+        return Comment.objects.create(
+            name="name",
+            email="name@example.com",
+            comment_text="text",
+            post=post or self.post,
+            previous_comment=parent,
+            is_active=True,
+        )
+
+    def create_like(self, obj, **fields):
+        fields = {"name": "name", "email": "name@example.com", "liked": True, "is_active": True, **fields}
+        like = Like.objects.create(content=obj, **fields)
+        apply_like_change(None, like_counter_key(like))
+        return like
+
+    def save_like(self, like, **fields):
+        before = like_counter_key(like)
+        for name, value in fields.items():
+            setattr(like, name, value)
+        like.save()
+        apply_like_change(before, like_counter_key(like))
+
+    def assertCounts(self, obj, **counts):
+        obj.refresh_from_db()
+        self.assertEqual({name: getattr(obj, name) for name in counts}, counts)
+
+    def test_like_and_unlike(self):
+        like = self.create_like(self.post)
+        self.assertCounts(self.post, like_count=1)
+
+        self.save_like(like, liked=False)
+        self.assertCounts(self.post, like_count=0)
+        self.save_like(like, liked=True)
+        self.assertCounts(self.post, like_count=1)
+
+    def test_inactive_likes_are_not_counted(self):
+        like = self.create_like(self.comment, is_active=False)
+        self.assertCounts(self.comment, like_count=0)
+
+        self.save_like(like, is_active=True)
+        self.assertCounts(self.comment, like_count=1)
+        self.save_like(like, is_active=False)
+        self.assertCounts(self.comment, like_count=0)
+
+    def test_deleting_a_like(self):
+        like = self.create_like(self.post)
+        self.create_like(self.post, email="other@example.com")
+        self.assertCounts(self.post, like_count=2)
+
+        before = like_counter_key(like)
+        like.delete()
+        apply_like_change(before, None)
+        self.assertCounts(self.post, like_count=1)
+
+    def test_counters_do_not_go_below_zero(self):
+        Post.objects.filter(pk=self.post.pk).update(comment_count=0)
+        apply_like_change((Post, self.post.pk), None)
+        apply_comment_change(self.post.pk, None)
+        apply_like_deltas({(Post, self.post.pk): -2, (Comment, self.comment.pk): -1})
+        apply_comment_deltas({self.post.pk: -3})
+        self.assertCounts(self.post, like_count=0, comment_count=0)
+        self.assertCounts(self.comment, like_count=0)
+
+    def test_comment_counts_follow_activation_and_reparenting(self):
+        self.assertCounts(self.post, comment_count=1)
+
+        before = comment_counter_key(self.comment)
+        self.comment.post = self.other_post
+        self.comment.save()
+        apply_comment_change(before, comment_counter_key(self.comment))
+        self.assertCounts(self.post, comment_count=0)
+        self.assertCounts(self.other_post, comment_count=1)
+
+        before = comment_counter_key(self.comment)
+        self.comment.is_active = False
+        self.comment.save()
+        apply_comment_change(before, comment_counter_key(self.comment))
+        self.assertCounts(self.other_post, comment_count=0)
+
+    def test_refresh_comment_count_after_cascaded_delete(self):
+        for _ in range(2):
+            apply_comment_change(None, comment_counter_key(self.create_comment(parent=self.comment)))
+        self.assertCounts(self.post, comment_count=3)
+
+        self.comment.delete()
+        refresh_comment_count([self.post.pk])
+        self.assertCounts(self.post, comment_count=0)
+
+    def test_repair_counters_fixes_drift(self):
+        self.create_like(self.post)
+        Like.objects.create(content=self.comment, name="name", email="name@example.com", liked=True, is_active=True)
+        Post.objects.filter(pk=self.post.pk).update(like_count=5, comment_count=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            repaired = repair_counters()
+        self.assertEqual(repaired, {"post.comment_count": 1, "post.like_count": 1, "comment.like_count": 1})
+        self.assertCounts(self.post, like_count=1, comment_count=1)
+        self.assertCounts(self.comment, like_count=1)
+        self.assertCounts(self.other_post, like_count=0, comment_count=0)
+        self.assertEqual(set(repair_counters().values()), {0})
+
+
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        user = CustomUser.objects.create(username="author")
+        self.post = Post.objects.create(title="post", content="content", user=user, is_active=True)
+
+    def comment(self, text, parent=None, is_active=True):
+        return Comment.objects.create(
+            name="name",
+            email="name@example.com",
+            comment_text=text,
+            post=self.post,
+            previous_comment=parent,
+            is_active=is_active,
+        )
+
+    def test_tree_is_nested_and_limited(self):
+        root = self.comment("root")
+        reply = self.comment("reply", root)
+        self.comment("nested", reply)
+        self.comment("hidden", reply, is_active=False)
+        self.comment("second reply", root)
+        self.comment("second root")
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/blog/posts/{self.post.pk}/comments/tree/?page_size=1&depth=1")
+        data = response.json()
+        self.assertEqual([node["comment_text"] for node in data["results"]], ["root"])
+        replies = data["results"][0]["replies"]
+        self.assertEqual([node["comment_text"] for node in replies], ["reply"])
+        self.assertTrue(data["results"][0]["has_more_replies"])
+        self.assertEqual(replies[0]["reply_count"], 1)
+        self.assertEqual(replies[0]["replies"], [])
+
+        next_page = self.client.get(data["next"]).json()
+        self.assertEqual([node["comment_text"] for node in next_page["results"]], ["second root"])
+        self.assertIsNone(next_page["next"])
+
+    def test_replies_are_paged_per_parent(self):
+        root = self.comment("root")
+        replies = [self.comment(f"reply {index}", root) for index in range(3)]
+        self.comment("nested", replies[2])
+        hidden = self.comment("hidden", root, is_active=False)
+        self.comment("reply of hidden", hidden)
+
+        data = self.client.get(f"/blog/posts/{self.post.pk}/comments/tree/?page_size=2&depth=0").json()
+        self.assertEqual(data["results"][0]["replies"], [])
+        with self.assertNumQueries(2):
+            page = self.client.get(data["results"][0]["next_replies"]).json()
+        self.assertEqual([node["id"] for node in page["results"]], [reply.pk for reply in replies[:2]])
+        self.assertIsNone(page["results"][0]["next_replies"])
+
+        page = self.client.get(page["next"]).json()
+        self.assertEqual([node["comment_text"] for node in page["results"]], ["reply 2"])
+        self.assertIsNone(page["next"])
+        self.assertEqual(page["results"][0]["next_replies"].count("parent="), 1)
+        nested = self.client.get(page["results"][0]["next_replies"]).json()["results"]
+        self.assertEqual([node["comment_text"] for node in nested], ["nested"])
+
+        url = f"/blog/posts/{self.post.pk}/comments/tree/?parent={hidden.pk}"
+        self.assertEqual(self.client.get(url).json()["results"], [])
+
+    def test_thread_query_only_expands_fetched_comments(self):
+        roots = [self.comment(f"root {index}") for index in range(3)]
+        for root in roots:
+            for index in range(5):
+                self.comment(f"reply {index}", self.comment(f"reply {index}", root))
+
+        comments, has_more = fetch_thread(self.post.pk, max_depth=5, page_size=2)
+        self.assertTrue(has_more)
+        # Two roots, their first two replies and the reply of each.
+        self.assertEqual([comment.depth for comment in comments], [0] * 2 + [1] * 4 + [2] * 4)
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.superuser = CustomUser.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.post = Post.objects.create(title="post", content="content", user=self.superuser, is_active=True)
+
+    def test_bulk_approve_comments_reports_each_id(self):
+        comments = [
+            Comment.objects.create(name="name", email="name@example.com", comment_text="text", post=self.post)
+            for _ in range(3)
+        ]
+        comments[0].is_active = True
+        comments[0].save()
+        ids = [comment.pk for comment in comments] + [999]
+
+        self.client.force_authenticate(CustomUser.objects.create(username="user"))
+        with self.assertNumQueries(0):
+            response = self.client.post("/blog/comments/bulk_approve/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post("/blog/posts/bulk_approve/", {"ids": ids}, format="json").status_code, 403)
+
+        self.client.force_authenticate(self.superuser)
+        response = self.client.post("/blog/comments/bulk_approve/", {"ids": ids}, format="json")
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]],
+            ["already_active", "approved", "approved", "not_found"],
+        )
+        self.assertEqual(Comment.objects.filter(is_active=True).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+
+class JobQueueTests(TestCase):
+    def test_approval_email_is_sent_by_the_worker(self):
+        author = CustomUser.objects.create(username="author", email="author@example.com")
+        post = Post.objects.create(title="post", content="content", user=author)
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username="admin", is_superuser=True, is_staff=True))
+        response = client.post(f"/blog/posts/{post.pk}/approve_post/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mail.outbox, [])
+
+        data = {"name": "name", "email": "name@example.com", "comment_text": "text", "post": post.pk}
+        self.assertEqual(client.post("/blog/comments/", data).status_code, 201)
+        self.assertEqual(Worker(concurrency=1).run_once(), 2)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox), ["New comment on your post", "Your post was approved"]
+        )
+        self.assertTrue(all(message.to == ["author@example.com"] for message in mail.outbox))
+        self.assertEqual(Job.objects.filter(status=Job.Status.DONE).count(), 2)
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        @job_handler("test_failure")
+        def fail(payload):
+            raise RuntimeError(payload["reason"])
+
+        self.addCleanup(handlers.pop, "test_failure")
+        job = enqueue("test_failure", {"reason": "unavailable"}, max_attempts=2)
+        worker = Worker(concurrency=1)
+        with self.assertLogs("blog.jobs", "WARNING"):
+            self.assertEqual(worker.run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.PENDING, 1))
+        self.assertIn("RuntimeError: unavailable", job.last_error)
+        self.assertEqual(worker.run_once(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_time)
+        with self.assertLogs("blog.jobs", "WARNING"):
+            self.assertEqual(worker.run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {
+            "comments.create.ip": "3/min",
+            "comments.create.email": "2/min",
+            "likes.toggle.user": "2/min",
+        },
+    }
+)
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.post = Post.objects.create(
+            title="post", content="content", user=CustomUser.objects.create(username="author"), is_active=True
+        )
+
+    def comment(self, email):
+        data = {"name": "name", "email": email, "comment_text": "text", "post": self.post.pk}
+        return APIClient().post("/blog/comments/", data)
+
+    def test_comment_creation_is_limited_per_email_and_ip(self):
+        response = self.comment("a@example.com")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response["X-RateLimit-Limit"], response["X-RateLimit-Remaining"]), ("2", "1"))
+        self.assertEqual(self.comment("A@example.com ")["X-RateLimit-Remaining"], "0")
+
+        response = self.comment("a@example.com")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(self.comment("b@example.com").status_code, 429)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertNotIn("X-RateLimit-Limit", APIClient().get("/blog/comments/"))
+
+    def test_like_toggles_are_limited(self):
+        client = APIClient()
+        client.force_authenticate(self.post.user)
+        data = {"content_type": ContentType.objects.get_for_model(Post).pk, "object_id": self.post.pk}
+        statuses = [client.post("/blog/likes/toggle/", data, format="json").status_code for _ in range(3)]
+        self.assertEqual(statuses, [201, 200, 429])
+
+
+class SQLiteProductionTests(SimpleTestCase):
+    def test_transactions_take_the_write_lock_when_they_begin(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {
+            **connection.settings_dict,
+            **settings.SQLITE_PRODUCTION,
+            "NAME": os.path.join(directory.name, "db.sqlite3"),
+            "OPTIONS": {**settings.SQLITE_PRODUCTION["OPTIONS"], "timeout": 0},
+        }
+        backend = load_backend(settings_dict["ENGINE"])
+        first, second = (backend.DatabaseWrapper(settings_dict, alias) for alias in ("first", "second"))
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        with first.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone(), ("wal",))
+
+        first._start_transaction_under_autocommit()
+        second.ensure_connection()
+        with self.assertLogs("blog_api.backends.sqlite3.base", "WARNING") as logs, mock.patch("time.sleep"):
+            with self.assertRaisesMessage(OperationalError, "database is locked"):
+                second._start_transaction_under_autocommit()
+        self.assertEqual(len(logs.output), BUSY_RETRIES)
+
+
+@override_settings(READ_REPLICAS=["default"])
+class ReplicaRoutingTests(TestCase):
+    def test_clients_read_their_own_writes_from_the_primary(self):
+        post = Post.objects.create(
+            title="post", content="content", user=CustomUser.objects.create(username="author"), is_active=True
+        )
+        client = APIClient()
+        with mock.patch.object(ReplicaRouter, "choose_replica", return_value="default") as choose_replica:
+            self.assertEqual(client.get("/blog/comments/").status_code, 200)
+            self.assertTrue(choose_replica.called)
+
+            choose_replica.reset_mock()
+            data = {"name": "name", "email": "name@example.com", "comment_text": "text", "post": post.pk}
+            response = client.post("/blog/comments/", data)
+            self.assertEqual(response.status_code, 201)
+            self.assertIn(PIN_COOKIE, response.cookies)
+            client.get("/blog/comments/")
+            self.assertFalse(choose_replica.called)
+
+            APIClient().get("/blog/comments/")
+            self.assertTrue(choose_replica.called)
+
+
+class ExportTests(TestCase):
+    def test_export_streams_every_row_as_ndjson_or_csv(self):
+        superuser = CustomUser.objects.create(username="admin", is_superuser=True, is_staff=True)
+        tags = [Tag.objects.create(name=name) for name in ("a", "b")]
+        posts = Post.objects.bulk_create(
+            Post(title=f"post {index}", content="content", user=superuser) for index in range(5)
+        )
+        posts[1].tags.set(tags)
+        client = APIClient()
+        self.assertEqual(client.get("/blog/posts/export/").status_code, 401)
+
+        client.force_authenticate(superuser)
+        with mock.patch("blog.exports.EXPORT_PAGE_SIZE", 2):
+            response = client.get("/blog/posts/export/?is_active=false")
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["id"] for row in rows], [post.pk for post in posts])
+        self.assertEqual(rows[1]["tags"], [tag.pk for tag in tags])
+        self.assertEqual(rows[0]["user__username"], "admin")
+
+        response = client.get("/blog/posts/export/?format=csv")
+        lines = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[1]["tags"], f"{tags[0].pk} {tags[1].pk}")
+        self.assertEqual(lines[1]["created_time"], rows[1]["created_time"])
+
+
+class ImportTests(TestCase):
+    def write(self, directory, name, content):
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_import_links_rows_by_source_ids_and_natural_keys(self):
+        rows = {
+            "users.csv": "username,email\nann,ann@example.com\nbob,\n",
+            "posts.ndjson": "\n".join(
+                json.dumps(post)
+                for post in (
+                    {"id": 10, "user": "ann", "title": "First", "content": "c", "tags": ["x", "y"], "is_active": True},
+                    {"id": 11, "user": "nobody", "title": "Lost", "content": "c"},
+                )
+            ),
+            # Replies come before their parents and chains cross batches.
+            "comments.csv": (
+                "id,post,previous_comment,user,name,email,comment_text,is_active\n"
+                "3,10,2,,Cy,cy@example.com,third,True\n"
+                "2,10,1,bob,Bob,bob@example.com,second,True\n"
+                "1,10,,,Al,al@example.com,first,True\n"
+                "4,10,99,,Di,di@example.com,orphan,True\n"
+            ),
+            "likes.ndjson": "\n".join(
+                json.dumps({"name": "Liker", "email": "liker@example.com", "is_active": True, **like})
+                for like in (
+                    {"content_type": "post", "object_id": 10, "user": "ann"},
+                    {"content_type": "post", "object_id": 10, "user": "ann"},
+                    {"content_type": "comment", "object_id": 1},
+                )
+            ),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {name.split(".")[0]: self.write(directory, name, content) for name, content in rows.items()}
+            importer = BlogImporter(batch_size=2)
+            created = importer.run(**paths)
+
+        self.assertEqual(created, {"users": 2, "posts": 1, "comments": 3, "likes": 2})
+        self.assertEqual(importer.skipped["posts: unknown user"], 1)
+        self.assertEqual(importer.skipped["comments: unknown previous_comment"], 1)
+        post = Post.objects.get()
+        self.assertEqual(sorted(post.tags.values_list("name", flat=True)), ["x", "y"])
+        self.assertEqual((post.comment_count, post.like_count), (3, 1))
+        third = Comment.objects.get(comment_text="third")
+        self.assertEqual(third.previous_comment.previous_comment.comment_text, "first")
+        self.assertEqual(third.previous_comment.user.username, "bob")
+        self.assertEqual(Comment.objects.get(comment_text="first").like_count, 1)
+        self.assertFalse(CustomUser.objects.get(username="bob").has_usable_password())
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        registry.clear()
+        user = CustomUser.objects.create(username="author")
+        Post.objects.create(title="post", content="content", user=user, is_active=True)
+        self.superuser = CustomUser.objects.create(username="admin", is_superuser=True)
+
+    def test_metrics_are_recorded_per_route(self):
+        client = APIClient()
+        client.get("/blog/posts/")
+        client.get("/blog/posts/")
+        self.assertEqual(client.get("/metrics/").status_code, 401)
+
+        client.force_authenticate(self.superuser)
+        response = client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        lines = response.content.decode().splitlines()
+        self.assertIn('blog_requests_total{route="posts.list",method="GET",status="200"} 2', lines)
+        self.assertIn('blog_request_duration_seconds_count{route="posts.list"} 2', lines)
+        self.assertIn('blog_cache_requests_total{route="posts.list",result="hit"} 1', lines)
+        self.assertIn('blog_cache_requests_total{route="posts.list",result="miss"} 1', lines)
+        # Only the miss queried the database: one bucket of the query count histogram holds zero queries.
+        self.assertIn('blog_db_queries_bucket{route="posts.list",le="0"} 1', lines)
+        serialization = next(line for line in lines if line.startswith('blog_serialization_seconds_total{route="posts'))
+        self.assertGreater(float(serialization.split()[-1]), 0)
+
+    def test_slow_request_log(self):
+        with override_settings(SLOW_REQUEST_LOG_MS=0), self.assertLogs("blog.metrics", "WARNING") as logs:
+            APIClient().get("/blog/comments/")
+        self.assertIn("(comments.list)", logs.output[0])
+        self.assertIn('FROM "blog_comment"', logs.output[0])
+
+
+class BenchmarkTests(TestCase):
+    def test_endpoints_stay_within_query_budgets(self):
+        sizes = {"users": 5, "tags": 5, "posts": 20, "comments": 60, "likes": 60, "images": 10}
+        BlogSeeder(**sizes, deep_threads=2, deep_thread_depth=5).run()
+        self.assertEqual(Comment.objects.filter(comment_text="Reply at depth 4").count(), 2)
+        superuser = CustomUser.objects.create(username="admin", is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(superuser)
+
+        results = benchmark_endpoints(client, requests=1, warmup=1)
+        self.assertEqual({result["route"] for result in results}, set(QUERY_BUDGETS))
+        for result in results:
+            self.assertEqual(result["status"], 200, result["route"])
+            self.assertFalse(result["over_budget"], f"{result['route']} ran {result['queries']} queries")
+
+        names = [result["name"] for result in benchmark_serializers(sample=5, repeat=1)]
+        self.assertIn("ThreadedCommentSerializer", names)
+
+    def test_throttles_stay_within_their_budget(self):
+        store = get_bucket_store()
+        results = benchmark_throttles(requests=500, clients=100)
+        self.assertEqual([result["store"] for result in results], ["local"])
+        self.assertFalse(results[0]["over_budget"], f"p99 of {results[0]['p99_us']:.0f} us")
+        self.assertIs(get_bucket_store(), store)
+
+    def run_existing(self):
+        command = BenchmarkApiCommand()
+        command.options = {
+            "existing": True,
+            "seed": 0,
+            "sample": 1,
+            "repeat": 1,
+            "requests": 1,
+            "warmup": 0,
+            "cache": False,
+            "throttle_requests": 1,
+            "redis_url": None,
+        }
+
+        def benchmark_endpoints(client, *args):
+            self.assertEqual(client.get("/blog/posts/export/").status_code, 200)
+            return []
+
+        with mock.patch("blog.management.commands.benchmark_api.benchmark_endpoints", benchmark_endpoints):
+            return command.run()
+
+    def test_existing_database_run_deletes_its_superuser(self):
+        self.assertEqual(self.run_existing()["endpoints"], [])
+        self.assertFalse(CustomUser.objects.filter(username="benchmark").exists())
+        self.assertFalse(Token.objects.exists())
+
+    def test_existing_database_run_refuses_a_regular_benchmark_user(self):
+        user = CustomUser.objects.create(username="benchmark")
+        tokens = list(Token.objects.values_list("key", flat=True))
+        with self.assertRaises(CommandError):
+            self.run_existing()
+        user.refresh_from_db()
+        self.assertFalse(user.is_superuser)
+        self.assertEqual(list(Token.objects.values_list("key", flat=True)), tokens)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create(username="author")
+        self.posts = [
+            Post.objects.create(title=f"post {index}", content="content", user=self.user, is_active=True)
+            for index in range(5)
+        ]
+
+    def page(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [post["id"] for post in data["results"]], data["next"], data["previous"]
+
+    def cursor(self, **tokens):
+        return b64encode(parse.urlencode(tokens).encode("ascii")).decode("ascii")
+
+    def test_pages_are_ordered_by_created_time_then_id(self):
+        # Posts created on the same day tie on created_time and are ordered by id.
+        oldest = self.posts[4]
+        Post.objects.filter(pk=oldest.pk).update(created_time=oldest.created_time - timedelta(days=1))
+        ids = [post.pk for post in self.posts[3::-1]] + [oldest.pk]
+
+        first, next_url, previous = self.page("/blog/posts/", {"page_size": 2})
+        self.assertEqual(first, ids[:2])
+        self.assertIsNone(previous)
+        second, next_url, previous = self.page(next_url)
+        self.assertEqual(second, ids[2:4])
+        third, next_url, previous = self.page(next_url)
+        self.assertEqual(third, ids[4:])
+        self.assertIsNone(next_url)
+
+        back, next_url, previous = self.page(previous)
+        self.assertEqual(back, second)
+        self.assertEqual(self.page(next_url)[0], third)
+        back, _, previous = self.page(previous)
+        self.assertEqual(back, first)
+        self.assertIsNone(previous)
+
+    def test_cursor_round_trip(self):
+        _, next_url, _ = self.page("/blog/posts/", {"page_size": 2})
+        cursor = parse.parse_qs(parse.urlsplit(next_url).query)["cursor"][0]
+        tokens = parse.parse_qs(b64decode(cursor).decode("ascii"))
+        last = self.posts[3]
+        self.assertEqual(json.loads(tokens["k"][0]), [str(last.created_time), str(last.pk)])
+
+        # Rows inserted while paging don't shift the next page.
+        Post.objects.create(title="new", content="content", user=self.user, is_active=True)
+        second = self.page("/blog/posts/", {"page_size": 2, "cursor": cursor})[0]
+        self.assertEqual(second, [self.posts[2].pk, self.posts[1].pk])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        today = str(self.posts[0].created_time)
+        cursors = [
+            "not base64!",
+            self.cursor(k="not json"),
+            self.cursor(r="1"),
+            self.cursor(k=json.dumps([today])),
+            self.cursor(k=json.dumps(["yesterday", "1"])),
+            self.cursor(k=json.dumps([today, "one"])),
+            self.cursor(k=json.dumps([today, "1" * 30])),
+            self.cursor(k=json.dumps([today, ["1"]])),
+            self.cursor(k=json.dumps([today, "1"]), r="yes"),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/blog/posts/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+    def test_search_pages_are_ordered_by_rank_then_id(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(title="django")
+        Post.objects.filter(pk__in=[self.posts[1].pk, self.posts[2].pk]).update(content="django")
+        ids = [self.posts[0].pk, self.posts[2].pk, self.posts[1].pk]
+
+        first, next_url, _ = self.page("/blog/posts/", {"search": "django", "page_size": 2})
+        self.assertEqual(first, ids[:2])
+        second, next_url, previous = self.page(next_url)
+        self.assertEqual(second, ids[2:])
+        self.assertIsNone(next_url)
+        self.assertEqual(self.page(previous)[0], first)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        user = CustomUser.objects.create(username="author")
+        self.titles = ["Django tips", "Cooking", "Django signals and django caching"]
+        for title in self.titles:
+            Post.objects.create(title=title, content="content", user=user, is_active=True)
+
+    def test_search_ranks_prefix_matches(self):
+        response = self.client.get("/blog/posts/", {"search": "djan", "page_size": 1})
+        self.assertEqual([post["title"] for post in response.json()["results"]], [self.titles[2]])
+
+        response = self.client.get(response.json()["next"])
+        self.assertEqual([post["title"] for post in response.json()["results"]], [self.titles[0]])
+        self.assertIsNone(response.json()["next"])
+
+        Post.objects.filter(title="Cooking").update(title="Django recipes")
+        response = self.client.get("/blog/posts/", {"search": "\"recipes*"})
+        self.assertEqual([post["title"] for post in response.json()["results"]], ["Django recipes"])
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        user = CustomUser.objects.create(username="author")
+        tag = Tag.objects.create(name="tag")
+        for index in range(3):
+            post = Post.objects.create(title=f"post {index}", content="content", user=user, is_active=True)
+            post.tags.add(tag)
+
+    def get(self, view, path, **kwargs):
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        return view(APIRequestFactory().get(path), **kwargs).render()
+
+    def test_async_routes_match_sync_responses(self):
+        sync_list = PostsViewSet.as_view({"get": "list"}, basename="posts", detail=False)
+        sync_detail = PostsViewSet.as_view({"get": "retrieve"}, basename="posts", detail=True)
+        with override_settings(ASYNC_READ_ROUTES=["posts-list", "posts-detail"]):
+            async_list = PostsViewSet.as_view({"get": "list"}, basename="posts", detail=False)
+            async_detail = PostsViewSet.as_view({"get": "retrieve"}, basename="posts", detail=True)
+        self.assertTrue(asyncio.iscoroutinefunction(async_list))
+        self.assertFalse(asyncio.iscoroutinefunction(sync_list))
+
+        pk = Post.objects.first().pk
+        for sync_view, async_view, path, kwargs in [
+            (sync_list, async_list, "/blog/posts/?page_size=2", {}),
+            (sync_detail, async_detail, f"/blog/posts/{pk}/", {"pk": pk}),
+        ]:
+            expected = self.get(sync_view, path, **kwargs)
+            get_cache().clear()
+            response = self.get(async_view, path, **kwargs)
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(response["ETag"], expected["ETag"])
+            self.assertEqual(response["X-Cache"], "MISS")
+            self.assertEqual(self.get(async_view, path, **kwargs)["X-Cache"], "HIT")
+
+        self.assertEqual(self.get(async_detail, "/blog/posts/999/", pk=999).status_code, 404)
+
+
+class ValuesReadTests(TestCase):
+    def setUp(self):
+        BlogSeeder(users=3, tags=5, posts=12, comments=40, likes=10, images=8).run()
+        post = Post.objects.filter(images__isnull=False).first()
+        post.title = 'Quotes " \\ control \x01\x1f\x7f line \u2028 separators \u2029 unicode é 漢 😀'
+        post.is_active = True
+        post.save()
+        self.post = post
+        self.client = APIClient()
+
+    def get_responses(self, path):
+        """
+        Returns the content of `path` served from values() rows with orjson, from
+        values() rows with the json module, and by the regular serializers.
+        """
+        responses = []
+        get_cache().clear()
+        responses.append(self.client.get(path).content)
+        with mock.patch("blog.renderers.orjson", None):
+            get_cache().clear()
+            responses.append(self.client.get(path).content)
+        with mock.patch.object(PostsViewSet, "values_actions", ()), mock.patch.object(
+            CommentsViewSet, "values_actions", ()
+        ):
+            get_cache().clear()
+            responses.append(self.client.get(path).content)
+        return responses
+
+    def test_values_reads_match_serializers(self):
+        comment = Comment.objects.filter(is_active=True).first()
+        for path in [
+            "/blog/posts/?page_size=5",
+            f"/blog/posts/{self.post.pk}/",
+            "/blog/posts/?search=quotes",
+            "/blog/comments/?page_size=50",
+            f"/blog/comments/{comment.pk}/",
+        ]:
+            fast, json_module, regular = self.get_responses(path)
+            self.assertEqual(fast, regular, path)
+            self.assertEqual(json_module, regular, path)
+
+        next_page = self.client.get("/blog/posts/?page_size=5").json()["next"]
+        fast, json_module, regular = self.get_responses(next_page)
+        self.assertEqual(fast, regular)
+        self.assertIn(b"\\u2028", self.get_responses(f"/blog/posts/{self.post.pk}/")[0])
+
+
+class LikeSummaryTests(TestCase):
+    def test_summary_counts_likes_with_one_query(self):
+        user = CustomUser.objects.create(username="user")
+        posts = [Post.objects.create(title="post", content="content", user=user, is_active=True) for _ in range(2)]
+        content_type = ContentType.objects.get_for_model(Post)
+        for index, liked in enumerate([True, True, False]):
+            liker = user if index == 0 else CustomUser.objects.create(username=f"liker{index}")
+            Like.objects.create(
+                name="name",
+                email="name@example.com",
+                user=liker,
+                liked=liked,
+                content_type=content_type,
+                object_id=posts[0].pk,
+                is_active=index != 0,
+            )
+        client = APIClient()
+        client.force_authenticate(user)
+        path = f"/blog/likes/summary/?content_type={content_type.pk}&object_ids={posts[1].pk},{posts[0].pk}"
+
+        with self.assertNumQueries(1):
+            response = client.get(path)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"object_id": posts[1].pk, "likes": 0, "dislikes": 0, "liked": None},
+                {"object_id": posts[0].pk, "likes": 1, "dislikes": 1, "liked": True},
+            ],
+        )
+        self.assertEqual(APIClient().get(path).json()["results"][1]["liked"], None)
+        self.assertEqual(client.get("/blog/likes/summary/?content_type=0&object_ids=1").status_code, 400)
+
+
+class LikeToggleTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        get_bucket_store().clear()
+        self.user = CustomUser.objects.create(username="user")
+        self.post = Post.objects.create(title="post", content="content", user=self.user, is_active=True)
+        self.data = {"content_type": ContentType.objects.get_for_model(Post).pk, "object_id": self.post.pk}
+
+    def test_toggle_upserts_one_like_per_user_and_email(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post("/blog/likes/toggle/", self.data, format="json").status_code, 201)
+        response = client.post("/blog/likes/toggle/", self.data, format="json")
+        self.assertEqual(response.status_code, 200)
+        Like.objects.update(is_active=True)
+        self.post.like_count = 1
+        self.post.save()
+
+        response = client.post("/blog/likes/toggle/", {**self.data, "liked": False}, format="json")
+        self.assertEqual(response.json()["liked"], False)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+        data = {**self.data, "name": "name", "email": "name@example.com"}
+        self.assertEqual(APIClient().post("/blog/likes/toggle/", data, format="json").status_code, 201)
+        # Another anonymous client knowing the email can't change the like, nor read it.
+        response = APIClient().post("/blog/likes/toggle/", {**data, "liked": False}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertNotIn("email", response.json())
+        self.assertCountEqual(Like.objects.values_list("user", "liked"), [(None, True), (self.user.pk, False)])
+
+    def test_upsert_tells_inserted_likes_from_updated_ones(self):
+        content_type = ContentType.objects.get_for_model(Post)
+        other = CustomUser.objects.create(username="other")
+        with self.assertNumQueries(1):
+            like = upsert_like(content_type, self.post.pk, True, self.user)
+        self.assertTrue(like.inserted)
+        self.assertIsNone(upsert_like(content_type, self.post.pk, True, self.user))
+
+        # Flipping the row this connection inserted last is an update.
+        flipped = upsert_like(content_type, self.post.pk, False, self.user)
+        self.assertEqual((flipped.pk, flipped.inserted, flipped.liked), (like.pk, False, False))
+        self.assertTrue(upsert_like(content_type, self.post.pk, True, other).inserted)
+        self.assertFalse(upsert_like(content_type, self.post.pk, True, self.user).inserted)
+        self.assertEqual(Like.objects.count(), 2)
+
+    def test_double_created_like_is_a_conflict(self):
+        data = {**self.data, "name": "name", "email": "name@example.com"}
+        self.assertEqual(APIClient().post("/blog/likes/", data, format="json").status_code, 201)
+        response = APIClient().post("/blog/likes/", data, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Like.objects.count(), 1)
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.superuser = CustomUser.objects.create(username="admin", is_superuser=True, is_staff=True)
+        self.client.force_authenticate(self.superuser)
+        self.posts = [
+            Post.objects.create(title=f"post {index}", content="content", user=self.superuser, is_active=True)
+            for index in range(3)
+        ]
+
+    def test_scores_follow_comments_and_decay(self):
+        comments = [
+            Comment.objects.create(name="name", email="name@example.com", comment_text="text", post=post)
+            for post in (self.posts[1], self.posts[1], self.posts[2])
+        ]
+        response = self.client.post(
+            "/blog/comments/bulk_approve/", {"ids": [comment.pk for comment in comments]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = APIClient().get("/blog/posts/trending/")
+        results = response.json()["results"]
+        self.assertEqual([post["id"] for post in results], [self.posts[1].pk, self.posts[2].pk])
+        self.assertAlmostEqual(results[0]["trending_score"], 2 * COMMENT_WEIGHT, places=3)
+
+        self.client.delete(f"/blog/comments/{comments[0].pk}/")
+        scores = dict(top_posts(10))
+        self.assertAlmostEqual(scores[self.posts[1].pk], COMMENT_WEIGHT, places=3)
+
+        later = timezone.now() + get_half_life()
+        self.assertEqual(decay_scores(later), (2, 0))
+        self.assertAlmostEqual(dict(top_posts(10, now=later))[self.posts[1].pk], COMMENT_WEIGHT / 2, places=3)
+        rebuild_scores()
+        self.assertAlmostEqual(dict(top_posts(10))[self.posts[1].pk], COMMENT_WEIGHT, places=3)
+
+
+class ImagePipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name, GALLERY_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def jpeg(self, color, **options):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 600), color).save(buffer, "JPEG", **options)
+        return buffer.getvalue()
+
+    def upload(self, content):
+        serializer = GalleryImageSerializer(data={"file_name": SimpleUploadedFile("photo.jpg", content)})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_upload_is_deduplicated_stripped_and_resized(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees.
+        exif[0x010F] = "Camera maker"
+        content = self.jpeg("red", exif=exif.tobytes())
+
+        image = self.upload(content)
+        self.assertEqual(self.upload(content).pk, image.pk)
+        self.assertEqual(image.status, GalleryImage.Status.PENDING)
+        self.assertTrue(image.file_name.name.startswith("gallery/incoming/"))
+
+        self.assertEqual(process_images([image]), 1)
+        image.refresh_from_db()
+        self.assertEqual((image.status, image.width, image.height), ("ready", 600, 1200))
+        self.assertEqual(image.file_name.name, f"gallery/{image.sha256[:2]}/{image.sha256}.jpg")
+        with Image.open(image.file_name.path) as original:
+            self.assertEqual(dict(original.getexif()), {})
+        with Image.open(os.path.join(image.file_name.storage.location, image.renditions["small"])) as small:
+            self.assertEqual((small.format, small.size), ("WEBP", (160, 320)))
+        self.assertFalse(os.listdir(os.path.join(image.file_name.storage.location, "gallery", "incoming")))
+
+        serializer = GalleryImageSerializer(data={"file_name": SimpleUploadedFile("photo.jpg", b"not an image")})
+        self.assertFalse(serializer.is_valid())
+
+    def test_post_creation_inserts_images_and_links_in_bulk(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username="admin", is_staff=True, is_superuser=True))
+        tags = [Tag.objects.create(name=f"tag{index}") for index in range(3)]
+        queries = []
+        for count in (1, 3):
+            data = {"title": "post", "content": "content", "tags": [tag.pk for tag in tags[:count]]}
+            for index in range(count):
+                content = self.jpeg((count * 10, index * 10, 0))
+                data[f"images[{index}]file_name"] = SimpleUploadedFile(f"{index}.jpg", content)
+            with CaptureQueriesContext(connection) as context:
+                response = client.post("/blog/posts/", data, format="multipart")
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(response.json()["is_active"])
+            self.assertEqual(response.json()["tags"], data["tags"])
+            self.assertEqual(len(response.json()["images"]), count)
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[0], queries[1])
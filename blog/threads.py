@@ -0,0 +1,112 @@
+from .models import Comment
+
+
+# The anchor fetches one comment more than a page to tell whether another page
+# follows, without expanding its replies. The recursive step only follows the first
+# replies of each comment, so the whole thread is never expanded.
+THREAD_SQL = """
+WITH RECURSIVE thread (id, depth, position) AS (
+    SELECT id, 0, CAST(ROW_NUMBER() OVER (ORDER BY id) AS INTEGER)
+    FROM (
+        SELECT c.id
+        FROM {table} c
+        WHERE c.post_id = %s AND {parent} AND c.id > %s {active}
+        ORDER BY c.id
+        LIMIT %s
+    ) page
+    UNION ALL
+    SELECT c.id, thread.depth + 1, 0
+    FROM thread
+    JOIN {table} c ON c.id IN (
+        SELECT r.id
+        FROM {table} r
+        WHERE r.previous_comment_id = thread.id {reply_active}
+        ORDER BY r.id
+        LIMIT %s
+    )
+    WHERE thread.depth < %s AND thread.position <= %s
+)
+SELECT
+    c.*,
+    thread.depth AS depth,
+    thread.position AS position,
+    (SELECT COUNT(*) FROM {table} r WHERE r.previous_comment_id = c.id {reply_active}) AS reply_count
+FROM thread
+JOIN {table} c ON c.id = thread.id
+ORDER BY thread.depth, c.id
+"""
+
+
+def fetch_thread(post_id, max_depth, page_size, after=0, parent=None, include_inactive=False):
+    """
+    Fetches a page of the reply tree of a post with a single recursive CTE query.
+
+    The page holds at most `page_size` top-level comments with id greater than
+    `after`: the root comments of the post, or the replies of the `parent` comment.
+    Below them, at most `page_size` replies per comment are fetched, down to
+    `max_depth` levels.
+
+    Args:
+    - post_id (int): The primary key of the post.
+    - max_depth (int): The deepest reply level to fetch, 0 fetching the top level only.
+    - page_size (int): The maximum number of comments per level and parent.
+    - after (int, optional): Only top-level comments with a greater id are returned.
+    - parent (int, optional): The comment whose replies are paged, None for the root comments.
+    - include_inactive (bool, optional): Whether inactive comments are included.
+
+    Returns:
+    - tuple: The Comment instances annotated with `depth` (0 for the top level) and
+      `reply_count`, by depth then id, and whether more top-level comments follow.
+    """
+    table = Comment._meta.db_table
+    params = [post_id]
+    if parent is None:
+        parent_condition = "c.previous_comment_id IS NULL"
+    else:
+        parent_condition = "c.previous_comment_id = %s"
+        params.append(parent)
+        if not include_inactive:
+            parent_condition += f" AND EXISTS (SELECT 1 FROM {table} p WHERE p.id = %s AND p.is_active)"
+            params.append(parent)
+    sql = THREAD_SQL.format(
+        table=table,
+        parent=parent_condition,
+        active="" if include_inactive else "AND c.is_active",
+        reply_active="" if include_inactive else "AND r.is_active",
+    )
+    params += [after, page_size + 1, page_size, max_depth, page_size]
+    comments = list(Comment.objects.raw(sql, params))
+    has_more = any(comment.depth == 0 and comment.position > page_size for comment in comments)
+    return [comment for comment in comments if comment.depth or comment.position <= page_size], has_more
+
+
+def build_tree(rows, replies_link):
+    """
+    Nests serialized comments under their `previous_comment`.
+
+    Args:
+    - rows (list): Serialized comments ordered by depth, each with `id`,
+      `previous_comment`, `depth` and `reply_count` keys.
+    - replies_link (callable): Returns the link to the replies of a comment after
+      the given reply id.
+
+    Returns:
+    - list: The top-level comments, each with a `replies` list, a `has_more_replies`
+      flag and a `next_replies` link to the replies that were not fetched.
+    """
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = {**row, "replies": []}
+        if row["depth"] == 0:
+            roots.append(node)
+        elif row["previous_comment"] in nodes:
+            nodes[row["previous_comment"]]["replies"].append(node)
+        else:
+            continue
+        nodes[row["id"]] = node
+    for node in nodes.values():
+        node["has_more_replies"] = node["reply_count"] > len(node["replies"])
+        after = node["replies"][-1]["id"] if node["replies"] else 0
+        node["next_replies"] = replies_link(node["id"], after) if node["has_more_replies"] else None
+    return roots
@@ -0,0 +1,224 @@
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+LOCAL_MAX_BUCKETS = 100000
+
+# Refills the bucket in KEYS[1] for the time elapsed since its last update, then
+# takes one token if there is one. Runs atomically in Redis, on the Redis clock.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """
+    Parses a rate like DRF's throttles do, e.g. "10/min".
+
+    Returns:
+    - tuple: The bucket capacity and its refill rate in tokens per second.
+    """
+    count, period = rate.split("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Token buckets in the memory of this process. Each process enforces its own
+    limits, so a deployment with N processes accepts up to N times the rates.
+    """
+
+    def __init__(self, max_buckets=LOCAL_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self.buckets) >= self.max_buckets and key not in self.buckets:
+                # Buckets that refilled since their last use are the same as new ones.
+                self.buckets = {other: bucket for other, bucket in self.buckets.items() if bucket[2] > now}
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        return allowed, tokens
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every process, updated atomically by a Lua script.
+    When Redis can't be reached, requests are allowed rather than rejected.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("THROTTLE_REDIS_URL requires the redis package.")
+        self.errors = redis.RedisError
+        self.script = redis.Redis.from_url(url).register_script(TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key, capacity, rate):
+        try:
+            allowed, tokens = self.script(keys=[f"throttle:{key}"], args=[capacity, rate])
+        except self.errors:
+            logger.exception("Throttle store unavailable, allowing the request")
+            return True, float(capacity)
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        pass
+
+
+def get_bucket_store():
+    """
+    Returns the token bucket store: Redis when THROTTLE_REDIS_URL is set, or the
+    memory of this process otherwise.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            url = getattr(settings, "THROTTLE_REDIS_URL", None)
+            _store = RedisBucketStore(url) if url else LocalBucketStore()
+        return _store
+
+
+def set_bucket_store(store):
+    """
+    Replaces the token bucket store of this process, e.g. to benchmark another one.
+
+    Returns:
+    - The previous store, or None if none was created yet.
+    """
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limits requests with a token bucket per client identity and action.
+
+    The rate is looked up in DEFAULT_THROTTLE_RATES under
+    "<view.throttle_scope>.<view.action>.<kind>", e.g. "comments.create.ip"; the
+    throttle is skipped when no rate is set there or when `get_identity` returns
+    None. A rate of "10/min" allows bursts of 10 requests and refills one token
+    every 6 seconds.
+
+    The state of every bucket checked is appended to `request.rate_limits` for
+    ThrottleHeadersMixin.
+    """
+
+    kind = None
+
+    def get_identity(self, request, view):
+        raise NotImplementedError(".get_identity() must be overridden")
+
+    def get_rate(self, view):
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{view.action}.{self.kind}")
+        return parse_rate(rate) if scope and rate else None
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        identity = self.get_identity(request, view)
+        if identity is None:
+            return True
+
+        capacity, refill = rate
+        key = f"{view.throttle_scope}.{view.action}.{self.kind}:{identity}"
+        allowed, tokens = get_bucket_store().consume(key, capacity, refill)
+        self.wait_time = 0 if allowed else (1 - tokens) / refill
+        if not hasattr(request, "rate_limits"):
+            request.rate_limits = []
+        request.rate_limits.append((capacity, int(tokens), math.ceil((capacity - tokens) / refill)))
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = "ip"
+
+    def get_identity(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """
+    Limits the requests posting the same `email`, whoever sends them.
+    """
+
+    kind = "email"
+
+    def get_identity(self, request, view):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class UserThrottle(TokenBucketThrottle):
+    kind = "user"
+
+    def get_identity(self, request, view):
+        return request.user.pk if request.user.is_authenticated else None
+
+
+class ThrottleHeadersMixin:
+    """
+    Reports the quota of the most restrictive token bucket checked for the request
+    in X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset (the seconds
+    until the bucket is full again).
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        rate_limits = getattr(request, "rate_limits", None)
+        if rate_limits:
+            limit, remaining, reset = min(rate_limits, key=lambda rate_limit: rate_limit[1])
+            response["X-RateLimit-Limit"] = limit
+            response["X-RateLimit-Remaining"] = remaining
+            response["X-RateLimit-Reset"] = reset
+        return response
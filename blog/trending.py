@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .counters import comment_counter_key, like_counter_key
+from .models import Post, Comment, Like, PostScore
+
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+# Contributions older than this many half-lives weigh less than a millionth of a
+# fresh one: rebuilds leave them out and `decay_scores` deletes such scores.
+NEGLIGIBLE_HALF_LIVES = 20
+MIN_SCORE = LIKE_WEIGHT * 2.0**-NEGLIGIBLE_HALF_LIVES
+
+# The decayed_at of the scores, as last seen by this process.
+_reference = None
+
+
+def get_half_life():
+    return timedelta(hours=getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24))
+
+
+def weight_at(time, reference):
+    """
+    Returns the weight at `reference` of a contribution of weight 1 made at `time`:
+    2 ** ((time - reference) / half-life), above 1 when `time` is later.
+    """
+    return 2.0 ** ((time - reference) / get_half_life())
+
+
+def get_reference():
+    """
+    Returns the time the scores are expressed at: the last `decay_trending` run, or
+    now when there are no scores yet.
+    """
+    return PostScore.objects.aggregate(reference=Max("decayed_at"))["reference"] or timezone.now()
+
+
+def like_contribution(like):
+    """
+    Returns the (post id, weight, time) that `like` adds to the trending scores.
+
+    Likes count like they count in like_count: only active likes with `liked=True`,
+    and only likes of posts. They count from their last change.
+
+    Args:
+    - like (Like): The like instance.
+
+    Returns:
+    - tuple or None: The contribution, or None if the like is not counted.
+    """
+    key = like_counter_key(like)
+    if key is None or key[0] is not Post:
+        return None
+    return key[1], LIKE_WEIGHT, like.updated_time
+
+
+def comment_contribution(comment):
+    """
+    Returns the (post id, weight, time) that `comment` adds to the trending scores,
+    or None if the comment is not active.
+    """
+    post_id = comment_counter_key(comment)
+    return None if post_id is None else (post_id, COMMENT_WEIGHT, comment.updated_time)
+
+
+def apply_score_change(before, after):
+    """
+    Moves a contribution between trending scores, like apply_like_change moves a
+    like between counters. Edits that keep the contribution on the same post
+    leave the score as it is.
+
+    Args:
+    - before (tuple or None): The contribution of the like or comment before the write.
+    - after (tuple or None): The contribution after the write.
+    """
+    if before is not None and after is not None and before[:2] == after[:2]:
+        return
+    apply_score_changes(added=[after] if after else [], removed=[before] if before else [])
+
+
+def apply_score_changes(added=(), removed=()):
+    """
+    Adds and removes many contributions with one UPDATE per post.
+
+    Args:
+    - added (iterable): Contributions to add to the scores of their posts.
+    - removed (iterable): Contributions to remove from the scores of their posts.
+    """
+    weights = defaultdict(list)
+    for post_id, weight, time in added:
+        weights[post_id].append((weight, time))
+    for post_id, weight, time in removed:
+        weights[post_id].append((-weight, time))
+    for post_id, post_weights in weights.items():
+        add_score(post_id, post_weights)
+
+
+def add_score(post_id, weights):
+    """
+    Adds the (weight, time) contributions of `weights` to the score of a post with
+    an atomic `score = score + delta` UPDATE, scaled to the score's decayed_at.
+
+    The delta is computed for the decayed_at this process last saw. When the score
+    doesn't exist or was decayed since, it is locked and updated (or created at the
+    current decayed_at) instead, and the new decayed_at is remembered.
+    """
+    global _reference
+    reference = _reference
+    if reference is not None:
+        delta = sum(weight * weight_at(time, reference) for weight, time in weights)
+        updated = PostScore.objects.filter(post_id=post_id, decayed_at=reference).update(
+            score=Greatest(F("score") + delta, Value(0.0))
+        )
+        if updated:
+            return
+    with transaction.atomic():
+        row = PostScore.objects.select_for_update().filter(post_id=post_id).first()
+        if row is None:
+            # Likes reference posts by object_id, which may point at a deleted post.
+            if not Post.objects.filter(pk=post_id).exists():
+                return
+            row, _ = PostScore.objects.select_for_update().get_or_create(
+                post_id=post_id, defaults={"decayed_at": get_reference}
+            )
+        row.score = max(row.score + sum(weight * weight_at(time, row.decayed_at) for weight, time in weights), 0.0)
+        row.save(update_fields=["score"])
+    _reference = row.decayed_at
+
+
+def compute_scores(reference, post_ids=None):
+    """
+    Computes the scores of `post_ids`, or of every post, at `reference` from their
+    active likes and comments of the last NEGLIGIBLE_HALF_LIVES half-lives.
+
+    Returns:
+    - dict: The score of each post with a contribution.
+    """
+    since = reference - get_half_life() * NEGLIGIBLE_HALF_LIVES
+    posts = Post.objects.all() if post_ids is None else Post.objects.filter(pk__in=post_ids)
+    likes = Like.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        object_id__in=posts.values("pk"),
+        is_active=True,
+        liked=True,
+        updated_time__gte=since,
+    )
+    comments = Comment.objects.filter(post__in=posts.values("pk"), is_active=True, updated_time__gte=since)
+    scores = defaultdict(float)
+    for rows, weight in [
+        (likes.values_list("object_id", "updated_time"), LIKE_WEIGHT),
+        (comments.values_list("post_id", "updated_time"), COMMENT_WEIGHT),
+    ]:
+        for post_id, time in rows.iterator(chunk_size=5000):
+            scores[post_id] += weight * weight_at(time, reference)
+    return scores
+
+
+def rebuild_scores(post_ids=None):
+    """
+    Recomputes the scores of `post_ids` from their likes and comments, e.g. after
+    deleting a comment deleted its replies in cascade. Without `post_ids`, the whole
+    table is rebuilt at the current time, e.g. after a bulk import.
+
+    Returns:
+    - int: The number of scores written.
+    """
+    global _reference
+    with transaction.atomic():
+        if post_ids is None:
+            reference = timezone.now()
+            PostScore.objects.all().delete()
+        else:
+            reference = get_reference()
+            PostScore.objects.filter(post_id__in=post_ids).delete()
+        scores = compute_scores(reference, post_ids)
+        PostScore.objects.bulk_create(
+            [PostScore(post_id=post_id, score=score, decayed_at=reference) for post_id, score in scores.items()],
+            batch_size=5000,
+        )
+    _reference = reference
+    return len(scores)
+
+
+def decay_scores(now=None):
+    """
+    Moves every score to `now`, with one UPDATE per distinct decayed_at (usually
+    one), and deletes the scores that decayed below MIN_SCORE. Run periodically, it
+    keeps scores small and the table limited to recently active posts.
+
+    Returns:
+    - tuple: The number of decayed and deleted scores.
+    """
+    global _reference
+    now = now or timezone.now()
+    decayed = 0
+    with transaction.atomic():
+        references = PostScore.objects.exclude(decayed_at=now).order_by().values_list("decayed_at", flat=True)
+        for reference in set(references.distinct()):
+            decayed += PostScore.objects.filter(decayed_at=reference).update(
+                score=F("score") * weight_at(reference, now), decayed_at=now
+            )
+        deleted, _ = PostScore.objects.filter(score__lt=MIN_SCORE).delete()
+    _reference = now
+    return decayed, deleted
+
+
+def top_posts(limit, include_inactive=False, now=None):
+    """
+    Returns the posts with the highest trending scores, read in post_score_idx
+    order, so the cost depends on `limit` rather than on the number of posts.
+
+    Args:
+    - limit (int): The number of posts.
+    - include_inactive (bool): Whether posts awaiting approval are included.
+    - now (datetime, optional): The time the returned scores are decayed to.
+
+    Returns:
+    - list: (post id, score) tuples, highest score first.
+    """
+    now = now or timezone.now()
+    rows = PostScore.objects.filter(score__gt=0)
+    if not include_inactive:
+        rows = rows.filter(post__is_active=True)
+    rows = rows.order_by("-score", "-post").values_list("post", "score", "decayed_at")[:limit]
+    return [(post_id, score * weight_at(decayed_at, now)) for post_id, score, decayed_at in rows]
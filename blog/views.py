@@ -1,18 +1,70 @@
+from collections import Counter
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
-
+from rest_framework.utils.urls import replace_query_param
+
+from . import notifications
+from .asynchronous import AsyncReadMixin
+from .bulk import BulkActionMixin
+from .cache import CachedResponseMixin, invalidate_many_on_commit, invalidate_on_commit
+from .conditional import ConditionalGetMixin
+from .exports import ExportMixin
+from .fast_reads import ValuesReadMixin
+from .likes import find_like, insert_like, upsert_like
+from .counters import (
+    apply_comment_change,
+    apply_comment_deltas,
+    apply_like_change,
+    apply_like_deltas,
+    comment_counter_key,
+    like_counter_key,
+    refresh_comment_count,
+    summarize_likes,
+)
 from .models import Tag, Post, Comment, Like
-from .serializers import TagSerializer, PostSerializer, CommentSerializer, LikeSerializer, ContentTypeSerializer
-from .permissions import IsOwner, IsOwnerOrStaff, IsOwnerOrSuperuser, IsSuperuser
-
-
-class TagsViewSet(viewsets.ModelViewSet):
+from .pagination import KeysetPagination
+from .query_plans import QueryPlanMixin
+from .replicas import ReplicaReadMixin
+from .search import FullTextSearchFilter
+from .serializers import (
+    TagSerializer,
+    PostSerializer,
+    CommentSerializer,
+    ThreadedCommentSerializer,
+    LikeSerializer,
+    ContentTypeSerializer,
+    BulkIdsSerializer,
+    LikeToggleSerializer,
+    LikeSummarySerializer,
+    LikeUpsertSerializer,
+)
+from .threads import build_tree, fetch_thread
+from .trending import (
+    COMMENT_WEIGHT,
+    apply_score_change,
+    apply_score_changes,
+    comment_contribution,
+    like_contribution,
+    rebuild_scores,
+    top_posts,
+)
+from .throttling import EmailThrottle, IPThrottle, ThrottleHeadersMixin, UserThrottle
+from .permissions import IsOwner, IsOwnerOrStaff, IsOwnerOrSuperuser, IsSuperuser, IsSuperuserUser
+
+
+class TagsViewSet(ReplicaReadMixin, CachedResponseMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_namespace = "tags"
     filterset_fields = {
         "name": ("exact", "icontains"),
     }
@@ -33,9 +85,68 @@ class TagsViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
+    @action(methods=["post"], detail=False)
+    def bulk_create(self, request):
+        """
+        Creates many tags with a single INSERT.
+
+        The request body is a list of tags. Nothing is created if any of them is
+        invalid, in which case the errors are returned per item.
 
-class PostsViewSet(viewsets.ModelViewSet):
+        Args:
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - Response: The created tags with HTTP 201 CREATED status.
+        """
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+            invalidate_on_commit("tags")
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PostsViewSet(
+    ReplicaReadMixin,
+    ExportMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesReadMixin,
+    QueryPlanMixin,
+    BulkActionMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = PostSerializer
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    cache_namespace = "posts"
+    export_fields = (
+        "title",
+        "content",
+        "user",
+        "user__username",
+        "allow_comments",
+        "is_active",
+        "like_count",
+        "comment_count",
+        "created_time",
+        "updated_time",
+    )
+    export_many_fields = ("tags", "images")
+    conditional_counter_fields = ("like_count", "comment_count")
+    conditional_related_times = ("user__updated_time",)
+    conditional_many_fields = ("tags", "images")
+    thread_depth = 10
+    thread_max_depth = 50
+    thread_page_size = 50
+    thread_max_page_size = 500
+    trending_limit = 20
+    trending_max_limit = 100
+    query_plan_actions = ("list", "retrieve", "trending")
+    replica_actions = ("list", "retrieve", "export", "trending")
+    pagination_class = KeysetPagination
+    max_page_size = 50
     parser_classes = (MultiPartParser,)
     filterset_fields = {
         "title": ("icontains",),
@@ -58,32 +169,38 @@ class PostsViewSet(viewsets.ModelViewSet):
         Retrieves a queryset of Post objects based on user permissions.
 
         If the user is a superuser, it returns all Post objects. Otherwise,
-        it returns only the active Post objects.
+        it returns only the active Post objects. The query plan of the current
+        action is applied so related users and tags are fetched in bulk.
 
         Returns:
         - QuerySet: A queryset of Post objects.
         """
         user = self.request.user
-        return Post.objects.all() if user.is_superuser else Post.objects.filter(is_active=True)
+        queryset = Post.objects.all() if user.is_superuser else Post.objects.filter(is_active=True)
+        return self.plan_queryset(queryset)
 
     def get_permissions(self):
         """
         Determines permission classes based on the action being performed.
 
-        - For actions "list" and "retrieve": any user is allowed.
+        - For actions "list", "retrieve", "comments_tree" and "trending": any user is allowed.
         - For actions "update", "partial_update", and "destroy": only the owner or a superuser is allowed.
         - For the action "approve_post": only a superuser is allowed.
+        - For the actions "bulk_approve" and "export": only superusers are allowed, checked
+          before any object is read.
         - For all other actions: only admin users are allowed.
 
         Returns:
         - list: A list of instantiated permission classes.
         """
-        if self.action == "list" or self.action == "retrieve":
+        if self.action in ["list", "retrieve", "comments_tree", "trending"]:
             permission_classes = [AllowAny]
         elif self.action in ["update", "partial_update", "destroy"]:
             permission_classes = [IsOwnerOrSuperuser]
         elif self.action == "approve_post":
             permission_classes = [IsSuperuser]
+        elif self.action in ["bulk_approve", "export"]:
+            permission_classes = [IsSuperuserUser]
         else:
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
@@ -92,8 +209,8 @@ class PostsViewSet(viewsets.ModelViewSet):
         """
         Overrides the default create method to handle post creation.
 
-        After saving the post, the method checks if the user is a superuser. If so,
-        the post's `is_active` attribute is set to True; otherwise, it's set to False.
+        The post is saved with `is_active` set to True when the user is a superuser,
+        and to False otherwise, so posts of other users need approval.
 
         Args:
         - request (Request): The HTTP request object containing post data.
@@ -106,12 +223,7 @@ class PostsViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        post = serializer.save()
-        if request.user.is_superuser:
-            post.is_active = True
-        else:
-            post.is_active = False
-        post.save()
+        serializer.save(is_active=request.user.is_superuser)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
@@ -128,13 +240,142 @@ class PostsViewSet(viewsets.ModelViewSet):
         - Response: Message indicating approval with HTTP 202 ACCEPTED status.
         """
         post = self.get_object()
-        post.is_active = True
-        post.save()
+        with transaction.atomic():
+            post.is_active = True
+            post.save()
+            notifications.post_approved([post])
         return Response({"message": "Post approved"}, status=status.HTTP_202_ACCEPTED)
 
+    @action(methods=["post"], detail=False, parser_classes=[JSONParser, MultiPartParser])
+    def bulk_approve(self, request):
+        """
+        Approves many posts with a single UPDATE.
 
-class CommentsViewSet(viewsets.ModelViewSet):
+        Args:
+        - request (Request): The HTTP request object, with the post `ids` to approve.
+
+        Returns:
+        - Response: The status of each id: "approved", "already_active",
+          "not_found" or "forbidden".
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        with transaction.atomic():
+            queryset = self.get_queryset().select_for_update().only("id", "user_id", "is_active")
+            posts, statuses = self.get_bulk_objects(ids, queryset)
+            pending = [post for post in posts if not post.is_active]
+            pending_ids = [post.pk for post in pending]
+            Post.objects.filter(pk__in=pending_ids).update(is_active=True, updated_time=timezone.now())
+            invalidate_many_on_commit("posts", pending_ids)
+            notifications.post_approved(pending)
+        statuses.update({post.pk: "already_active" if post.is_active else "approved" for post in posts})
+        return self.bulk_response(ids, statuses)
+
+    @action(methods=["get"], detail=True, url_path="comments/tree")
+    def comments_tree(self, request, pk=None):
+        """
+        Returns a page of the nested reply tree of a post, fetched with a single query.
+
+        Query parameters:
+        - depth (int): The number of reply levels below the top-level comments.
+        - page_size (int): The maximum number of top-level comments, and of replies per comment.
+        - after (int): Only top-level comments with a greater id are returned; use the `next` link.
+        - parent (int): Page the replies of this comment instead of the root comments;
+          use the `next_replies` link of a comment.
+
+        Args:
+        - request (Request): The HTTP request object.
+        - pk (int, optional): The primary key of the post.
+
+        Returns:
+        - Response: The top-level comments, each with nested `replies`, and a `next` link.
+        """
+        post = self.get_object()
+        depth = self.get_int_param("depth", self.thread_depth, 0, self.thread_max_depth)
+        page_size = self.get_int_param("page_size", self.thread_page_size, 1, self.thread_max_page_size)
+        after = self.get_int_param("after", 0, 0, None)
+        parent = self.get_int_param("parent", None, 1, None)
+
+        comments, has_more = fetch_thread(
+            post.pk, depth, page_size, after, parent, include_inactive=request.user.is_superuser
+        )
+        rows = ThreadedCommentSerializer(comments, many=True, context=self.get_serializer_context()).data
+        url = request.build_absolute_uri()
+
+        def replies_link(comment_id, reply_id):
+            return replace_query_param(replace_query_param(url, "parent", comment_id), "after", reply_id)
+
+        roots = build_tree(rows, replies_link)
+        next_link = replace_query_param(url, "after", roots[-1]["id"]) if has_more else None
+        return Response({"next": next_link, "results": roots})
+
+    @action(methods=["get"], detail=False)
+    def trending(self, request):
+        """
+        Returns the posts with the highest trending scores, highest first. Scores
+        add up the likes and comments of each post, halved every
+        TRENDING_HALF_LIFE_HOURS since they were made (see blog/trending.py).
+
+        Query parameters:
+        - limit (int): The number of posts.
+
+        Args:
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - Response: The posts, each with its `trending_score`.
+        """
+        limit = self.get_int_param("limit", self.trending_limit, 1, self.trending_max_limit)
+        scores = top_posts(limit, include_inactive=request.user.is_superuser)
+        posts = self.get_queryset().in_bulk([post_id for post_id, _ in scores])
+        scores = [(posts[post_id], score) for post_id, score in scores if post_id in posts]
+        rows = self.get_serializer([post for post, _ in scores], many=True).data
+        return Response({"results": [{**row, "trending_score": score} for row, (_, score) in zip(rows, scores)]})
+
+    def get_int_param(self, name, default, minimum, maximum):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: "A valid integer is required."})
+        if value < minimum:
+            raise ValidationError({name: f"Ensure this value is greater than or equal to {minimum}."})
+        return value if maximum is None else min(value, maximum)
+
+
+class CommentsViewSet(
+    ReplicaReadMixin,
+    ExportMixin,
+    ThrottleHeadersMixin,
+    ConditionalGetMixin,
+    ValuesReadMixin,
+    QueryPlanMixin,
+    BulkActionMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = CommentSerializer
+    throttle_classes = [IPThrottle, EmailThrottle, UserThrottle]
+    throttle_scope = "comments"
+    export_fields = (
+        "post",
+        "previous_comment",
+        "user",
+        "name",
+        "email",
+        "comment_text",
+        "is_active",
+        "like_count",
+        "created_time",
+        "updated_time",
+    )
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    conditional_counter_fields = ("like_count",)
+    pagination_class = KeysetPagination
+    max_page_size = 200
     filterset_fields = {
         "comment_text": ("icontains",),
         "post": ("exact", "in"),
@@ -162,7 +403,8 @@ class CommentsViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return Comment.objects.all() if user.is_superuser else Comment.objects.filter(is_active=True)
+        queryset = Comment.objects.all() if user.is_superuser else Comment.objects.filter(is_active=True)
+        return self.plan_queryset(queryset)
 
     def get_permissions(self):
         """
@@ -170,6 +412,7 @@ class CommentsViewSet(viewsets.ModelViewSet):
 
         - "update" or "partial_update" requires the user to be the owner.
         - "destroy" allows either the owner or staff.
+        - "bulk_approve" and "export" require a superuser, checked before any object is read.
         - All other actions allow any user.
 
         Returns:
@@ -179,13 +422,94 @@ class CommentsViewSet(viewsets.ModelViewSet):
             permission_classes = [IsOwner]
         elif self.action == "destroy":
             permission_classes = [IsOwnerOrStaff]
+        elif self.action in ["bulk_approve", "export"]:
+            permission_classes = [IsSuperuserUser]
         else:
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        comment = serializer.save()
+        apply_comment_change(None, comment_counter_key(comment))
+        apply_score_change(None, comment_contribution(comment))
+        notifications.comment_created(comment)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = comment_counter_key(serializer.instance)
+        contribution = comment_contribution(serializer.instance)
+        comment = serializer.save()
+        apply_comment_change(before, comment_counter_key(comment))
+        apply_score_change(contribution, comment_contribution(comment))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Deletes the comment and recounts and rescores its post, since replies are
+        deleted in cascade.
+        """
+        post_id = instance.post_id
+        instance.delete()
+        refresh_comment_count([post_id])
+        rebuild_scores([post_id])
+
+    @action(methods=["post"], detail=False)
+    def bulk_approve(self, request):
+        """
+        Approves many comments with a single UPDATE and adjusts the comment_count
+        of their posts.
+
+        Args:
+        - request (Request): The HTTP request object, with the comment `ids` to approve.
 
-class LikesViewSet(viewsets.ModelViewSet):
+        Returns:
+        - Response: The status of each id: "approved", "already_active",
+          "not_found" or "forbidden".
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        with transaction.atomic():
+            queryset = self.get_queryset().select_for_update().only("id", "user_id", "post_id", "is_active")
+            comments, statuses = self.get_bulk_objects(ids, queryset)
+            pending = [comment for comment in comments if not comment.is_active]
+            now = timezone.now()
+            Comment.objects.filter(pk__in=[comment.pk for comment in pending]).update(is_active=True, updated_time=now)
+            deltas = Counter(comment.post_id for comment in pending)
+            apply_comment_deltas(deltas)
+            apply_score_changes(added=[(comment.post_id, COMMENT_WEIGHT, now) for comment in pending])
+            invalidate_many_on_commit("posts", deltas)
+            notifications.comment_approved(pending)
+        statuses.update({comment.pk: "already_active" if comment.is_active else "approved" for comment in comments})
+        return self.bulk_response(ids, statuses)
+
+
+class LikeExists(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This object is already liked by this user or email."
+    default_code = "like_exists"
+
+
+class LikesViewSet(ReplicaReadMixin, ExportMixin, ThrottleHeadersMixin, BulkActionMixin, viewsets.ModelViewSet):
     serializer_class = LikeSerializer
+    throttle_classes = [IPThrottle, EmailThrottle, UserThrottle]
+    throttle_scope = "likes"
+    replica_actions = ("list", "retrieve", "export", "summary")
+    export_fields = (
+        "content_type__app_label",
+        "content_type__model",
+        "object_id",
+        "user",
+        "name",
+        "email",
+        "liked",
+        "is_active",
+        "created_time",
+        "updated_time",
+    )
+    pagination_class = KeysetPagination
+    max_page_size = 500
     filterset_fields = {
         "user": ("exact",),
         "created_time": (
@@ -206,18 +530,188 @@ class LikesViewSet(viewsets.ModelViewSet):
         """
         Determines permission classes based on the action.
 
-        - "list", "retrieve", or "create" actions allow any user.
+        - "list", "retrieve", "create", "toggle" or "summary" actions allow any user.
+        - "export" requires a superuser, including for reading.
         - All other actions require the user to be the owner or a staff member.
 
         Returns:
         - list: Instantiated permission classes for the current action.
         """
-        if self.action in ["list", "retrieve", "create"]:
+        if self.action in ["list", "retrieve", "create", "toggle", "summary"]:
             permission_classes = [AllowAny]
+        elif self.action == "export":
+            permission_classes = [IsSuperuserUser]
         else:
             permission_classes = [IsOwnerOrStaff]
         return [permission() for permission in permission_classes]
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """
+        Creates the like, answering HTTP 409 CONFLICT when the user or email already
+        has a like of the object, e.g. on a double click.
+        """
+        try:
+            with transaction.atomic():
+                like = serializer.save()
+        except IntegrityError:
+            raise LikeExists()
+        apply_like_change(None, like_counter_key(like))
+        apply_score_change(None, like_contribution(like))
+        notifications.like_created(like)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = like_counter_key(serializer.instance)
+        contribution = like_contribution(serializer.instance)
+        like = serializer.save()
+        apply_like_change(before, like_counter_key(like))
+        apply_score_change(contribution, like_contribution(like))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        before = like_counter_key(instance)
+        contribution = like_contribution(instance)
+        instance.delete()
+        apply_like_change(before, None)
+        apply_score_change(contribution, None)
+
+    @action(methods=["post"], detail=False)
+    def toggle(self, request):
+        """
+        Likes or dislikes an object: sets `liked` on the like of the current user,
+        creating it when needed. Anonymous users can only create a like for their
+        email; changing an existing anonymous like requires signing in.
+
+        The like of a user is created or changed with a single INSERT ... ON CONFLICT
+        DO UPDATE statement, and anonymous likes are created with an INSERT ... ON
+        CONFLICT DO NOTHING (see blog/likes.py), so repeated and concurrent requests,
+        e.g. double clicks, are answered with the same like instead of failing on
+        the unique constraints. Requests that change nothing don't write.
+
+        Args:
+        - request (Request): The HTTP request object, with the `content_type`,
+          `object_id` and `liked` (default true) of the like, and the `name` and
+          `email` of anonymous users.
+
+        Returns:
+        - Response: The like, with HTTP 201 CREATED status when this request created
+          it, or HTTP 409 CONFLICT when the email already has an anonymous like of the object.
+        """
+        serializer = LikeUpsertSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        user = request.user if request.user.is_authenticated else None
+        with transaction.atomic():
+            if user is None:
+                like = insert_like(**data)
+                created = like is not None
+            else:
+                like = upsert_like(user=user, **data)
+                created = like is not None and like.inserted
+                if like is not None and not created:
+                    self.apply_toggle(like)
+            if created:
+                notifications.like_created(like)
+        if created:
+            return Response(self.get_serializer(like).data, status=status.HTTP_201_CREATED)
+        if user is None:
+            raise LikeExists("This email already likes this object. Sign in to change the like.")
+        if like is None:
+            # The like already had `liked`.
+            like = find_like(data["content_type"], data["object_id"], user=user)
+        return Response(self.get_serializer(like).data)
+
+    def apply_toggle(self, like):
+        """
+        Updates the counters and trending score after the upsert flipped `liked` on
+        an existing like. Its previous contribution to the trending score dates from
+        an update the upsert overwrote, so the post is rescored instead.
+        """
+        before = Like(
+            liked=not like.liked,
+            is_active=like.is_active,
+            content_type_id=like.content_type_id,
+            object_id=like.object_id,
+        )
+        before_key = like_counter_key(before)
+        after_key = like_counter_key(like)
+        apply_like_change(before_key, after_key)
+        if like_contribution(before) is not None:
+            rebuild_scores([like.object_id])
+        else:
+            apply_score_change(None, like_contribution(like))
+        if before_key != after_key and (before_key or after_key)[0] is Post:
+            invalidate_on_commit("posts", like.object_id)
+
+    @action(methods=["get"], detail=False)
+    def summary(self, request):
+        """
+        Returns the like and dislike totals of many objects, and the like state of
+        the current user on each, read with a single grouped query.
+
+        Args:
+        - request (Request): The HTTP request object, with the `content_type` id (see
+          /blog/contenttypes/) and the comma-separated `object_ids` of the objects.
+
+        Returns:
+        - Response: One result per object id, in the requested order.
+        """
+        object_ids = request.query_params.get("object_ids", "")
+        serializer = LikeSummarySerializer(
+            data={
+                "content_type": request.query_params.get("content_type"),
+                "object_ids": [object_id for object_id in object_ids.split(",") if object_id.strip()],
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        content_type = serializer.validated_data["content_type"]
+        summaries = summarize_likes(content_type, serializer.validated_data["object_ids"], request.user)
+        return Response(
+            {
+                "content_type": content_type.pk,
+                "results": [{"object_id": object_id, **summary} for object_id, summary in summaries.items()],
+            }
+        )
+
+    @action(methods=["post"], detail=False)
+    def bulk_toggle(self, request):
+        """
+        Sets `liked` on many likes with a single bulk UPDATE.
+
+        Args:
+        - request (Request): The HTTP request object, with a list of `{"id", "liked"}` items.
+
+        Returns:
+        - Response: The status of each id: "updated", "unchanged", "not_found" or "forbidden".
+        """
+        serializer = LikeToggleSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        liked = {item["id"]: item["liked"] for item in serializer.validated_data}
+        ids = list(liked)
+        with transaction.atomic():
+            likes, statuses = self.get_bulk_objects(ids, self.get_queryset().select_for_update())
+            changed = [like for like in likes if like.liked != liked[like.pk]]
+            deltas = Counter()
+            added, removed = [], []
+            now = timezone.now()
+            for like in changed:
+                before = like_counter_key(like)
+                removed.append(like_contribution(like))
+                like.liked = liked[like.pk]
+                like.updated_time = now
+                after = like_counter_key(like)
+                added.append(like_contribution(like))
+                if before != after:
+                    deltas[before or after] += 1 if after else -1
+            Like.objects.bulk_update(changed, ["liked", "updated_time"])
+            apply_like_deltas(deltas)
+            apply_score_changes(added=filter(None, added), removed=filter(None, removed))
+            invalidate_many_on_commit("posts", [object_id for model, object_id in deltas if model is Post])
+        changed_ids = {like.pk for like in changed}
+        statuses.update({like.pk: "updated" if like.pk in changed_ids else "unchanged" for like in likes})
+        return self.bulk_response(ids, statuses)
+
 
 class ContentTypeListView(generics.ListAPIView):
     queryset = ContentType.objects.all()
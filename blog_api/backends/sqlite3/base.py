@@ -0,0 +1,68 @@
+"""
+SQLite backend for concurrent production traffic.
+
+It backports two options of the Django 5.1 SQLite backend:
+- "init_command": SQL run on every new connection, e.g. PRAGMA statements.
+- "transaction_mode": "DEFERRED", "IMMEDIATE" or "EXCLUSIVE", the kind of the
+  transactions started by atomic().
+
+With IMMEDIATE transactions, a transaction takes the write lock when it begins
+instead of at its first write, so it waits for other writers with the busy
+timeout instead of failing with "database is locked" when it started reading an
+older snapshot. When the lock is still taken after the timeout, BEGIN is retried
+with exponential backoff: nothing ran in the transaction yet, so it is always safe.
+"""
+import logging
+import random
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+BUSY_RETRIES = 5
+BUSY_RETRY_DELAY = 0.05
+
+
+def is_busy_error(error):
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.init_command = params.pop("init_command", None)
+        self.transaction_mode = (params.pop("transaction_mode", None) or "DEFERRED").upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}.")
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if self.init_command:
+            conn.executescript(self.init_command)
+        return conn
+
+    def is_usable(self):
+        try:
+            self.connection.execute("SELECT 1")
+        except self.Database.Error:
+            return False
+        return True
+
+    def _start_transaction_under_autocommit(self):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                self.cursor().execute(f"BEGIN {self.transaction_mode}")
+                return
+            except OperationalError as exc:
+                if attempt == BUSY_RETRIES or not is_busy_error(exc):
+                    raise
+                delay = BUSY_RETRY_DELAY * 2**attempt * (1 + random.random())
+                logger.warning("SQLite write lock busy, retrying BEGIN in %.2fs", delay)
+                time.sleep(delay)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import json
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from django.core.exceptions import ImproperlyConfigured
@@ -59,6 +60,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "blog.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -99,12 +101,112 @@ DATABASES = {
     }
 }
 
+# "sqlite-production" tunes SQLite for concurrent requests: WAL lets readers run while a write commits, writers
+# queue for the lock at BEGIN instead of failing, and connections are kept open between requests.
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "sqlite")
+
+SQLITE_PRODUCTION = {
+    "ENGINE": "blog_api.backends.sqlite3",
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "OPTIONS": {
+        "timeout": 5,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": (
+            "PRAGMA journal_mode = WAL;"
+            "PRAGMA synchronous = NORMAL;"
+            "PRAGMA cache_size = -64000;"
+            "PRAGMA mmap_size = 268435456;"
+            "PRAGMA temp_store = MEMORY;"
+        ),
+    },
+}
+
+# "postgresql" connects to the server in the POSTGRES_* environment variables (pip install "psycopg[binary]").
+# Each worker thread keeps its connection for 10 minutes; to share a few server connections between many workers,
+# point POSTGRES_HOST/POSTGRES_PORT at PgBouncer in transaction pooling mode and set POSTGRES_PGBOUNCER=1, which
+# disables the server-side cursors that transaction pooling breaks.
+POSTGRESQL = {
+    "ENGINE": "django.db.backends.postgresql",
+    "NAME": os.environ.get("POSTGRES_DB", "blog_api"),
+    "USER": os.environ.get("POSTGRES_USER", "blog_api"),
+    "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+    "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+    "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("POSTGRES_PGBOUNCER") == "1",
+    "OPTIONS": {"connect_timeout": 5},
+}
+
+if DATABASE_PROFILE == "sqlite-production":
+    DATABASES["default"].update(SQLITE_PRODUCTION)
+elif DATABASE_PROFILE == "postgresql":
+    DATABASES["default"] = POSTGRESQL
+elif DATABASE_PROFILE != "sqlite":
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}.")
+
+# Read replicas of the default database: SQLite file names, or PostgreSQL hosts with the "postgresql" profile.
+# The blog list and retrieve endpoints read from them, except for clients that wrote in the last
+# REPLICA_PIN_SECONDS (see blog/replicas.py). In tests, replicas mirror the default database.
+READ_REPLICAS = []
+for index, location in enumerate(name for name in os.environ.get("DATABASE_REPLICAS", "").split(",") if name):
+    alias = f"replica{index + 1}"
+    if DATABASE_PROFILE == "postgresql":
+        DATABASES[alias] = {**DATABASES["default"], "HOST": location, "TEST": {"MIRROR": "default"}}
+    else:
+        DATABASES[alias] = {**DATABASES["default"], "NAME": BASE_DIR / location, "TEST": {"MIRROR": "default"}}
+    READ_REPLICAS.append(alias)
+
+REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ["blog.replicas.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The "api" cache stores list/retrieve responses of the public blog endpoints.
+# LocMemCache evicts the least recently used entries beyond MAX_ENTRIES. Swap the
+# BACKEND for "django.core.cache.backends.filebased.FileBasedCache" (LOCATION is
+# a directory) or "django.core.cache.backends.redis.RedisCache" (LOCATION is a
+# redis:// URL of Redis or any compatible server) to share it between processes.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "blog-api-responses",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+# URL names of the read routes served by async views (see blog/asynchronous.py), e.g.
+# ASYNC_READ_ROUTES=posts-list,posts-detail,comments-list,tags-list. Only useful when
+# serving blog_api.asgi; under WSGI every async view runs in its own event loop.
+
+ASYNC_READ_ROUTES = [name for name in os.environ.get("ASYNC_READ_ROUTES", "").split(",") if name]
+
+# Requests slower than this many milliseconds are logged by the "blog.metrics" logger with
+# their route and slowest SQL queries (see blog/metrics.py). None disables the log.
+
+SLOW_REQUEST_LOG_MS = int(os.environ["SLOW_REQUEST_LOG_MS"]) if os.environ.get("SLOW_REQUEST_LOG_MS") else None
+
+# Likes and comments count half as much in the trending score of posts every this many hours
+# (see blog/trending.py).
+
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 24))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Tokens older than this are rejected; obtaining a token again replaces an expired one. None disables expiry.
+AUTH_TOKEN_TTL = timedelta(days=int(os.environ.get("AUTH_TOKEN_TTL_DAYS", 30))) or None
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -123,14 +225,38 @@ AUTH_PASSWORD_VALIDATORS = [
 # Django rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # Renders the list and retrieve responses of blog.fast_reads.ValuesReadMixin with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'blog.renderers.ValuesJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # Token buckets of blog.throttling, keyed "<throttle_scope>.<action>.<ip|email|user>".
+    'DEFAULT_THROTTLE_RATES': {
+        "comments.create.ip": "20/hour",
+        "comments.create.email": "10/hour",
+        "comments.create.user": "60/hour",
+        "likes.create.ip": "120/hour",
+        "likes.create.email": "60/hour",
+        "likes.create.user": "300/hour",
+        "likes.toggle.ip": "120/hour",
+        "likes.toggle.email": "60/hour",
+        "likes.toggle.user": "300/hour",
+        # Bulk toggles send no email; each one changes up to 1000 likes.
+        "likes.bulk_toggle.ip": "30/hour",
+        "likes.bulk_toggle.user": "60/hour",
+    },
 }
 
+# Redis URL of the throttle buckets shared by every process, e.g. redis://localhost:6379/0. Without it, each
+# process keeps its own buckets in memory.
+THROTTLE_REDIS_URL = os.environ.get("THROTTLE_REDIS_URL")
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -150,6 +276,12 @@ USE_TZ = True
 STATIC_URL = "static/"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Uploads are streamed to a temporary file in chunks and hashed on the way.
+FILE_UPLOAD_HANDLERS = ["blog.images.HashingUploadHandler"]
+
+# Processes resizing gallery images (None uses every core, 0 processes them inline).
+GALLERY_WORKERS = None
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -157,7 +289,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 # Email config:
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
 EMAIL_USE_TLS = get_secret('EMAIL_USE_TLS')
 EMAIL_USE_SSL = get_secret('EMAIL_USE_SSL')
 EMAIL_PORT = get_secret('EMAIL_PORT')
@@ -18,12 +18,16 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
-from rest_framework.authtoken import views
+
+from blog.metrics import MetricsView
+from users.views import ObtainExpiringAuthToken, RotateAuthToken
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('blog/', include('blog.urls', namespace='blog')),
-    path('api-token-auth/', views.obtain_auth_token),
+    path('api-token-auth/', ObtainExpiringAuthToken.as_view()),
+    path("api-token-rotate/", RotateAuthToken.as_view()),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path('api-auth/', include('rest_framework.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,130 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .models import token_expired
+
+
+CACHE_ALIAS = "default"
+SHARED_TIMEOUT = 300
+LOCAL_TTL = 10
+LOCAL_MAX_ENTRIES = 10000
+# The user fields cached with a token, which requests check. The password hash and
+# personal data stay out of the caches and are loaded on access.
+CACHED_USER_FIELDS = ("id", "username", "is_active", "is_staff", "is_superuser")
+
+
+class LRUCache:
+    """
+    A thread-safe in-process cache that evicts the least recently used entry beyond
+    `max_entries`, and whose entries expire `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_tokens = LRUCache(LOCAL_MAX_ENTRIES, LOCAL_TTL)
+
+
+def get_shared_cache():
+    return caches[CACHE_ALIAS]
+
+
+def token_cache_key(key):
+    """
+    Cache keys hold a hash of the token, so the shared cache never stores credentials.
+    """
+    return f"auth-token:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+
+def invalidate_token(key):
+    cache_key = token_cache_key(key)
+    local_tokens.delete(cache_key)
+    get_shared_cache().delete(cache_key)
+
+
+def invalidate_token_on_commit(key):
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches each token with its user, so authenticated
+    requests usually don't query the database.
+
+    Tokens are looked up in an in-process LRU cache, then in the shared cache
+    (CACHE_ALIAS) and finally in the database. Deleting a token or saving its user
+    invalidates both tiers of the process that made the change, and the shared
+    tier everywhere; other processes may keep their copy for up to LOCAL_TTL
+    seconds. Changes made with QuerySet.update() don't send signals and are only
+    picked up once the entries expire.
+
+    Only CACHED_USER_FIELDS of the user are cached; its other fields are deferred.
+
+    Tokens older than AUTH_TOKEN_TTL are rejected.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = local_tokens.get(cache_key)
+        if token is None:
+            shared_cache = get_shared_cache()
+            token = shared_cache.get(cache_key)
+            if token is None:
+                token = self.get_token(key)
+                shared_cache.set(cache_key, token, SHARED_TIMEOUT)
+            local_tokens.set(cache_key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        if token_expired(token):
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+        # Requests must not share the cached user instance.
+        return (copy.copy(token.user), token)
+
+    def get_token(self, key):
+        model = self.get_model()
+        try:
+            user_fields = [f"user__{name}" for name in CACHED_USER_FIELDS]
+            return model.objects.select_related("user").only("key", "created", "user", *user_fields).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
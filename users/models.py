@@ -1,16 +1,49 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
 
 class CustomUser(AbstractUser):
     birthday = models.DateField(auto_now=False, auto_now_add=False, null=True, blank=True)
+    # Not changed by logins, which only save last_login.
+    updated_time = models.DateTimeField(auto_now=True)
+
+
+def token_expiry(token):
+    """
+    Returns when `token` stops authenticating, or None if tokens never expire
+    (AUTH_TOKEN_TTL is None).
+    """
+    ttl = getattr(settings, "AUTH_TOKEN_TTL", None)
+    return token.created + ttl if ttl is not None else None
+
+
+def token_expired(token):
+    expiry = token_expiry(token)
+    return expiry is not None and expiry <= timezone.now()
+
+
+@transaction.atomic
+def issue_token(user):
+    """
+    Replaces the token of `user` with a new one. The previous token stops
+    authenticating as soon as the transaction commits.
+
+    Args:
+    - user (CustomUser): The token owner.
+
+    Returns:
+    - Token: The new token.
+    """
+    Token.objects.filter(user=user).delete()
+    return Token.objects.create(user=user)
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
-        Token.objects.create(user=instance)
\ No newline at end of file
+        issue_token(instance)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token_on_commit
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token_on_commit(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_token(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Cached tokens carry a copy of their user, including is_active, is_staff and
+    is_superuser, so any change to the user drops them. Logins only update
+    last_login and keep them.
+    """
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+        invalidate_token_on_commit(key)
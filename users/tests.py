@@ -1,3 +1,67 @@
+import pickle
+from datetime import timedelta
+
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentication import (
+    CACHED_USER_FIELDS,
+    CachedTokenAuthentication,
+    get_shared_cache,
+    local_tokens,
+    token_cache_key,
+)
+from .models import CustomUser
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        local_tokens.clear()
+        get_shared_cache().clear()
+        self.user = CustomUser.objects.create_user(username="user", password="password")
+        self.token = Token.objects.get(user=self.user)
+
+    def authenticate(self, key):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {key}")
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_token_is_cached_until_the_user_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(self.token.key)[0], self.user)
+        local_tokens.clear()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(self.token.key)
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, "User inactive or deleted."):
+            self.authenticate(self.token.key)
+
+    def test_cached_user_has_no_password_hash(self):
+        user = self.authenticate(self.token.key)[0]
+        self.assertEqual(user.get_deferred_fields() & set(CACHED_USER_FIELDS), set())
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password("password"))
+
+        # Loading a deferred field on a request's user doesn't add it to the caches.
+        self.assertIn("password", self.authenticate(self.token.key)[0].get_deferred_fields())
+        cached = pickle.dumps(get_shared_cache().get(token_cache_key(self.token.key)))
+        self.assertNotIn(self.user.password.encode("utf-8"), cached)
+
+    def test_deleted_and_expired_tokens_are_rejected(self):
+        self.authenticate(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post("/api-token-rotate/", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertNotEqual(response.json()["token"], self.token.key)
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid token."):
+            self.authenticate(self.token.key)
 
-# Create your tests here.
+        Token.objects.filter(user=self.user).update(created=self.token.created - timedelta(days=365))
+        with self.assertRaisesMessage(AuthenticationFailed, "Token has expired."):
+            self.authenticate(response.json()["token"])
+        response = APIClient().post("/api-token-auth/", {"username": "user", "password": "password"})
+        self.assertEqual(self.authenticate(response.json()["token"])[0], self.user)
@@ -1,3 +1,40 @@
-from django.shortcuts import render
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .models import issue_token, token_expired, token_expiry
+
+
+def token_response(token):
+    expiry = token_expiry(token)
+    return Response({"token": token.key, "expires": expiry.isoformat() if expiry else None})
+
+
+class ObtainExpiringAuthToken(ObtainAuthToken):
+    """
+    Returns the token of the user whose credentials are posted, replacing it
+    first when it has expired, with the time it expires.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        token = Token.objects.filter(user=user).first()
+        if token is None or token_expired(token):
+            token = issue_token(user)
+        return token_response(token)
+
+
+class RotateAuthToken(APIView):
+    """
+    Replaces the token of the authenticated user with a new one. The token used
+    for the request stops working.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return token_response(issue_token(request.user))